@@ -0,0 +1,143 @@
+# app/admission.py
+# Admission control for the routes that put work on MongoDB. Each route group has a gate with
+# a concurrency limit, a bounded FIFO queue in front of it, and a per-user token bucket; a
+# request that cannot get in soon is refused at once (503 / 429 + Retry-After) instead of
+# piling up behind the others. Limits are per worker process.
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, List, Deque, AsyncIterator
+
+# Requests in progress per group, and how many more may wait for a slot; 0 concurrency = unlimited.
+ADMISSION_SUBMIT_CONCURRENCY: int = int(os.getenv("ADMISSION_SUBMIT_CONCURRENCY", "16"))
+ADMISSION_SUBMIT_QUEUE: int = int(os.getenv("ADMISSION_SUBMIT_QUEUE", "64"))
+ADMISSION_REPORT_CONCURRENCY: int = int(os.getenv("ADMISSION_REPORT_CONCURRENCY", "32"))
+ADMISSION_REPORT_QUEUE: int = int(os.getenv("ADMISSION_REPORT_QUEUE", "128"))
+# Per-user token buckets: sustained requests per minute, plus a burst allowance; 0 rate = unlimited.
+ADMISSION_SUBMIT_RATE_PER_MIN: float = float(os.getenv("ADMISSION_SUBMIT_RATE_PER_MIN", "20"))
+ADMISSION_SUBMIT_BURST: int = int(os.getenv("ADMISSION_SUBMIT_BURST", "5"))
+ADMISSION_REPORT_RATE_PER_MIN: float = float(os.getenv("ADMISSION_REPORT_RATE_PER_MIN", "120"))
+ADMISSION_REPORT_BURST: int = int(os.getenv("ADMISSION_REPORT_BURST", "30"))
+# Longest a request waits for a slot before it is shed.
+ADMISSION_QUEUE_TIMEOUT_S: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_S", "2"))
+# Retry-After sent with a 503 when a group's queue is full or the wait timed out.
+ADMISSION_RETRY_AFTER_S: float = float(os.getenv("ADMISSION_RETRY_AFTER_S", "2"))
+# Users tracked per token-bucket table; the least recently seen are forgotten (and start full again).
+ADMISSION_MAX_TRACKED_USERS: int = int(os.getenv("ADMISSION_MAX_TRACKED_USERS", "100000"))
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason  # rate_limited | queue_full | queue_timeout
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class ConcurrencyLimiter:
+    """At most `limit` holders; up to `max_queue` more wait in arrival order, for at most `queue_timeout`.
+
+    Event-loop only. A released slot is handed straight to the oldest waiter, so a burst of new
+    arrivals cannot overtake the queue.
+    """
+
+    def __init__(self, limit: int, max_queue: int, queue_timeout: float = ADMISSION_QUEUE_TIMEOUT_S):
+        self.limit = limit
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        if self.limit <= 0 or (self.in_flight < self.limit and not self._waiters):
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            raise AdmissionRejected("queue_full", ADMISSION_RETRY_AFTER_S)
+        waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # the slot was handed over just as we gave up
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.TimeoutError):
+                raise AdmissionRejected("queue_timeout", ADMISSION_RETRY_AFTER_S) from None
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # in_flight stays the same: the slot changes hands
+                return
+        self.in_flight -= 1
+
+
+class TokenBuckets:
+    """One token bucket per key: `burst` tokens, refilled at `rate_per_min` per minute."""
+
+    def __init__(self, rate_per_min: float, burst: int, max_keys: int = ADMISSION_MAX_TRACKED_USERS):
+        self.rate_per_s = rate_per_min / 60.0
+        self.burst = max(1, burst)
+        self.max_keys = max(1, max_keys)
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()  # key -> [tokens, updated at]
+
+    def take(self, key: str) -> float:
+        # 0 when a token was taken, else the seconds until one is available.
+        if self.rate_per_s <= 0:
+            return 0.0
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._buckets.popitem(last=False)
+            bucket = self._buckets[key] = [float(self.burst), now]
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate_per_s)
+            bucket[1] = now
+        if bucket[0] >= 1.0:
+            bucket[0] -= 1.0
+            return 0.0
+        return (1.0 - bucket[0]) / self.rate_per_s
+
+
+class AdmissionGate:
+    """Per-user rate limit, then concurrency limit, for one route group."""
+
+    def __init__(self, group: str, concurrency: int, max_queue: int, rate_per_min: float, burst: int):
+        self.group = group
+        self.limiter = ConcurrencyLimiter(concurrency, max_queue)
+        self.buckets = TokenBuckets(rate_per_min, burst)
+        self.rejected: Dict[str, int] = {"rate_limited": 0, "queue_full": 0, "queue_timeout": 0}
+
+    @asynccontextmanager
+    async def admit(self, user_id: Optional[str]) -> AsyncIterator[None]:
+        try:
+            wait = self.buckets.take(user_id) if user_id else 0.0
+            if wait > 0:
+                raise AdmissionRejected("rate_limited", wait)
+            await self.limiter.acquire()
+        except AdmissionRejected as e:
+            self.rejected[e.reason] += 1
+            raise
+        try:
+            yield
+        finally:
+            self.limiter.release()
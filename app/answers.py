@@ -0,0 +1,185 @@
+# app/answers.py
+import json
+import logging
+import math
+import os
+import threading
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Tuple, Union
+
+import numpy as np
+from fastapi import Request
+
+from .quizzes import CompiledQuiz
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on the raw answers payload (form field or JSON body); larger submissions get a 422.
+MAX_ANSWERS_PAYLOAD_BYTES: int = int(os.getenv("MAX_ANSWERS_PAYLOAD_BYTES", "16384"))
+# Free-text answers are only possible for questions without an options_map.
+MAX_FREE_TEXT_ANSWER_LENGTH: int = int(os.getenv("MAX_FREE_TEXT_ANSWER_LENGTH", "1000"))
+# URL-encoding roughly triples a JSON string, so the form body gets proportionally more room.
+MAX_FORM_BODY_BYTES = 4 * MAX_ANSWERS_PAYLOAD_BYTES
+
+
+class AnswerDecodeError(ValueError):
+    """The submitted answers are malformed or do not fit the quiz; maps to HTTP 422."""
+
+
+@dataclass(frozen=True)
+class DecodedAnswers:
+    answers: Dict[str, Any]  # question id -> canonical option value from options_map (stored on the report)
+    values: np.ndarray  # float64, aligned with CompiledQuiz.questions; NaN where unanswered or non-numeric
+
+
+class _Slot:
+    __slots__ = ("index", "options")
+
+    def __init__(self, index: int, options: Optional[Dict[float, Any]]):
+        self.index = index
+        self.options = options  # float(value) -> value as written in options_map; None = unconstrained
+
+
+class AnswerDecoder:
+    """Validates a submission against one compiled quiz in a single pass over the payload.
+
+    Every answer must name a question of the quiz and, for questions with an options_map,
+    be one of its values (as a number or a numeric string). The result carries both the
+    canonical answers dict for storage and a float vector the scorer uses directly.
+    """
+
+    def __init__(self, quiz: CompiledQuiz):
+        self.quiz_id = quiz.id
+        self.question_count = len(quiz.questions)
+        self._slots: Dict[str, _Slot] = {}
+        raw_questions = quiz.definition.get("questions", [])
+        for question in quiz.questions:
+            options: Optional[Dict[float, Any]] = None
+            if question.valid_values:
+                options = {}
+                for option in raw_questions[question.index].get("options_map") or []:
+                    try:
+                        options.setdefault(float(option["value"]), option["value"])
+                    except (KeyError, ValueError, TypeError):
+                        continue  # already reported by compile_question
+            self._slots[question.id] = _Slot(question.index, options)
+
+    def decode(self, payload: Any) -> DecodedAnswers:
+        if not isinstance(payload, dict):
+            raise AnswerDecodeError("Answers must be a JSON object keyed by question id.")
+        if not payload:
+            raise AnswerDecodeError("No answers submitted.")
+        if len(payload) > self.question_count:
+            raise AnswerDecodeError(f"Too many answers: {len(payload)} for {self.question_count} questions.")
+        values = np.full(self.question_count, np.nan, dtype=np.float64)
+        answers: Dict[str, Any] = {}
+        for question_id, raw_value in payload.items():
+            slot = self._slots.get(question_id)
+            if slot is None:
+                raise AnswerDecodeError(f"Unknown question id {question_id[:64]!r} for quiz {self.quiz_id}.")
+            if slot.options is None:
+                answers[question_id], values[slot.index] = _decode_free(question_id, raw_value)
+                continue
+            number = _as_number(raw_value)
+            canonical = slot.options.get(number) if number is not None else None
+            if canonical is None:
+                raise AnswerDecodeError(f"Answer for {question_id} is not one of the allowed options.")
+            answers[question_id] = canonical
+            values[slot.index] = number
+        return DecodedAnswers(answers, values)
+
+    def decode_json(self, raw: Union[str, bytes]) -> DecodedAnswers:
+        return self.decode(parse_answers_json(raw))
+
+
+def _as_number(raw_value: Any) -> Optional[float]:
+    if isinstance(raw_value, bool):
+        return None
+    if isinstance(raw_value, (int, float)):
+        return float(raw_value)
+    if isinstance(raw_value, str) and len(raw_value) <= 32:
+        try:
+            return float(raw_value)
+        except ValueError:
+            return None
+    return None
+
+
+def _decode_free(question_id: str, raw_value: Any) -> Tuple[Any, float]:
+    if isinstance(raw_value, str):
+        if len(raw_value) > MAX_FREE_TEXT_ANSWER_LENGTH:
+            raise AnswerDecodeError(f"Answer for {question_id} is longer than {MAX_FREE_TEXT_ANSWER_LENGTH} characters.")
+        return raw_value, np.nan
+    number = _as_number(raw_value)
+    if number is None or not math.isfinite(number):
+        raise AnswerDecodeError(f"Answer for {question_id} must be a number or a string.")
+    return raw_value, number
+
+
+def parse_answers_json(raw: Union[str, bytes]) -> Any:
+    size = len(raw.encode("utf-8")) if isinstance(raw, str) else len(raw)
+    if size > MAX_ANSWERS_PAYLOAD_BYTES:
+        raise AnswerDecodeError(f"Answers payload too large ({size} bytes, limit {MAX_ANSWERS_PAYLOAD_BYTES}).")
+    try:
+        return json.loads(raw)
+    except (ValueError, RecursionError) as e:  # JSONDecodeError and bad UTF-8 are ValueErrors
+        raise AnswerDecodeError(f"Answers are not valid JSON: {e}") from None
+
+
+async def _read_body(request: Request, limit: int) -> bytes:
+    # Enforced on the bytes actually received, so a chunked body (no Content-Length) is capped too.
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > limit:
+        raise AnswerDecodeError(f"Request body too large ({declared} bytes, limit {limit}).")
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > limit:
+            raise AnswerDecodeError(f"Request body too large (limit {limit} bytes).")
+    return bytes(body)
+
+
+async def read_answers_payload(request: Request) -> Union[str, bytes, Dict[str, Any]]:
+    # The quiz page posts a form field `answers` holding a JSON string; API clients may send
+    # `{"answers": {...}}` as application/json. Oversized bodies are refused before parsing.
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("application/json"):
+        payload = parse_answers_json(await _read_body(request, MAX_ANSWERS_PAYLOAD_BYTES))
+        if not isinstance(payload, dict) or not isinstance(payload.get("answers"), dict):
+            raise AnswerDecodeError('JSON body must be an object with an "answers" object.')
+        return payload["answers"]
+    body = await _read_body(request, MAX_FORM_BODY_BYTES)
+
+    async def replay() -> Dict[str, Any]:
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    form = await Request(request.scope, replay).form(max_files=0, max_fields=16)
+    answers = form.get("answers")
+    if not isinstance(answers, str):
+        raise AnswerDecodeError("Missing form field 'answers'.")
+    return answers
+
+
+def decode_answers(decoder: AnswerDecoder, payload: Union[str, bytes, Dict[str, Any]]) -> DecodedAnswers:
+    if isinstance(payload, dict):
+        return decoder.decode(payload)
+    return decoder.decode_json(payload)
+
+
+_decoder_cache: Dict[Tuple[str, str], AnswerDecoder] = {}
+_decoder_cache_lock = threading.Lock()
+
+
+def get_answer_decoder(quiz: CompiledQuiz) -> AnswerDecoder:
+    # One decoder per quiz definition version, rebuilt when the registry hot-reloads the quiz.
+    cache_key = (quiz.id, quiz.definition_hash)
+    decoder = _decoder_cache.get(cache_key)
+    if decoder is None:
+        with _decoder_cache_lock:
+            decoder = _decoder_cache.get(cache_key)
+            if decoder is None:
+                decoder = AnswerDecoder(quiz)
+                for stale_key in [k for k in _decoder_cache if k[0] == quiz.id]:
+                    del _decoder_cache[stale_key]
+                _decoder_cache[cache_key] = decoder
+    return decoder
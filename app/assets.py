@@ -0,0 +1,476 @@
+# app/assets.py
+# Self-hosted static assets. `python -m app.assets build` vendors the third-party JS and the
+# Inter font, compiles Tailwind against app/templates into app/static/css/app.css and writes
+# .gz/.br siblings. At runtime AssetManifest serves every file under app/static from memory
+# under a content-hash URL with immutable caching; templates reference them through the
+# `asset_url()` Jinja global, which falls back to the public CDN for anything not built yet.
+import argparse
+import base64
+import gzip
+import hashlib
+import io
+import logging
+import mimetypes
+import os
+import platform
+import posixpath
+import re
+import shutil
+import stat
+import subprocess
+import sys
+import urllib.request
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Dict, List, Tuple
+
+from fastapi import Request, Response
+
+from .http_cache import etag_matches
+
+try:  # optional: brotli variants are only produced/served when the module is installed
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+STATIC_URL_PREFIX = "/static/"
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Unfingerprinted paths (/static/<logical path>) may change between deploys; url() references
+# inside stylesheets are rewritten to the fingerprinted files at load time.
+MUTABLE_CACHE_CONTROL = "public, max-age=3600"
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+# The CLI build pinned below; another version is fetched from the GitHub release and needs the
+# TAILWIND_SHA256 env variable.
+TAILWIND_PINNED_VERSION = "3.4.16"
+TAILWIND_VERSION = os.getenv("TAILWIND_VERSION", TAILWIND_PINNED_VERSION)
+TAILWIND_INPUT = STATIC_DIR / "src" / "tailwind.css"
+TAILWIND_OUTPUT = STATIC_DIR / "css" / "app.css"
+TAILWIND_CONFIG = Path(__file__).resolve().parent.parent / "tailwind.config.js"
+
+# Release archives the build extracts third-party files from: wheels on PyPI, which never lets a
+# published file change, lists its sha256, and is on the build's network path anyway (pip).
+# name -> (URL, sha256 of the archive)
+VENDOR_ARCHIVES: Dict[str, Tuple[str, str]] = {
+    # Alpine 3.14.9, Chart.js 4.4.0 (MIT) and Inter 400/500/600/700 (OFL), with their licenses.
+    "django-unfold-0.91.0": (
+        "https://files.pythonhosted.org/packages/cb/e8/2591119368628867284550ee5c337bae1f4b4c0e5a8a59f231899326a26f/django_unfold-0.91.0-py3-none-any.whl",
+        "486a468ec4788e0668a9e73686796b04450709171af4ac213b6d229a8015676a",
+    ),
+    # The Tailwind CLI 3.4.16 standalone binaries, one wheel per platform.
+    "fastapi-tailwind-1.0.2b1-linux-x64": (
+        "https://files.pythonhosted.org/packages/45/bd/b20296ce70d572e91da0a41bbf7223965f9e62608d887439544da47f5311/fastapi_tailwind-1.0.2b1-py3-none-manylinux2014_x86_64.whl",
+        "26e219714a3be0aac69de7fab93e8ab839d97dedf469c25d346f0e17ee46c61e",
+    ),
+    "fastapi-tailwind-1.0.2b1-linux-arm64": (
+        "https://files.pythonhosted.org/packages/23/de/a32adff327a8aca5b603dd4b66ee1169f75f18e44f70557633258efd41cb/fastapi_tailwind-1.0.2b1-py3-none-manylinux2014_aarch64.whl",
+        "9a9d596bcb7e963ee1946148481adede6e492d92dd2ce5aabe0b4b22aea26d78",
+    ),
+    "fastapi-tailwind-1.0.2b1-macos-x64": (
+        "https://files.pythonhosted.org/packages/c5/c4/517d290a17b54b70ccb3b2fe73b8f2350bda4c27ffea5be38e56898d8cad/fastapi_tailwind-1.0.2b1-py3-none-macosx_10_9_x86_64.whl",
+        "1d1c1055608de9eebaf75dad6adb13a4a5cdedeb6d75027b8051d24d8c9f4d68",
+    ),
+    "fastapi-tailwind-1.0.2b1-macos-arm64": (
+        "https://files.pythonhosted.org/packages/39/21/3b5d354a6c6563f03b2c5eb5593405c192ff0c6b958765688200465be287/fastapi_tailwind-1.0.2b1-py3-none-macosx_10_9_arm64.whl",
+        "d1e7715254e915f4818ee1df4ee8a6d688253af26c72faccd4fe6ab31beff990",
+    ),
+}
+_UNFOLD = "django-unfold-0.91.0"
+
+
+@dataclass(frozen=True)
+class VendorFile:
+    integrity: str  # SRI hash of the file as served; the build refuses anything else
+    url: Optional[str] = None  # downloaded as is, and the CDN fallback until the build has run
+    archive: Optional[str] = None  # or extracted from VENDOR_ARCHIVES[archive]...
+    member: Optional[str] = None  # ...at this path
+    cdn_url: Optional[str] = None  # fallback for an extracted file (not the pinned bytes, so no SRI)
+
+    @property
+    def fallback_url(self) -> Optional[str]:
+        return self.url or self.cdn_url
+
+
+VENDOR_ASSETS: Dict[str, VendorFile] = {
+    "vendor/htmx.min.js": VendorFile(
+        "sha384-D1Kt99CQMDuVetoL1lrYwg5t+9QdHe7NLX/SoJYkXDFfX37iInKRy5xLSi8nO7UC",
+        url="https://unpkg.com/htmx.org@1.9.10/dist/htmx.min.js",
+    ),
+    "vendor/chart.umd.min.js": VendorFile(
+        "sha384-pDFoJfgzrYgHITK5uWaYUTiW+G7S1+HWvC3LuNhCalTFtF/zZXa80CCKSuk91czS",
+        archive=_UNFOLD, member="unfold/static/unfold/js/chart/chart.js",
+        cdn_url="https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.js",
+    ),
+    "vendor/chart.LICENSE.txt": VendorFile(
+        "sha384-OkVNKEzJVHeD+74l3M5PpGUZo41MILTzZ1HFy8WjsWiTBQKiieUUB7mWw69IBHFS",
+        archive=_UNFOLD, member="unfold/static/unfold/js/chart/LICENSE",
+    ),
+    "vendor/alpine.min.js": VendorFile(
+        "sha384-9Ax3MmS9AClxJyd5/zafcXXjxmwFhZCdsT6HJoJjarvCaAkJlk5QDzjLJm+Wdx5F",
+        archive=_UNFOLD, member="unfold/static/unfold/js/alpine/alpine.js",
+        cdn_url="https://cdn.jsdelivr.net/npm/alpinejs@3.14.9/dist/cdn.min.js",
+    ),
+    "vendor/alpine.LICENSE.txt": VendorFile(
+        "sha384-Y6dxHEddBHHsUhJgYmslNCPdAFtqf9WSuVpfaPYbnhv+AzMvFvJJwRadNZ9/mdON",
+        archive=_UNFOLD, member="unfold/static/unfold/js/alpine/LICENSE",
+    ),
+    "fonts/Inter-Regular.woff2": VendorFile(
+        "sha384-Yn6vqlF2XIxaweyUsFM1vrs+iKM2V2CVeZrCdcfOVfU2WErmtdy957tv/papzVwR",
+        archive=_UNFOLD, member="unfold/static/unfold/fonts/inter/Inter-Regular.woff2",
+    ),
+    "fonts/Inter-Medium.woff2": VendorFile(
+        "sha384-D5eIzc3KUIwIcbPpnrdGCWafFt2xnaQQ1yCOhmVvuQQCEMiflmW23DuncJiFdBsa",
+        archive=_UNFOLD, member="unfold/static/unfold/fonts/inter/Inter-Medium.woff2",
+    ),
+    "fonts/Inter-SemiBold.woff2": VendorFile(
+        "sha384-oesH8hc3u5l5ZXhSaTFw7VP6dwTaMHAmEiev1cHvrIbQkqMh5+daTxJJ/R87sYB+",
+        archive=_UNFOLD, member="unfold/static/unfold/fonts/inter/Inter-SemiBold.woff2",
+    ),
+    "fonts/Inter-Bold.woff2": VendorFile(
+        "sha384-j8XbBSyF8GRphybBjh3vKhWNpXigl1b54+bp81w8IZYMXUs508BYH7hXNW3fM9da",
+        archive=_UNFOLD, member="unfold/static/unfold/fonts/inter/Inter-Bold.woff2",
+    ),
+    "fonts/Inter-LICENSE.txt": VendorFile(
+        "sha384-3Zd1nhFvzgIOPPgO6G7IBYgCapNGKd+YHzTPDhMMlAxY+zuq5GUP2IgCvdSmwShv",
+        archive=_UNFOLD, member="unfold/static/unfold/fonts/inter/LICENSE",
+    ),
+}
+# sha256 of the Tailwind CLI binary per "<system>-<machine>", for TAILWIND_PINNED_VERSION; checked
+# when extracted from its archive and again before every run of a cached copy.
+TAILWIND_SHA256: Dict[str, str] = {
+    "linux-x64": "33f254b54c8754f16efbe2be1de38ca25192630dc36f164595a770d4bbf4d893",
+    "linux-arm64": "1e6746bba6f3d34d7550889a1a009ab90ee3794a5ebce60ed10688ad10680a87",
+    "macos-x64": "220962a6f371fc31605f89569ad647309cbd83471cd8c29b83f235a501c39dce",
+    "macos-arm64": "01751c6019c1b4bf787d2e0b1f221bef1bcc010cef55313fc0691f3b6a3b676f",
+}
+TAILWIND_MEMBER = "fastapi_tailwind/binaries/tailwindcss-{target}"
+# url("...") references inside stylesheets; data: and absolute URLs are left alone.
+CSS_URL_PATTERN = re.compile(r"""url\(\s*(['"]?)([^'")\s]+)\1\s*\)""")
+
+mimetypes.add_type("font/woff2", ".woff2")
+mimetypes.add_type("application/javascript", ".js")
+
+
+@dataclass(frozen=True)
+class StaticAsset:
+    logical_path: str
+    fingerprinted_path: str
+    media_type: str
+    etag: str
+    integrity: str  # SRI value, e.g. "sha384-..."
+    body: bytes
+    gzip_body: Optional[bytes]
+    brotli_body: Optional[bytes]
+
+    def response(self, request: Request, immutable: bool) -> Response:
+        cache_control = IMMUTABLE_CACHE_CONTROL if immutable else MUTABLE_CACHE_CONTROL
+        headers = {"ETag": self.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if etag_matches(request, self.etag):
+            return Response(status_code=304, headers=headers)
+        accepted = request.headers.get("accept-encoding", "")
+        body = self.body
+        if self.brotli_body is not None and "br" in accepted:
+            body, headers["Content-Encoding"] = self.brotli_body, "br"
+        elif self.gzip_body is not None and "gzip" in accepted:
+            body, headers["Content-Encoding"] = self.gzip_body, "gzip"
+        return Response(content=body, media_type=self.media_type, headers=headers)
+
+
+def build_asset(logical_path: str, body: bytes, media_type: str,
+                gzip_body: Optional[bytes] = None, brotli_body: Optional[bytes] = None) -> StaticAsset:
+    # Content-hashed asset with its compressed variants made once here rather than per request.
+    digest = hashlib.sha256(body).hexdigest()[:12]
+    stem, dot, suffix = logical_path.rpartition(".")
+    fingerprinted = f"{stem}.{digest}.{suffix}" if dot else f"{logical_path}.{digest}"
+    if media_type.startswith(COMPRESSIBLE_TYPES):
+        if gzip_body is None:
+            gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        if brotli_body is None and brotli is not None:
+            brotli_body = brotli.compress(body)
+    return StaticAsset(logical_path, fingerprinted, media_type, f'"{digest}"', sri_hash(body), body, gzip_body, brotli_body)
+
+
+class AssetManifest:
+    def __init__(self, static_dir: Path = STATIC_DIR):
+        self.static_dir = static_dir
+        self._by_logical: Dict[str, StaticAsset] = {}
+        self._by_fingerprint: Dict[str, StaticAsset] = {}
+
+    def load(self) -> None:
+        by_logical: Dict[str, StaticAsset] = {}
+        stylesheets: List[Tuple[Path, str]] = []
+        if self.static_dir.is_dir():
+            for path in sorted(self.static_dir.rglob("*")):
+                relative = path.relative_to(self.static_dir).as_posix()
+                if not path.is_file() or relative.startswith("src/") or path.suffix in (".gz", ".br"):
+                    continue
+                if path.suffix == ".css":
+                    stylesheets.append((path, relative))  # after what they reference
+                else:
+                    by_logical[relative] = self._load_asset(path, relative)
+        for path, relative in stylesheets:
+            by_logical[relative] = self._load_stylesheet(path, relative, by_logical)
+        self._by_logical = by_logical
+        self._by_fingerprint = {asset.fingerprinted_path: asset for asset in by_logical.values()}
+        logger.info("Loaded %s static asset(s) from %s.", len(by_logical), self.static_dir)
+
+    @staticmethod
+    def _load_asset(path: Path, relative: str) -> StaticAsset:
+        body = path.read_bytes()
+        media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        gzip_body = brotli_body = None
+        if media_type.startswith(COMPRESSIBLE_TYPES):
+            # Prefer build-time variants; build_asset compresses whatever is missing.
+            gz_path, br_path = path.with_name(path.name + ".gz"), path.with_name(path.name + ".br")
+            gzip_body = gz_path.read_bytes() if _is_fresh(gz_path, path) else None
+            brotli_body = br_path.read_bytes() if _is_fresh(br_path, path) else None
+        return build_asset(relative, body, media_type, gzip_body, brotli_body)
+
+    @classmethod
+    def _load_stylesheet(cls, path: Path, relative: str, assets: Dict[str, StaticAsset]) -> StaticAsset:
+        # url() references point at the fingerprinted (immutable) files, so the font a page
+        # preloads through asset_url() is the very URL the stylesheet asks for.
+        body = path.read_bytes()
+        rewritten = rewrite_css_urls(body, relative, assets)
+        if rewritten == body:
+            return cls._load_asset(path, relative)
+        return build_asset(relative, rewritten, mimetypes.guess_type(path.name)[0] or "text/css")
+
+    def fingerprint(self) -> str:
+        # Changes whenever any served asset (and therefore any asset URL in the HTML) changes.
+        joined = "|".join(sorted(self._by_fingerprint))
+        return hashlib.sha256(joined.encode("utf-8")).hexdigest()[:16]
+
+    def logical_paths(self) -> List[str]:
+        return sorted(self._by_logical)
+
+    def available(self, logical_path: str) -> bool:
+        return logical_path in self._by_logical
+
+    def url(self, logical_path: str) -> str:
+        asset = self._by_logical.get(logical_path)
+        if asset is not None:
+            return STATIC_URL_PREFIX + asset.fingerprinted_path
+        vendor = VENDOR_ASSETS.get(logical_path)
+        if vendor is not None and vendor.fallback_url:
+            return vendor.fallback_url
+        logger.warning("Static asset '%s' not found; run `python -m app.assets build`.", logical_path)
+        return STATIC_URL_PREFIX + logical_path
+
+    def integrity(self, logical_path: str) -> str:
+        asset = self._by_logical.get(logical_path)
+        if asset is not None:
+            return asset.integrity
+        # The CDN copy of an extracted file is not the pinned bytes; an empty integrity checks nothing.
+        vendor = VENDOR_ASSETS.get(logical_path)
+        return vendor.integrity if vendor is not None and vendor.url else ""
+
+    def resolve(self, requested_path: str) -> Tuple[Optional[StaticAsset], bool]:
+        # (asset, is_fingerprinted)
+        asset = self._by_fingerprint.get(requested_path)
+        if asset is not None:
+            return asset, True
+        return self._by_logical.get(requested_path), False
+
+
+def rewrite_css_urls(body: bytes, relative: str, assets: Dict[str, StaticAsset]) -> bytes:
+    base = posixpath.dirname(relative)
+
+    def replace(match: "re.Match[str]") -> str:
+        reference = match.group(2)
+        if ":" in reference or reference.startswith(("/", "#")):
+            return match.group(0)
+        path, sep, suffix = reference.partition("?") if "?" in reference else reference.partition("#")
+        asset = assets.get(posixpath.normpath(posixpath.join(base, path)))
+        if asset is None:
+            return match.group(0)
+        target = posixpath.relpath(asset.fingerprinted_path, base or ".")
+        return f'url("{target}{sep}{suffix}")'
+
+    return CSS_URL_PATTERN.sub(replace, body.decode("utf-8")).encode("utf-8")
+
+
+def _is_fresh(variant: Path, source: Path) -> bool:
+    return variant.is_file() and variant.stat().st_mtime >= source.stat().st_mtime
+
+
+# --- build -------------------------------------------------------------------------------
+
+def _download(url: str) -> bytes:
+    with urllib.request.urlopen(url, timeout=60) as response:
+        return response.read()
+
+
+def sri_hash(body: bytes, algorithm: str = "sha384") -> str:
+    return f"{algorithm}-" + base64.b64encode(hashlib.new(algorithm, body).digest()).decode("ascii")
+
+
+def verify_integrity(source: str, body: bytes, integrity: Optional[str]) -> None:
+    # Raises unless `body` has the pinned SRI hash; an unpinned file fails too.
+    if not integrity:
+        raise RuntimeError(f"No integrity hash pinned for {source} (got: {sri_hash(body)}); verify it and pin it in VENDOR_ASSETS.")
+    algorithm = integrity.split("-", 1)[0]
+    actual = sri_hash(body, algorithm)
+    if actual != integrity:
+        raise RuntimeError(f"Integrity check failed for {source}: expected {integrity}, got {actual}.")
+
+
+_archives: Dict[str, zipfile.ZipFile] = {}
+
+
+def _archive(name: str) -> zipfile.ZipFile:
+    # Downloaded once per build and checked against its pinned sha256 before anything is read from it.
+    archive = _archives.get(name)
+    if archive is None:
+        url, expected = VENDOR_ARCHIVES[name]
+        body = _download(url)
+        actual = hashlib.sha256(body).hexdigest()
+        if actual != expected:
+            raise RuntimeError(f"Checksum mismatch for {url}: expected {expected}, got {actual}.")
+        archive = _archives[name] = zipfile.ZipFile(io.BytesIO(body))
+    return archive
+
+
+def fetch_vendor_file(vendor: VendorFile) -> Tuple[str, bytes]:
+    # (where it came from, body), not yet verified.
+    if vendor.archive is not None:
+        return f"{vendor.archive}:{vendor.member}", _archive(vendor.archive).read(vendor.member)
+    return vendor.url, _download(vendor.url)
+
+
+def vendor_assets(force: bool) -> None:
+    for logical, vendor in VENDOR_ASSETS.items():
+        target = STATIC_DIR / logical
+        if target.is_file() and not force:
+            verify_integrity(str(target), target.read_bytes(), vendor.integrity)
+            continue
+        source, body = fetch_vendor_file(vendor)
+        verify_integrity(source, body, vendor.integrity)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(body)
+        logger.info("Vendored %s -> %s (%s bytes)", source, target, len(body))
+
+
+def _tailwind_platform() -> str:
+    machine = {"x86_64": "x64", "amd64": "x64", "aarch64": "arm64", "arm64": "arm64"}.get(platform.machine().lower(), "x64")
+    system = {"darwin": "macos", "linux": "linux"}.get(sys.platform, "linux")
+    return f"{system}-{machine}"
+
+
+def _tailwind_url(target: str) -> str:
+    return f"https://github.com/tailwindlabs/tailwindcss/releases/download/v{TAILWIND_VERSION}/tailwindcss-{target}"
+
+
+def _tailwind_sha256(target: str) -> Optional[str]:
+    configured = os.getenv("TAILWIND_SHA256")
+    if configured:
+        return configured.strip().lower()
+    return TAILWIND_SHA256.get(target) if TAILWIND_VERSION == TAILWIND_PINNED_VERSION else None
+
+
+def _fetch_tailwind(target: str) -> bytes:
+    archive = f"fastapi-tailwind-1.0.2b1-{target}"
+    if TAILWIND_VERSION == TAILWIND_PINNED_VERSION and archive in VENDOR_ARCHIVES:
+        return _archive(archive).read(TAILWIND_MEMBER.format(target=target))
+    return _download(_tailwind_url(target))
+
+
+def _verify_tailwind(binary: Path, target: str) -> None:
+    expected = _tailwind_sha256(target)
+    actual = hashlib.sha256(binary.read_bytes()).hexdigest()
+    if not expected:
+        raise RuntimeError(
+            f"No sha256 pinned for the Tailwind CLI {TAILWIND_VERSION} ({target}; downloaded: {actual}); "
+            "verify it and pin it in TAILWIND_SHA256 or set the TAILWIND_SHA256 env variable."
+        )
+    if actual != expected:
+        raise RuntimeError(f"Checksum mismatch for the Tailwind CLI {binary}: expected {expected}, got {actual}.")
+
+
+def _tailwind_binary() -> Path:
+    configured = os.getenv("TAILWIND_BIN") or shutil.which("tailwindcss")
+    if configured:
+        return Path(configured)
+    target = _tailwind_platform()
+    cache_dir = Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "mansematch"
+    binary = cache_dir / f"tailwindcss-{TAILWIND_VERSION}-{target}"
+    if not binary.is_file():
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        download = binary.with_name(binary.name + ".part")
+        download.write_bytes(_fetch_tailwind(target))
+        try:
+            _verify_tailwind(download, target)
+        except RuntimeError:
+            download.unlink()
+            raise
+        download.replace(binary)
+        binary.chmod(binary.stat().st_mode | stat.S_IEXEC)
+        logger.info("Downloaded Tailwind CLI %s to %s", TAILWIND_VERSION, binary)
+    else:
+        _verify_tailwind(binary, target)  # never execute a cached file that was swapped since
+    return binary
+
+
+def print_pins() -> None:
+    # Hashes of what the pinned sources hold right now, to review and paste into the tables above.
+    for name, (url, _) in VENDOR_ARCHIVES.items():
+        print(f"{name}: {hashlib.sha256(_download(url)).hexdigest()}")
+    for logical, vendor in VENDOR_ASSETS.items():
+        print(f"{logical}: {sri_hash(fetch_vendor_file(vendor)[1])}")
+    for target in TAILWIND_SHA256:
+        print(f"tailwindcss {TAILWIND_VERSION} {target}: {hashlib.sha256(_fetch_tailwind(target)).hexdigest()}")
+
+
+def build_css() -> None:
+    TAILWIND_OUTPUT.parent.mkdir(parents=True, exist_ok=True)
+    subprocess.run(
+        [str(_tailwind_binary()), "-c", str(TAILWIND_CONFIG), "-i", str(TAILWIND_INPUT), "-o", str(TAILWIND_OUTPUT), "--minify"],
+        check=True, cwd=str(TAILWIND_CONFIG.parent),
+    )
+    logger.info("Built %s (%s bytes)", TAILWIND_OUTPUT, TAILWIND_OUTPUT.stat().st_size)
+
+
+def precompress() -> None:
+    for path in sorted(STATIC_DIR.rglob("*")):
+        relative = path.relative_to(STATIC_DIR).as_posix()
+        if not path.is_file() or relative.startswith("src/") or path.suffix in (".gz", ".br"):
+            continue
+        media_type = mimetypes.guess_type(path.name)[0] or ""
+        if not media_type.startswith(COMPRESSIBLE_TYPES):
+            continue
+        body = path.read_bytes()
+        path.with_name(path.name + ".gz").write_bytes(gzip.compress(body, compresslevel=9, mtime=0))
+        if brotli is not None:
+            path.with_name(path.name + ".br").write_bytes(brotli.compress(body, quality=11))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Build self-hosted static assets.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Vendor JS/fonts, compile Tailwind CSS and precompress everything.")
+    build.add_argument("--force", action="store_true", help="Re-fetch vendored files even if present.")
+    build.add_argument("--skip-css", action="store_true", help="Do not run the Tailwind CLI.")
+    sub.add_parser("pins", help="Download the pinned sources and print their hashes for review.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)-5s %(message)s")
+    if args.command == "pins":
+        print_pins()
+        return 0
+
+    vendor_assets(args.force)
+    if not args.skip_css:
+        build_css()
+    precompress()
+    manifest = AssetManifest()
+    manifest.load()
+    for logical in manifest.logical_paths():
+        print(f"{logical} -> {manifest.url(logical)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+# app/bulk_import.py
+# Import offline (paper / partner-collected) responses from a JSONL file, one response per line:
+#   {"user_id": "user1", "quiz_id": "bfi-10", "answers": {"bfi_1": 4, ...}, "date_taken": "2025-03-01T10:00:00Z", "id": "optional"}
+# Lines are decoded and scored exactly like POST /quiz/{quiz_id}/submit, in chunks fanned out
+# over a process pool, and written with one bulk_write per chunk:
+#   python -m app.bulk_import responses.jsonl [--workers 4] [--chunk-size 1000] [--ordered] [--errors errors.jsonl]
+# Every report is an upsert keyed on its id ($setOnInsert), so re-running an import never
+# duplicates anything. After each acknowledged chunk the byte offset of the next line is saved
+# to <file>.checkpoint.json; a rerun after a crash resumes there (--restart starts over).
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, Future
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Tuple, Iterator, Deque, TextIO
+
+import numpy as np
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from . import database
+from .answers import AnswerDecodeError, DecodedAnswers, get_answer_decoder, MAX_ANSWERS_PAYLOAD_BYTES
+from .export import parse_timestamp
+from .quizzes import CompiledQuiz, QuizRegistry, QUIZ_FILES
+from .report_views import build_report_document, UNSCORED_REPORT_SCORE
+from .scoring import get_scorer
+
+logger = logging.getLogger(__name__)
+
+IMPORT_CHUNK_SIZE: int = int(os.getenv("IMPORT_CHUNK_SIZE", "1000"))
+# A line holds the answers plus a few short fields; anything much larger is not a response.
+MAX_IMPORT_LINE_BYTES = 2 * MAX_ANSWERS_PAYLOAD_BYTES
+MAX_USER_ID_LENGTH = 128
+# Bytes hashed to recognise the input file when resuming from a checkpoint.
+FINGERPRINT_BYTES = 65536
+
+# Loaded in main() and again in each pool worker (_init_worker).
+quiz_registry = QuizRegistry(QUIZ_FILES)
+
+# (line number, raw line) in; (line number, report document or None, error or None) out.
+Chunk = List[Tuple[int, bytes]]
+LineResult = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+
+class ImportLineError(ValueError):
+    pass
+
+
+def import_report_id(user_id: str, quiz_id: str, answers: Dict[str, Any], date_taken: Any) -> str:
+    # Content-derived, so the same response imported twice (or from two files) maps to one report.
+    canonical = json.dumps([user_id, quiz_id, answers, date_taken], sort_keys=True, separators=(",", ":"), default=str)
+    return f"rep_{hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _parse_line(raw: bytes) -> Tuple[str, str, Dict[str, Any], Optional[datetime], Optional[str]]:
+    if len(raw) > MAX_IMPORT_LINE_BYTES:
+        raise ImportLineError(f"Line too long ({len(raw)} bytes, limit {MAX_IMPORT_LINE_BYTES}).")
+    try:
+        record = json.loads(raw)
+    except (ValueError, RecursionError) as e:
+        raise ImportLineError(f"Not valid JSON: {e}") from None
+    if not isinstance(record, dict):
+        raise ImportLineError("Line must be a JSON object.")
+    user_id, quiz_id, answers = record.get("user_id"), record.get("quiz_id"), record.get("answers")
+    if not isinstance(user_id, str) or not 0 < len(user_id) <= MAX_USER_ID_LENGTH:
+        raise ImportLineError(f"user_id must be a non-empty string of at most {MAX_USER_ID_LENGTH} characters.")
+    if not isinstance(quiz_id, str) or not quiz_id:
+        raise ImportLineError("quiz_id must be a non-empty string.")
+    if not isinstance(answers, dict):
+        raise ImportLineError("answers must be an object keyed by question id.")
+    report_id = record.get("id")
+    if report_id is not None and (not isinstance(report_id, str) or not report_id):
+        raise ImportLineError("id must be a non-empty string when given.")
+    raw_date = record.get("date_taken")
+    if raw_date is not None and not isinstance(raw_date, str):
+        raise ImportLineError("date_taken must be an ISO 8601 string when given.")
+    try:
+        date_taken = parse_timestamp(raw_date, "date_taken")
+    except ValueError as e:
+        raise ImportLineError(str(e)) from None
+    return user_id, quiz_id, answers, date_taken, report_id or import_report_id(user_id, quiz_id, answers, raw_date)
+
+
+def score_chunk(chunk: Chunk) -> List[LineResult]:
+    # Runs in a pool worker. Validation and decoding are per line; scoring is one matrix pass per quiz.
+    imported_at = datetime.utcnow()
+    errors: Dict[int, str] = {}
+    decoded_lines: List[Tuple[int, CompiledQuiz, str, str, DecodedAnswers, Optional[datetime]]] = []
+    for line_no, raw in chunk:
+        try:
+            user_id, quiz_id, answers, date_taken, report_id = _parse_line(raw)
+            quiz = quiz_registry.get(quiz_id)
+            if quiz is None:
+                raise ImportLineError(f"Unknown quiz_id {quiz_id[:64]!r}.")
+            decoded_lines.append((line_no, quiz, report_id, user_id, get_answer_decoder(quiz).decode(answers), date_taken))
+        except (ImportLineError, AnswerDecodeError) as e:
+            errors[line_no] = str(e)
+    by_quiz: Dict[str, List[int]] = {}
+    for position, line in enumerate(decoded_lines):
+        by_quiz.setdefault(line[1].id, []).append(position)
+    scores: Dict[int, Any] = {}
+    for positions in by_quiz.values():
+        scorer = get_scorer(decoded_lines[positions[0]][1])
+        if scorer is not None:
+            batch = scorer.score_values_batch(np.vstack([decoded_lines[p][4].values for p in positions]))
+            scores.update(zip(positions, batch))
+    documents = {
+        line_no: build_report_document(quiz, report_id, user_id, decoded.answers, scores.get(position, UNSCORED_REPORT_SCORE), date_taken or imported_at)
+        for position, (line_no, quiz, report_id, user_id, decoded, date_taken) in enumerate(decoded_lines)
+    }
+    return [(line_no, documents.get(line_no), errors.get(line_no)) for line_no, _ in chunk]
+
+
+def _init_worker() -> None:
+    quiz_registry.load()
+
+
+class _InlineExecutor(Executor):
+    # --workers 0: score in this process (small files, debugging).
+    def submit(self, fn, *args, **kwargs) -> Future:
+        future: Future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def file_fingerprint(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read(FINGERPRINT_BYTES)).hexdigest()
+
+
+def read_chunks(f, chunk_size: int, first_line: int) -> Iterator[Tuple[Chunk, int, int]]:
+    # (chunk, byte offset after it, number of the last line read); blank lines are skipped.
+    chunk: Chunk = []
+    line_no = last_yielded = first_line - 1
+    for raw in iter(f.readline, b""):
+        line_no += 1
+        raw = raw.strip()
+        if raw:
+            chunk.append((line_no, raw))
+        if len(chunk) >= chunk_size:
+            yield chunk, f.tell(), line_no
+            chunk, last_yielded = [], line_no
+    if line_no > last_yielded:  # trailing lines, possibly all blank
+        yield chunk, f.tell(), line_no
+
+
+class Checkpoint:
+    def __init__(self, path: Path, input_path: Path, fingerprint: str):
+        self.path = path
+        self.input_path = str(input_path.resolve())
+        self.fingerprint = fingerprint
+        self.offset = 0
+        self.line = 0
+        self.totals: Dict[str, int] = {"lines": 0, "imported": 0, "existing": 0, "invalid": 0, "failed": 0}
+
+    def load(self) -> bool:
+        if not self.path.is_file():
+            return False
+        state = json.loads(self.path.read_text())
+        if state.get("fingerprint") != self.fingerprint:
+            raise RuntimeError(f"Checkpoint {self.path} belongs to a different input file; use --restart to start over.")
+        self.offset, self.line = int(state["offset"]), int(state["line"])
+        self.totals.update(state.get("totals") or {})
+        return True
+
+    def save(self) -> None:
+        state = {"input": self.input_path, "fingerprint": self.fingerprint, "offset": self.offset, "line": self.line,
+                 "totals": self.totals, "updated_at": datetime.utcnow().isoformat() + "Z"}
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(state, indent=2))
+        os.replace(tmp, self.path)
+
+
+def write_chunk(collection, results: List[LineResult], ordered: bool) -> Tuple[int, int, List[Tuple[int, str]]]:
+    # Returns (newly imported, already present, [(line number, write error)]).
+    documents = [(line_no, document) for line_no, document, _ in results if document is not None]
+    if not documents:
+        return 0, 0, []
+    operations = [UpdateOne({"id": doc["id"]}, {"$setOnInsert": doc}, upsert=True) for _, doc in documents]
+    try:
+        result = collection.bulk_write(operations, ordered=ordered)
+        return result.upserted_count, result.matched_count, []
+    except BulkWriteError as e:
+        details = e.details or {}
+        errors = [(documents[err["index"]][0], err.get("errmsg", "write error")) for err in details.get("writeErrors", [])]
+        if ordered and errors:
+            # Everything after the first failure was not attempted.
+            first = errors[0][0]
+            errors += [(line_no, f"not written: ordered import stopped at line {first}") for line_no, _ in documents if line_no > first]
+        return details.get("nUpserted", details.get("upserted_count", 0)), details.get("nMatched", details.get("matched_count", 0)), errors
+
+
+def run_import(
+    path: Path, collection, workers: int, chunk_size: int, ordered: bool, checkpoint: Optional[Checkpoint],
+    errors_out: Optional[TextIO], dry_run: bool = False,
+) -> Dict[str, int]:
+    totals = checkpoint.totals if checkpoint is not None else {"lines": 0, "imported": 0, "existing": 0, "invalid": 0, "failed": 0}
+    offset, first_line = (checkpoint.offset, checkpoint.line + 1) if checkpoint is not None else (0, 1)
+    if offset:
+        logger.info("Resuming %s at line %s (byte %s).", path, first_line, offset)
+
+    def report(line_no: int, error: str, kind: str) -> None:
+        totals[kind] += 1
+        logger.warning("%s:%s: %s", path.name, line_no, error)
+        if errors_out is not None:
+            errors_out.write(json.dumps({"line": line_no, "error": error}) + "\n")
+
+    executor: Executor = (
+        ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        if workers > 0 else _InlineExecutor()
+    )
+    # Bounded read-ahead: at most two chunks per worker are in flight, so memory does not grow with the file.
+    in_flight: Deque[Tuple[Future, int, int]] = deque()
+    max_in_flight = max(1, 2 * workers)
+    with open(path, "rb") as f, executor:
+        f.seek(offset)
+        chunks = read_chunks(f, chunk_size, first_line)
+        exhausted = False
+        while in_flight or not exhausted:
+            while not exhausted and len(in_flight) < max_in_flight:
+                item = next(chunks, None)
+                if item is None:
+                    exhausted = True
+                else:
+                    chunk, end_offset, last_line = item
+                    in_flight.append((executor.submit(score_chunk, chunk), end_offset, last_line))
+            if not in_flight:
+                break
+            future, end_offset, last_line = in_flight.popleft()
+            results = future.result()
+            totals["lines"] += len(results)
+            for line_no, _, error in results:
+                if error is not None:
+                    report(line_no, error, "invalid")
+            if not dry_run:
+                # Chunks are written strictly in file order, so the checkpoint offset is always safe.
+                imported, existing, write_errors = write_chunk(collection, results, ordered)
+                totals["imported"] += imported
+                totals["existing"] += existing
+                for line_no, error in write_errors:
+                    report(line_no, error, "failed")
+                if ordered and write_errors:
+                    logger.error("Ordered import stopped at line %s; fix it and rerun to resume.", write_errors[0][0])
+                    for pending, _, _ in in_flight:
+                        pending.cancel()
+                    return totals
+                if checkpoint is not None:
+                    checkpoint.offset, checkpoint.line = end_offset, last_line
+                    checkpoint.save()
+            if errors_out is not None:
+                errors_out.flush()
+            logger.info("%s: through line %s: %s", path.name, last_line, totals)
+    return totals
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Import and score offline quiz responses from a JSONL file.")
+    parser.add_argument("input", type=Path)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Scoring processes (0 = score in this process).")
+    parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="Lines per scoring task and per bulk_write.")
+    parser.add_argument("--ordered", action="store_true", help="Ordered bulk writes; stop at the first write error.")
+    parser.add_argument("--errors", type=Path, help="Append per-line errors as JSONL to this file.")
+    parser.add_argument("--checkpoint", type=Path, help="Checkpoint file. Default: <input>.checkpoint.json")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start from the first line.")
+    parser.add_argument("--dry-run", action="store_true", help="Validate and score but do not write reports or a checkpoint.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), stream=sys.stderr)
+    if not args.input.is_file():
+        parser.error(f"{args.input} is not a file")
+
+    quiz_registry.load()
+    checkpoint: Optional[Checkpoint] = None
+    if not args.dry_run:
+        checkpoint = Checkpoint(args.checkpoint or args.input.with_name(args.input.name + ".checkpoint.json"), args.input, file_fingerprint(args.input))
+        try:
+            if not args.restart and checkpoint.load():
+                logger.info("Loaded checkpoint %s: %s", checkpoint.path, checkpoint.totals)
+        except (RuntimeError, ValueError, KeyError) as e:
+            logger.critical("Cannot resume: %s", e)
+            return 1
+        database.connect_to_mongo()
+        if database.reports_collection is None:
+            logger.critical("MongoDB is not available; nothing imported.")
+            return 1
+
+    errors_out = open(args.errors, "a", encoding="utf-8") if args.errors else None
+    try:
+        totals = run_import(
+            args.input, database.reports_collection, max(0, args.workers), max(1, args.chunk_size), args.ordered,
+            checkpoint, errors_out, args.dry_run,
+        )
+    except Exception as e:
+        logger.critical("Import aborted: %s. Rerun the same command to resume from the last checkpoint.", e)
+        return 1
+    finally:
+        if errors_out is not None:
+            errors_out.close()
+        database.close_mongo_connection()
+    logger.info("Import finished: %s%s.", totals, " (dry run)" if args.dry_run else "")
+    if totals["imported"] and not args.dry_run:
+        logger.info("Run `python -m app.norms rebuild` so percentiles include the imported reports and "
+                    "`python -m app.summaries rebuild` so dashboards do; running app workers pick them up "
+                    "for matching on their next start.")
+    return 0 if not totals["failed"] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,26 @@
 # app/database.py
 import os
+import asyncio
 import logging
-from typing import Optional
-from pymongo import MongoClient
+import base64
+import functools
+import itertools
+import random
+import sqlite3
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Callable, TypeVar, Tuple, Iterator, Sequence, AsyncIterator
+from pymongo import MongoClient, ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import ConnectionFailure, DuplicateKeyError
 from pymongo.database import Database
 from pymongo.collection import Collection
 from dotenv import load_dotenv
 
+from . import profiling
+from .storage import DASHBOARD_REPORT_PROJECTION, ReportStore, MongoReportStore, SQLiteReportStore
+from .metrics import DB_OPERATION_SECONDS, DB_OPERATION_ERRORS_TOTAL, DB_CIRCUIT_REJECTIONS_TOTAL
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
@@ -14,28 +28,157 @@ logger = logging.getLogger(__name__)
 MONGO_URI_FROM_ENV: Optional[str] = os.getenv("MONGO_URI")
 MONGO_DB_NAME_FROM_ENV: Optional[str] = os.getenv("MONGO_DB_NAME")
 MONGO_REPORTS_COLLECTION_FROM_ENV: Optional[str] = os.getenv("MONGO_REPORTS_COLLECTION")
+# One small document per quiz holding the population score histograms (see app/norms.py).
+MONGO_STATS_COLLECTION: str = os.getenv("MONGO_STATS_COLLECTION", "score_stats")
+MONGO_SUMMARIES_COLLECTION: str = os.getenv("MONGO_SUMMARIES_COLLECTION", "user_summaries")
+# Where reports are stored: "mongo", or "sqlite" for an embedded database file (see app/storage.py).
+STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "mongo").strip().lower()
+SQLITE_PATH: str = os.getenv("SQLITE_PATH", "mansematch.db")
+STORAGE_BACKENDS = ("mongo", "sqlite")
+
+# Connection pool / timeout tuning. pymongo calls are blocking, so every call made from a
+# request handler is offloaded to a dedicated, bounded thread pool (see run_db) whose size
+# follows the driver pool so threads never queue up waiting on a socket.
+MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", "20"))
+MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS: int = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+MONGO_EXECUTOR_WORKERS: int = int(os.getenv("MONGO_EXECUTOR_WORKERS", str(MONGO_MAX_POOL_SIZE)))
+# Upper bound (seconds) an awaiting handler waits for a DB call before giving up.
+MONGO_OPERATION_TIMEOUT_S: float = float(os.getenv("MONGO_OPERATION_TIMEOUT_S", "15"))
+# The app starts without waiting for MongoDB and connects in the background, retrying with
+# exponential backoff (plus jitter) between these bounds until it succeeds.
+MONGO_CONNECT_RETRY_BASE_S: float = float(os.getenv("MONGO_CONNECT_RETRY_BASE_S", "0.5"))
+MONGO_CONNECT_RETRY_MAX_S: float = float(os.getenv("MONGO_CONNECT_RETRY_MAX_S", "30"))
+# Circuit breaker: this many consecutive connection failures make DB calls fail fast for
+# MONGO_BREAKER_RESET_S, after which a single trial call decides whether to close it again.
+MONGO_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("MONGO_BREAKER_FAILURE_THRESHOLD", "5"))
+MONGO_BREAKER_RESET_S: float = float(os.getenv("MONGO_BREAKER_RESET_S", "10"))
+# /readyz pings MongoDB at most this often; probes in between reuse the last answer.
+READINESS_PING_INTERVAL_S: float = float(os.getenv("READINESS_PING_INTERVAL_S", "1"))
 
 mongo_client: Optional[MongoClient] = None
 db: Optional[Database] = None
 reports_collection: Optional[Collection] = None
+stats_collection: Optional[Collection] = None
+summaries_collection: Optional[Collection] = None
+report_store: Optional[ReportStore] = None
+db_executor: Optional[ThreadPoolExecutor] = None
+
+T = TypeVar("T")
+
+REPORT_INDEXES = [
+    # Serves the dashboard's keyset pagination: equality on user_id, then (date_taken, id) descending.
+    IndexModel([("user_id", ASCENDING), ("date_taken", DESCENDING), ("id", DESCENDING)], name="user_id_date_taken"),
+    IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+]
+
+
+class DatabaseUnavailableError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    """Fails DB calls fast while MongoDB is unreachable instead of letting each one time out.
+
+    closed -> open after `failure_threshold` consecutive connection failures; open -> half-open
+    once `reset_timeout` has passed; in half-open exactly one trial call goes through and its
+    outcome closes the breaker or re-opens it. Only touched from the event loop.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = MONGO_BREAKER_FAILURE_THRESHOLD, reset_timeout: float = MONGO_BREAKER_RESET_S):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        return self.HALF_OPEN if time.monotonic() - self._opened_at >= self.reset_timeout else self.OPEN
+
+    def retry_after(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            logger.info("MongoDB reachable again; circuit breaker closed.")
+        self.failures, self._opened_at, self._trial_in_flight = 0, None, False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._trial_in_flight or (self._opened_at is None and self.failures >= self.failure_threshold):
+            logger.error("Circuit breaker open after %s consecutive MongoDB failure(s); failing fast for %.0fs.", self.failures, self.reset_timeout)
+            self._opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        # The trial call ended without a verdict (e.g. cancelled); let the next one try.
+        self._trial_in_flight = False
+
+
+breaker = CircuitBreaker()
+_connect_cancelled = False
+_last_ping: Tuple[float, bool] = (float("-inf"), False)
+
+
+def is_connection_error(error: BaseException) -> bool:
+    # Errors that say "the database is unreachable" (rather than "this call was wrong"): they trip
+    # the breaker and map to 503 instead of 500. For SQLite that is a lock wait or I/O error.
+    return isinstance(error, (DatabaseUnavailableError, ConnectionFailure, asyncio.TimeoutError, sqlite3.OperationalError))
+
+
+def mongo_configured() -> bool:
+    return bool(MONGO_URI_FROM_ENV and MONGO_DB_NAME_FROM_ENV and MONGO_REPORTS_COLLECTION_FROM_ENV)
 
-def connect_to_mongo():
-    global mongo_client, db, reports_collection
+
+def redact_uri(uri: str) -> str:
+    if "@" in uri and ("mongodb://" in uri or "mongodb+srv://" in uri):
+        parts = uri.split("@", 1)
+        scheme_user_pass = parts[0].split("://", 1)
+        if len(scheme_user_pass) == 2:
+            scheme, user_pass_str = scheme_user_pass
+            if ":" in user_pass_str:
+                user = user_pass_str.split(":", 1)[0]
+                return f"{scheme}://{user}:<PASSWORD>@{parts[1]}"
+            return f"{scheme}://<USER>@{parts[1]}"
+    return uri
+
+
+def connect_to_mongo() -> bool:
+    # Blocking (one ping, up to serverSelectionTimeoutMS). CLIs call it directly; the app runs
+    # it on a worker thread through connect_with_retry(). Returns whether the DB is connected.
+    global mongo_client, db, reports_collection, stats_collection, summaries_collection, report_store
 
     if reports_collection is not None:
         logger.debug("MongoDB connection already established.")
-        return
+        return True
 
     # Use the module-level variables
     current_mongo_uri = MONGO_URI_FROM_ENV
     current_mongo_db_name = MONGO_DB_NAME_FROM_ENV
     current_mongo_reports_collection = MONGO_REPORTS_COLLECTION_FROM_ENV
 
-    # --- Enhanced Logging ---
-    logger.info(f"Raw MONGO_URI from env (repr): {repr(current_mongo_uri)}")
-    logger.info(f"Raw MONGO_DB_NAME from env (repr): {repr(current_mongo_db_name)}")
-    logger.info(f"Raw MONGO_REPORTS_COLLECTION from env (repr): {repr(current_mongo_reports_collection)}")
-    # --- End Enhanced Logging ---
+    # The URI itself is only ever logged redacted: it carries the credentials.
+    logger.info("MONGO_DB_NAME from env (repr): %r", current_mongo_db_name)
+    logger.info("MONGO_REPORTS_COLLECTION from env (repr): %r", current_mongo_reports_collection)
 
     if not current_mongo_uri or not current_mongo_db_name or not current_mongo_reports_collection:
         logger.critical(
@@ -44,55 +187,359 @@ def connect_to_mongo():
         if not current_mongo_uri: logger.warning("MONGO_URI is missing or empty in environment.")
         if not current_mongo_db_name: logger.warning("MONGO_DB_NAME is missing or empty in environment.")
         if not current_mongo_reports_collection: logger.warning("MONGO_REPORTS_COLLECTION is missing or empty in environment.")
-        return
+        return False
 
     # Defensive stripping of whitespace from URI
     # This is a good practice regardless of the current issue.
     effective_mongo_uri = current_mongo_uri.strip()
+    log_uri_display = redact_uri(effective_mongo_uri)
     if effective_mongo_uri != current_mongo_uri:
-        logger.warning(f"MONGO_URI had leading/trailing whitespace. Original (repr): {repr(current_mongo_uri)}, Stripped (repr): {repr(effective_mongo_uri)}")
-    else:
-        logger.info("MONGO_URI has no leading/trailing whitespace detected by strip().")
-
+        logger.warning("MONGO_URI had leading/trailing whitespace. Stripped (redacted): %r", log_uri_display)
 
     try:
-        log_uri_display = effective_mongo_uri # Use the stripped URI for display logic
-        if "@" in log_uri_display and ("mongodb://" in log_uri_display or "mongodb+srv://" in log_uri_display):
-            parts = log_uri_display.split("@", 1)
-            scheme_user_pass = parts[0].split("://", 1)
-            if len(scheme_user_pass) == 2:
-                scheme, user_pass_str = scheme_user_pass
-                if ":" in user_pass_str:
-                    user = user_pass_str.split(":", 1)[0]
-                    log_uri_display = f"{scheme}://{user}:<PASSWORD>@{parts[1]}"
-                else:
-                    log_uri_display = f"{scheme}://<USER>@{parts[1]}"
-
-        logger.info(f"Attempting to connect to MongoDB. Obfuscated URI for log: '{log_uri_display}', DB: '{current_mongo_db_name}'")
+        logger.info("Attempting to connect to MongoDB. Obfuscated URI for log: '%s', DB: '%s'", log_uri_display, current_mongo_db_name)
 
         # Use the potentially stripped URI for connection
-        mongo_client = MongoClient(effective_mongo_uri, serverSelectionTimeoutMS=5000)
+        mongo_client = MongoClient(
+            effective_mongo_uri,
+            maxPoolSize=MONGO_MAX_POOL_SIZE, minPoolSize=MONGO_MIN_POOL_SIZE,
+            serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS, socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+            waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        )
         mongo_client.admin.command('ping')
+        if _connect_cancelled:
+            raise DatabaseUnavailableError("Application shut down while connecting.")
 
         db = mongo_client[current_mongo_db_name]
         reports_collection = db[current_mongo_reports_collection]
+        stats_collection = db[MONGO_STATS_COLLECTION]
+        summaries_collection = db[MONGO_SUMMARIES_COLLECTION]
+        ensure_indexes(reports_collection)
+        report_store = MongoReportStore(reports_collection)
+        _ensure_executor()
 
         logger.info(
-            f"Successfully connected to MongoDB. Database: {current_mongo_db_name}, "
-            f"Collection: {current_mongo_reports_collection}"
+            "Successfully connected to MongoDB. Database: %s, Collection: %s", current_mongo_db_name, current_mongo_reports_collection
         )
+        return True
     except Exception as e:
-        # Log the repr of the URI that actually caused the failure
-        logger.error(f"Failed to connect to MongoDB. URI used for connection (repr): {repr(effective_mongo_uri)}. Error: {e}. MongoDB integration will be disabled.")
+        logger.error("Failed to connect to MongoDB at %r: %s", log_uri_display, e)
+        if mongo_client is not None:
+            mongo_client.close()  # stop its monitor threads; the next attempt builds a new client
         mongo_client = None
         db = None
         reports_collection = None
+        stats_collection = None
+        summaries_collection = None
+        report_store = None
+        return False
+
+
+def open_sqlite_store(path: str = SQLITE_PATH) -> bool:
+    # Blocking; a bad path or a corrupt file is a configuration error, so there is no retry.
+    global report_store
+    if report_store is not None:
+        return True
+    try:
+        store = SQLiteReportStore(path)
+    except (sqlite3.Error, OSError) as e:
+        logger.critical("Failed to open SQLite report store at %r: %s", path, e)
+        return False
+    if _connect_cancelled:
+        store.close()
+        return False
+    report_store = store
+    _ensure_executor()
+    logger.info("Using SQLite report store at %r (score norms and dashboard summaries need MongoDB and are off).", path)
+    return True
+
+
+async def connect_with_retry(base_delay: float = MONGO_CONNECT_RETRY_BASE_S, max_delay: float = MONGO_CONNECT_RETRY_MAX_S) -> bool:
+    # Keeps calling connect_to_mongo() on a worker thread until it succeeds; False when MongoDB
+    # is not configured at all. Meanwhile is_available() is False and DB routes answer 503.
+    global _connect_cancelled
+    _connect_cancelled = False
+    if STORAGE_BACKEND == "sqlite":
+        return await asyncio.to_thread(open_sqlite_store)
+    if STORAGE_BACKEND != "mongo":
+        logger.critical("Unknown STORAGE_BACKEND %r; expected one of %s. Storage is disabled.", STORAGE_BACKEND, ", ".join(STORAGE_BACKENDS))
+        return False
+    if not mongo_configured():
+        connect_to_mongo()  # logs what is missing
+        return False
+    attempt = 0
+    try:
+        while not await asyncio.to_thread(connect_to_mongo):
+            delay = min(max_delay, base_delay * (2 ** attempt)) * random.uniform(0.5, 1.0)
+            attempt += 1
+            logger.warning("MongoDB not reachable (attempt %s); retrying in %.1fs.", attempt, delay)
+            await asyncio.sleep(delay)
+    except asyncio.CancelledError:
+        _connect_cancelled = True  # an attempt still running on its thread discards its client
+        raise
+    breaker.record_success()
+    return True
 
 def close_mongo_connection():
-    global mongo_client, db, reports_collection # Added db and reports_collection here
+    global mongo_client, db, reports_collection, stats_collection, summaries_collection, report_store, db_executor, _last_ping, _connect_cancelled # Added db and reports_collection here
+    _last_ping = (float("-inf"), False)
+    _connect_cancelled = True  # a background connect attempt finishing after this discards its client
+    if db_executor is not None:
+        db_executor.shutdown(wait=True)
+        db_executor = None
+    if report_store is not None:
+        report_store.close()
+        report_store = None
     if mongo_client:
         mongo_client.close()
         mongo_client = None
         db = None # Reset db
         reports_collection = None # Reset reports_collection
+        stats_collection = None
+        summaries_collection = None
         logger.info("MongoDB connection closed.")
+
+
+def _ensure_executor() -> ThreadPoolExecutor:
+    global db_executor
+    if db_executor is None:
+        db_executor = ThreadPoolExecutor(max_workers=max(1, MONGO_EXECUTOR_WORKERS), thread_name_prefix="mongo")
+    return db_executor
+
+
+def is_available() -> bool:
+    # Connected and not failing fast. A half-open breaker counts as available: the next call is its trial.
+    return report_store is not None and breaker.state != CircuitBreaker.OPEN
+
+
+def connection_state() -> str:
+    if report_store is not None:
+        return "connected"
+    if STORAGE_BACKEND == "sqlite":
+        return "connecting"
+    return "connecting" if STORAGE_BACKEND == "mongo" and mongo_configured() else "disabled"
+
+
+async def run_db(operation: str, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    # Run a blocking pymongo call on the DB thread pool so the event loop stays free.
+    # `operation` names the call site for the latency metrics. Raises DatabaseUnavailableError
+    # without touching the pool while the circuit breaker is open.
+    if not breaker.allow():
+        DB_CIRCUIT_REJECTIONS_TOTAL.inc(operation)
+        raise DatabaseUnavailableError(f"MongoDB circuit breaker is open (retry in {breaker.retry_after():.0f}s).")
+    loop = asyncio.get_running_loop()
+    call = functools.partial(fn, *args, **kwargs)
+    started = time.perf_counter()
+    try:
+        result = await asyncio.wait_for(loop.run_in_executor(_ensure_executor(), call), timeout=MONGO_OPERATION_TIMEOUT_S)
+    except asyncio.CancelledError:
+        breaker.release_trial()
+        raise
+    except Exception as e:
+        DB_OPERATION_ERRORS_TOTAL.inc(operation)
+        # Anything but a connection error (a duplicate key, a bad query) still proves the server answered.
+        if is_connection_error(e):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        DB_OPERATION_SECONDS.observe(elapsed, operation)
+        profiling.record("db", elapsed)
+    breaker.record_success()
+    return result
+
+
+async def check_readiness() -> Dict[str, Any]:
+    # Backs /readyz: connected, breaker not open, and a ping answered within the last READINESS_PING_INTERVAL_S.
+    global _last_ping
+    state = {"db": connection_state(), "breaker": breaker.state}
+    ready = False
+    if state["db"] == "connected" and state["breaker"] != CircuitBreaker.OPEN:
+        checked_at, ready = _last_ping
+        if time.monotonic() - checked_at >= READINESS_PING_INTERVAL_S:
+            store = report_store
+            try:
+                ready = store is not None and await run_db("readyz_ping", store.ping)
+            except Exception as e:
+                logger.warning("Readiness ping failed: %s", e)
+                ready = False
+            _last_ping = (time.monotonic(), ready)
+            state["breaker"] = breaker.state
+    state["ready"] = ready
+    return state
+
+
+def _require_report_store() -> ReportStore:
+    if report_store is None:
+        raise DatabaseUnavailableError("Report storage is not available.")
+    return report_store
+
+
+def ensure_indexes(collection: Collection) -> None:
+    # create_indexes is a no-op for indexes that already exist with the same spec.
+    try:
+        created = collection.create_indexes(REPORT_INDEXES)
+        logger.info("Ensured indexes on '%s': %s", collection.name, created)
+    except Exception as e:
+        logger.error("Failed to ensure indexes on '%s': %s", collection.name, e)
+
+
+def encode_page_cursor(date_taken: datetime, report_id: str) -> str:
+    raw = f"{date_taken.isoformat()}|{report_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_page_cursor(cursor: str) -> Tuple[datetime, str]:
+    # Raises ValueError on anything that is not a cursor we produced.
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        date_str, report_id = raw.split("|", 1)
+        return datetime.fromisoformat(date_str), report_id
+    except (UnicodeError, ValueError) as e:
+        raise ValueError(f"Invalid page cursor: {cursor!r}") from e
+
+
+async def find_user_reports_page(
+    user_id: str, limit: int, after: Optional[Tuple[datetime, str]] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    # Keyset pagination over (date_taken desc, id desc); returns the page and the cursor for the next one.
+    store = _require_report_store()
+    docs = await run_db("dashboard_find", store.find_user_reports, user_id, limit + 1, after)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        if last.get("date_taken") is not None and last.get("id"):
+            next_cursor = encode_page_cursor(last["date_taken"], last["id"])
+    return docs, next_cursor
+
+
+async def find_all_user_reports(user_id: str, batch_size: int = 500) -> List[Dict[str, Any]]:
+    # Dashboard fields of every report the user has, newest first, read one keyset page at a time.
+    store = _require_report_store()
+    reports: List[Dict[str, Any]] = []
+    after: Optional[Tuple[datetime, str]] = None
+    while True:
+        page = await run_db("summary_seed_find", store.find_user_reports, user_id, batch_size, after)
+        reports.extend(page)
+        if len(page) < batch_size:
+            return reports
+        after = (page[-1]["date_taken"], page[-1]["id"])
+
+
+async def find_latest_report_date(user_id: str) -> Optional[datetime]:
+    # An index-only lookup; used to validate cached dashboards cheaply.
+    store = _require_report_store()
+    return await run_db("dashboard_latest_find_one", store.find_latest_report_date, user_id)
+
+
+async def find_report(report_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+    store = _require_report_store()
+    return await run_db("report_find_one", store.find_report, report_id, user_id)
+
+
+async def insert_report(report_doc: Dict[str, Any]) -> Any:
+    store = _require_report_store()
+    return await run_db("submit_insert_one", store.insert_report, report_doc)
+
+
+async def insert_reports(report_docs: List[Dict[str, Any]]) -> List[Any]:
+    store = _require_report_store()
+    return await run_db("submit_insert_many", store.insert_reports, report_docs)
+
+
+def iter_report_scores(quiz_ids: Sequence[str], batch_size: int) -> Iterator[Dict[str, Any]]:
+    # Blocking generator over every scored report (run it on a worker thread); feeds bulk loads.
+    cursor = open_reports_cursor(
+        {"quiz_id": {"$in": list(quiz_ids)}}, {"_id": 0, "user_id": 1, "quiz_id": 1, "score": 1, "date_taken": 1}, batch_size
+    )
+    try:
+        yield from cursor
+    finally:
+        cursor.close()
+
+
+def open_reports_cursor(query: Dict[str, Any], projection: Dict[str, Any], batch_size: int):
+    # Lazy: nothing is read until the first batch is fetched.
+    return _require_report_store().open_cursor(query, projection, batch_size)
+
+
+async def iter_report_batches(query: Dict[str, Any], projection: Dict[str, Any], batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    # Streams matching reports one cursor batch at a time, each fetch on the DB thread pool, so
+    # at most one batch is held in memory however many documents match.
+    cursor = open_reports_cursor(query, projection, batch_size)
+    documents = iter(cursor)
+    try:
+        while True:
+            batch = await run_db("export_fetch", lambda: list(itertools.islice(documents, batch_size)))
+            if not batch:
+                return
+            yield batch
+    finally:
+        # No-timeout cursors must be closed explicitly, also when the client disconnects mid-stream.
+        _ensure_executor().submit(cursor.close)
+
+
+def _require_stats_collection() -> Collection:
+    if stats_collection is None:
+        raise DatabaseUnavailableError("Stats collection is not available.")
+    return stats_collection
+
+
+async def increment_score_stats(quiz_id: str, increments: Dict[str, int]) -> bool:
+    # A single atomic $inc on the quiz's stats document; upserts it for the first report.
+    # False when score norms are off (reports not stored in MongoDB).
+    if stats_collection is None and report_store is not None:
+        return False
+    collection = _require_stats_collection()
+    await run_db(
+        "submit_stats_inc", collection.update_one, {"_id": quiz_id},
+        {"$inc": increments, "$set": {"updated_at": datetime.utcnow()}}, upsert=True
+    )
+    return True
+
+
+async def find_score_stats() -> List[Dict[str, Any]]:
+    collection = _require_stats_collection()
+    return await run_db("norms_stats_find", lambda: list(collection.find({})))
+
+
+def _require_summaries_collection() -> Collection:
+    if summaries_collection is None:
+        raise DatabaseUnavailableError("Summaries collection is not available.")
+    return summaries_collection
+
+
+async def update_user_summary(user_id: str, report_id: str, update: Dict[str, Any]) -> bool:
+    # Applies a submit's update to the user's existing summary document (see app/summaries.py).
+    # Never upserts: a summary created from one report would hide everything stored before it.
+    # Guarded on recent.id, so a report a concurrent seed already counted is not counted twice.
+    # False when there was nothing to update; True (a no-op) without MongoDB.
+    if summaries_collection is None and report_store is not None:
+        return True
+    collection = _require_summaries_collection()
+    result = await run_db(
+        "submit_summary_update", collection.update_one, {"_id": user_id, "recent.id": {"$ne": report_id}}, update
+    )
+    return result.matched_count > 0
+
+
+async def insert_user_summary(summary: Dict[str, Any]) -> bool:
+    # False when another request created the user's summary first.
+    collection = _require_summaries_collection()
+    try:
+        await run_db("submit_summary_seed", collection.insert_one, summary)
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+async def find_user_summary(user_id: str) -> Optional[Dict[str, Any]]:
+    # Point read on _id; None for users without a summary yet (no reports, or not backfilled).
+    if summaries_collection is None and report_store is not None:
+        return None
+    collection = _require_summaries_collection()
+    return await run_db("dashboard_summary_find_one", collection.find_one, {"_id": user_id})
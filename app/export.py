@@ -0,0 +1,254 @@
+# app/export.py
+# Bulk export of stored reports for offline research, as NDJSON or CSV, optionally gzipped.
+# Documents stream from a batched cursor straight into the encoder, so memory stays at one
+# batch whatever the export size. Served by GET /export/reports (Bearer EXPORT_TOKEN) and:
+#   python -m app.export [--format csv] [--quiz-id bfi-10] [--since 2025-01-01] [--output reports.csv.gz]
+import argparse
+import asyncio
+import csv
+import hmac
+import io
+import json
+import logging
+import os
+import sys
+import zlib
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Iterable, AsyncIterator, Tuple, BinaryIO
+
+from . import database
+
+logger = logging.getLogger(__name__)
+
+# Bearer token required by GET /export/reports; unset disables the endpoint (reports hold every user's answers).
+EXPORT_TOKEN: Optional[str] = os.getenv("EXPORT_TOKEN") or None
+EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_GZIP_LEVEL: int = int(os.getenv("EXPORT_GZIP_LEVEL", "6"))
+
+EXPORT_FORMATS: Dict[str, Tuple[str, str]] = {  # format -> (media type, file extension)
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+}
+# Top-level report fields that may be exported; nested values are selected with dots, e.g. score.Openness.
+EXPORTABLE_FIELDS = (
+    "id", "user_id", "quiz_id", "quiz_title", "report_type", "date_taken", "score", "answers_submitted", "scoring_version",
+)
+DEFAULT_EXPORT_FIELDS = ("id", "user_id", "quiz_id", "date_taken", "score")
+
+
+class ExportRequestError(ValueError):
+    """Bad export parameters; maps to HTTP 422 / a CLI usage error."""
+
+
+def is_export_authorized(authorization: Optional[str]) -> bool:
+    # The Authorization header is "Bearer <EXPORT_TOKEN>"; constant-time, like profiling.is_operator.
+    return (authorization is not None and EXPORT_TOKEN is not None
+            and hmac.compare_digest(authorization.encode("utf-8"), f"Bearer {EXPORT_TOKEN}".encode("utf-8")))
+
+
+def parse_fields(spec: Optional[str]) -> List[str]:
+    if not spec:
+        return list(DEFAULT_EXPORT_FIELDS)
+    fields: List[str] = []
+    for field in (part.strip() for part in spec.split(",")):
+        if not field or field in fields:
+            continue
+        if field.split(".", 1)[0] not in EXPORTABLE_FIELDS:
+            raise ExportRequestError(f"Unknown field {field!r}; exportable fields are {', '.join(EXPORTABLE_FIELDS)}.")
+        fields.append(field)
+    if not fields:
+        raise ExportRequestError("No fields selected.")
+    return fields
+
+
+def parse_timestamp(value: Optional[str], name: str) -> Optional[datetime]:
+    # ISO date or datetime; aware values are converted to naive UTC like the stored date_taken.
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        raise ExportRequestError(f"{name} must be an ISO 8601 date or datetime, got {value[:40]!r}.") from None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def build_export_query(quiz_id: Optional[str] = None, user_id: Optional[str] = None,
+                       since: Optional[datetime] = None, until: Optional[datetime] = None) -> Dict[str, Any]:
+    # `since` is inclusive, `until` exclusive.
+    query: Dict[str, Any] = {}
+    if quiz_id:
+        query["quiz_id"] = quiz_id
+    if user_id:
+        query["user_id"] = user_id
+    date_range: Dict[str, datetime] = {}
+    if since is not None:
+        date_range["$gte"] = since
+    if until is not None:
+        date_range["$lt"] = until
+    if since is not None and until is not None and since >= until:
+        raise ExportRequestError("since must be earlier than until.")
+    if date_range:
+        query["date_taken"] = date_range
+    return query
+
+
+def export_projection(fields: Iterable[str]) -> Dict[str, int]:
+    projection = {"_id": 0}
+    projection.update({field.split(".", 1)[0]: 1 for field in fields})
+    return projection
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)  # ObjectId and other BSON types
+
+
+class ExportEncoder:
+    """Turns batches of report documents into output bytes, optionally as one gzip stream.
+
+    Not thread-safe, but may be driven from a different thread per batch.
+    """
+
+    def __init__(self, fmt: str, fields: List[str], compress: bool = False):
+        if fmt not in EXPORT_FORMATS:
+            raise ExportRequestError(f"Unknown format {fmt!r}; expected one of {', '.join(EXPORT_FORMATS)}.")
+        self.format = fmt
+        self.fields = fields
+        self.compress = compress
+        self._paths = [field.split(".") for field in fields]
+        self._gzip = zlib.compressobj(EXPORT_GZIP_LEVEL, zlib.DEFLATED, 31) if compress else None
+        self.rows = 0
+
+    @property
+    def media_type(self) -> str:
+        return "application/gzip" if self.compress else EXPORT_FORMATS[self.format][0]
+
+    def filename(self, stem: str) -> str:
+        return f"{stem}.{EXPORT_FORMATS[self.format][1]}" + (".gz" if self.compress else "")
+
+    def _values(self, doc: Dict[str, Any]) -> List[Any]:
+        values = []
+        for path in self._paths:
+            value: Any = doc
+            for part in path:
+                value = value.get(part) if isinstance(value, dict) else None
+            values.append(value)
+        return values
+
+    def _output(self, data: bytes) -> bytes:
+        return self._gzip.compress(data) if self._gzip is not None else data
+
+    def header(self) -> bytes:
+        if self.format != "csv":
+            return b""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(self.fields)
+        return self._output(buffer.getvalue().encode("utf-8"))
+
+    def encode(self, docs: List[Dict[str, Any]]) -> bytes:
+        self.rows += len(docs)
+        if self.format == "ndjson":
+            lines = [
+                json.dumps(dict(zip(self.fields, self._values(doc))), default=_json_default, ensure_ascii=False, separators=(",", ":"))
+                for doc in docs
+            ]
+            return self._output(("\n".join(lines) + "\n").encode("utf-8") if lines else b"")
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for doc in docs:
+            writer.writerow([_csv_cell(value) for value in self._values(doc)])
+        return self._output(buffer.getvalue().encode("utf-8"))
+
+    def finish(self) -> bytes:
+        return self._gzip.flush() if self._gzip is not None else b""
+
+
+def _csv_cell(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=_json_default, ensure_ascii=False, separators=(",", ":"))
+    return value
+
+
+async def stream_export(query: Dict[str, Any], encoder: ExportEncoder, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    # Body of the streaming response. The next batch is only fetched once the previous chunk
+    # was sent, so a slow client holds back the cursor instead of filling memory.
+    header = encoder.header()
+    if header:
+        yield header
+    async for batch in database.iter_report_batches(query, export_projection(encoder.fields), batch_size):
+        # Encoding (and gzip) of a full batch is a few ms of CPU; keep it off the event loop.
+        chunk = await asyncio.to_thread(encoder.encode, batch)
+        if chunk:
+            yield chunk
+    tail = encoder.finish()
+    if tail:
+        yield tail
+    logger.info("Export finished: %s report(s) as %s%s.", encoder.rows, encoder.format, " (gzip)" if encoder.compress else "")
+
+
+def write_export(store, query: Dict[str, Any], encoder: ExportEncoder, output: BinaryIO, batch_size: int) -> int:
+    # Blocking counterpart of stream_export for the CLI; `store` is a storage.ReportStore.
+    output.write(encoder.header())
+    cursor = store.open_cursor(query, export_projection(encoder.fields), batch_size)
+    batch: List[Dict[str, Any]] = []
+    try:
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                output.write(encoder.encode(batch))
+                batch = []
+        output.write(encoder.encode(batch))
+    finally:
+        cursor.close()
+    output.write(encoder.finish())
+    return encoder.rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export stored quiz reports as NDJSON or CSV.")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--fields", help=f"Comma-separated fields (dots select nested values). Default: {','.join(DEFAULT_EXPORT_FIELDS)}.")
+    parser.add_argument("--quiz-id")
+    parser.add_argument("--user-id")
+    parser.add_argument("--since", help="ISO date/datetime, inclusive.")
+    parser.add_argument("--until", help="ISO date/datetime, exclusive.")
+    parser.add_argument("--gzip", action="store_true", help="Compress the output (implied by an --output ending in .gz).")
+    parser.add_argument("--output", default="-", help="File to write, or - for stdout.")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), stream=sys.stderr)
+
+    try:
+        query = build_export_query(args.quiz_id, args.user_id, parse_timestamp(args.since, "--since"), parse_timestamp(args.until, "--until"))
+        encoder = ExportEncoder(args.format, parse_fields(args.fields), args.gzip or args.output.endswith(".gz"))
+    except ExportRequestError as e:
+        parser.error(str(e))
+
+    if database.STORAGE_BACKEND == "sqlite":
+        database.open_sqlite_store()
+    else:
+        database.connect_to_mongo()
+    if database.report_store is None:
+        logger.critical("Report storage is not available; nothing to export.")
+        return 1
+    try:
+        if args.output == "-":
+            rows = write_export(database.report_store, query, encoder, sys.stdout.buffer, max(1, args.batch_size))
+        else:
+            with open(args.output, "wb") as output:
+                rows = write_export(database.report_store, query, encoder, output, max(1, args.batch_size))
+    finally:
+        database.close_mongo_connection()
+    logger.info("Exported %s report(s) to %s.", rows, args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
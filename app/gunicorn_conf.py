@@ -0,0 +1,97 @@
+# app/gunicorn_conf.py
+# Production server: gunicorn supervising uvicorn workers, one per available CPU.
+#   gunicorn -c python:app.gunicorn_conf app.main:app
+# The app is imported once in the master (preload) and forked, so module-level work (static
+# assets, the Jinja environment) is shared copy-on-write. Each worker then runs the lifespan:
+# quiz registry, template precompile (app/warmup.py) and the background DB connect, and only
+# accepts connections once that startup finished. SIGTERM stops accepting, lets in-flight
+# requests and the submission pipeline drain for up to GRACEFUL_TIMEOUT_S, then exits.
+# Limits like MONGO_MAX_POOL_SIZE and the admission gates apply per worker.
+# Other per-worker state, and how more than one worker copes with it:
+#  * the write-behind buffer (SUBMISSION_PIPELINE_ENABLED) only exists in the worker that took
+#    the submit, so the redirect to the new report could 404 on a sibling: the pipeline forces a
+#    single worker;
+#  * metrics: each worker writes its own to METRICS_MULTIPROC_DIR and /metrics serves them all,
+#    labelled worker="<pid>" (aggregate with sum without (worker));
+#  * score norms re-read the shared stats documents every NORMS_REFRESH_S;
+#  * the matching index sees other workers' submissions only after a reload, every MATCH_RELOAD_S.
+import logging
+import math
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+load_dotenv()  # as app.database does, before any app module reads its settings
+from app.submissions import SUBMISSION_PIPELINE_ENABLED  # noqa: E402
+
+logger = logging.getLogger("gunicorn.error")
+
+
+def available_cpus() -> int:
+    # CPUs this process may run on, capped by a cgroup v2 CPU quota (containers).
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not on Linux
+        cpus = os.cpu_count() or 1
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()[:2]
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+# Async workers: one per core is enough to use it; WEB_CONCURRENCY overrides.
+workers = int(os.getenv("WEB_CONCURRENCY") or available_cpus())
+requested_workers = workers
+if SUBMISSION_PIPELINE_ENABLED:
+    workers = 1
+_own_metrics_dir = None
+if workers > 1:
+    # Read by the app at import, which (preload) happens after this file runs.
+    if not os.environ.get("METRICS_MULTIPROC_DIR"):
+        _own_metrics_dir = os.environ["METRICS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="mansematch-metrics-")
+    os.environ.setdefault("MATCH_RELOAD_S", "600")
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+# Seconds a worker gets after SIGTERM to finish requests and drain before it is killed.
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT_S", "30"))
+# A worker silent for this long (blocked event loop) is restarted.
+timeout = int(os.getenv("WORKER_TIMEOUT_S", "60"))
+keepalive = int(os.getenv("KEEPALIVE_S", "5"))
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+
+def on_starting(server) -> None:
+    # Snapshots left by a previous master would be served as live workers.
+    directory = os.environ.get("METRICS_MULTIPROC_DIR")
+    if directory and os.path.isdir(directory):
+        for entry in os.listdir(directory):
+            if entry.endswith((".prom", ".tmp")):
+                os.remove(os.path.join(directory, entry))
+
+
+def child_exit(server, worker) -> None:
+    directory = os.environ.get("METRICS_MULTIPROC_DIR")
+    if directory:
+        from app.metrics import remove_snapshot
+        remove_snapshot(directory, worker.pid)
+
+
+def on_exit(server) -> None:
+    if _own_metrics_dir:
+        shutil.rmtree(_own_metrics_dir, ignore_errors=True)
+
+
+def when_ready(server) -> None:
+    if workers < requested_workers:
+        logger.warning(
+            "SUBMISSION_PIPELINE_ENABLED: running 1 worker instead of %s; the write-behind buffer is per process.",
+            requested_workers,
+        )
+    logger.info("Serving on %s with %s worker(s), graceful timeout %ss.", bind, workers, graceful_timeout)
@@ -0,0 +1,69 @@
+# app/http_cache.py
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from pathlib import Path
+from typing import Optional, Any
+
+from fastapi import Request, Response
+
+# Pages are per-user, so only the browser may keep them, and it must revalidate every time.
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def fingerprint_directory(directory: Path, pattern: str = "*") -> str:
+    # Content hash over every file under `directory`; changes whenever a template is edited or deployed.
+    digest = hashlib.sha256()
+    for path in sorted(p for p in directory.rglob(pattern) if p.is_file()):
+        digest.update(str(path.relative_to(directory)).encode("utf-8"))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def make_etag(*parts: Any) -> str:
+    raw = "|".join("" if p is None else str(p) for p in parts)
+    return '"' + hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    # If-None-Match uses the weak comparison function (RFC 9110 13.1.2). "*" never matches: the
+    # routes check it before looking the resource up, and a 304 must not vouch for a report that
+    # does not exist or belongs to someone else. A full 200 is always a correct answer to it.
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    wanted = _opaque(etag)
+    return any(_opaque(candidate) == wanted for candidate in header.split(","))
+
+
+def http_date(value: datetime) -> str:
+    # Stored datetimes are naive UTC (datetime.utcnow / pymongo default).
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def set_validators(response: Response, etag: str, last_modified: Optional[datetime] = None, cache_control: str = PRIVATE_REVALIDATE) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def not_modified(etag: str, last_modified: Optional[datetime] = None, cache_control: str = PRIVATE_REVALIDATE) -> Response:
+    return set_validators(Response(status_code=304), etag, last_modified, cache_control)
+
+
+def add_vary(response: Response, *headers: str) -> Response:
+    # Merge into any existing Vary so shared caches key on every header the body depends on.
+    present = [v.strip() for v in response.headers.get("vary", "").split(",") if v.strip()]
+    lowered = {v.lower() for v in present}
+    present.extend(h for h in headers if h.lower() not in lowered)
+    response.headers["Vary"] = ", ".join(present)
+    return response
@@ -0,0 +1,165 @@
+# app/logging_setup.py
+# Request handlers only enqueue log records: a QueueHandler on the root logger hands them to a
+# QueueListener thread, which does the %-formatting and the stdout write. Call sites pass lazy
+# %-style arguments, so nothing is formatted for disabled levels or dropped records. Repeated
+# DEBUG/INFO/WARNING messages (same logger, level and format string) are rate-limited and then
+# sampled, so a burst of e.g. per-submission warnings costs a bounded number of lines. ERROR and
+# CRITICAL records are never sampled.
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, Dict, Tuple
+
+LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO").upper()
+# "text" (the historical single-line format) or "json" (one object per line, for log shippers).
+LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text").lower()
+# Records waiting for the writer thread; beyond this they are dropped (and counted) rather than blocking.
+LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# Per message template: the first LOG_RATE_LIMIT_BURST records of each window pass, then 1 in LOG_SAMPLE_EVERY.
+LOG_RATE_LIMIT_WINDOW_S: float = float(os.getenv("LOG_RATE_LIMIT_WINDOW_S", "60"))
+LOG_RATE_LIMIT_BURST: int = int(os.getenv("LOG_RATE_LIMIT_BURST", "20"))
+LOG_SAMPLE_EVERY: int = int(os.getenv("LOG_SAMPLE_EVERY", "100"))
+
+TEXT_FORMAT = '%(asctime)s.%(msecs)03dZ [%(process)d:%(thread)d] %(levelname)-5s [%(name)s] %(module)s.%(funcName)s: %(message)s'
+TEXT_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+            "level": record.levelname, "logger": record.name, "func": f"{record.module}.{record.funcName}",
+            "msg": record.getMessage(), "process": record.process, "thread": record.thread,
+        }
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        message = super().formatMessage(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{message} [{suppressed} similar suppressed]" if suppressed else message
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets each message template through LOG_RATE_LIMIT_BURST times per window, then samples.
+
+    Keyed on (logger, level, unformatted msg), which with %-style call sites means one key per
+    log statement. The next record let through after a suppression carries the count in
+    `record.suppressed`. Records above WARNING always pass: an error is never sampled away.
+    """
+
+    def __init__(self, window: float = LOG_RATE_LIMIT_WINDOW_S, burst: int = LOG_RATE_LIMIT_BURST, sample_every: int = LOG_SAMPLE_EVERY):
+        super().__init__()
+        self.window = window
+        self.burst = burst
+        self.sample_every = max(1, sample_every)
+        self.suppressed_total = 0
+        self._state: Dict[Tuple[str, int, str], list] = {}  # key -> [window start, seen, suppressed since last pass]
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.WARNING or self.burst <= 0:
+            return True
+        key = (record.name, record.levelno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            state = self._state.get(key)
+            if state is None or now - state[0] >= self.window:
+                carried = state[2] if state is not None else 0
+                if state is None and len(self._state) >= 10000:
+                    self._state.clear()  # bounded even if call sites build their format strings dynamically
+                state = self._state[key] = [now, 0, carried]
+            state[1] += 1
+            seen = state[1]
+            if seen > self.burst and (seen - self.burst) % self.sample_every:
+                state[2] += 1
+                self.suppressed_total += 1
+                return False
+            record.suppressed, state[2] = state[2], 0
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Enqueues the raw record; formatting happens on the listener thread.
+
+    The stock QueueHandler.prepare() formats the message in the calling thread. Here only
+    exception info is rendered up front (tracebacks pin frames), so the args must not be
+    mutated after the call, which holds for the ids, counts and strings the app logs.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped_total = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_total += 1
+
+
+_listener: Optional[QueueListener] = None
+_config: Tuple[str, str] = (LOG_LEVEL, LOG_FORMAT)
+queue_handler: Optional[NonBlockingQueueHandler] = None
+rate_limit_filter: Optional[RateLimitFilter] = None
+
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT) -> None:
+    # Idempotent; replaces whatever handlers the root logger had.
+    global _listener, _config, queue_handler, rate_limit_filter
+    if _listener is not None:
+        return
+    _config = (level, fmt)
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter(TEXT_FORMAT, TEXT_DATE_FORMAT))
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=max(0, LOG_QUEUE_SIZE))
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    rate_limit_filter = RateLimitFilter()
+    queue_handler.addFilter(rate_limit_filter)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def _restart_in_child() -> None:
+    # A forked process (pool worker, pre-forking server) inherits the queue but not the writer thread.
+    global _listener
+    if _listener is not None:
+        _listener = None
+        configure_logging(*_config)
+
+
+def stop_logging() -> None:
+    # Flushes everything still queued; safe to call more than once.
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_in_child)
@@ -1,41 +1,158 @@
 # app/main.py
 import json
 from datetime import datetime
-from typing import Optional, Dict, Any, Union, List
+from typing import Optional, Dict, Any, Union, Tuple, AsyncIterator, Callable
 from pathlib import Path
 from uuid import uuid4
 import logging
 import html
 import os
+import time
+import asyncio
+import functools
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, Form, HTTPException, Depends, Response
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, PlainTextResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 
-# Ensure log level is set appropriately (e.g., DEBUG for development)
-# You can set LOG_LEVEL in your .env file or environment
-logging.basicConfig(
-    level=os.getenv("LOG_LEVEL", "INFO").upper(), # Default to INFO if not set
-    format='%(asctime)s.%(msecs)03dZ [%(process)d:%(thread)d] %(levelname)-5s [%(name)s] %(module)s.%(funcName)s: %(message)s',
-    datefmt='%Y-%m-%dT%H:%M:%S'
-)
+from . import logging_setup
+
+# LOG_LEVEL / LOG_FORMAT (text|json) come from the environment; see app/logging_setup.py.
+logging_setup.configure_logging()
 logger = logging.getLogger(__name__)
 
 from . import database
-from .database import connect_to_mongo, close_mongo_connection
+from .database import close_mongo_connection
+from .quizzes import QuizRegistry, QUIZ_FILES
+from .scoring import get_scorer, SCORING_VERSION, SCORING_SPECS
+from .norms import ScoreNorms, histogram_increments
+from .summaries import summary_page, record_report, wait_for_seeds
+from .matching import (
+    MatchingIndex, load_matching_index, run_matching_reloader, parse_weights, MATCH_DEFAULT_K, MATCH_MAX_K, MATCH_LOAD_BATCH_SIZE, MATCH_RELOAD_S
+)
+from .export import EXPORT_TOKEN, is_export_authorized, ExportEncoder, ExportRequestError, build_export_query, parse_fields, parse_timestamp, stream_export
+from .answers import AnswerDecodeError, get_answer_decoder, read_answers_payload, decode_answers
+from .report_views import build_report_document, get_report_view_model, UNSCORED_REPORT_SCORE
+from .cache import TTLLRUCache
+from . import admission
+from .admission import AdmissionGate, AdmissionRejected
+from .submissions import SubmissionPipeline, SUBMISSION_PIPELINE_ENABLED
+from .http_cache import fingerprint_directory, make_etag, etag_matches, not_modified, set_validators, add_vary
+from . import metrics
+from . import profiling
+from . import warmup
+from .assets import AssetManifest
 
 BASE_DIR = Path(__file__).resolve().parent
 TEMPLATES_DIR = BASE_DIR / "templates"
-BIG_FIVE_QUIZ_FILE = BASE_DIR / "big_five.json"
-MAS_QUIZ_FILE = BASE_DIR / "mas.json"
+DASHBOARD_PAGE_SIZE = int(os.getenv("DASHBOARD_PAGE_SIZE", "20"))
+REPORT_HTML_CACHE_SIZE = int(os.getenv("REPORT_HTML_CACHE_SIZE", "512"))
+REPORT_HTML_CACHE_TTL_S = float(os.getenv("REPORT_HTML_CACHE_TTL_S", "600"))
+
+quiz_registry = QuizRegistry(QUIZ_FILES)
+asset_manifest = AssetManifest()
+asset_manifest.load()
+# Write-behind buffer for new reports (SUBMISSION_PIPELINE_ENABLED); None means direct insert_one.
+# Each flushed report then gets apply_stored_report (defined with the submit route).
+submission_pipeline: Optional[SubmissionPipeline] = (
+    SubmissionPipeline(database.insert_reports, on_stored=lambda doc: apply_stored_report(doc)) if SUBMISSION_PIPELINE_ENABLED else None
+)
+score_norms = ScoreNorms()
+# Latest trait vectors per user; bulk-loaded in the background at startup, updated on submit.
+matching_index = MatchingIndex()
+report_html_cache: TTLLRUCache[Tuple[str, Optional[datetime]]] = TTLLRUCache(REPORT_HTML_CACHE_SIZE, REPORT_HTML_CACHE_TTL_S)
+request_profiler = profiling.RequestProfiler()
+# Load shedding for the MongoDB-bound routes; the cheap ones (/, /auth, /healthz, static) are never gated.
+admission_gates: Dict[str, AdmissionGate] = {
+    "submit": AdmissionGate("submit", admission.ADMISSION_SUBMIT_CONCURRENCY, admission.ADMISSION_SUBMIT_QUEUE,
+                            admission.ADMISSION_SUBMIT_RATE_PER_MIN, admission.ADMISSION_SUBMIT_BURST),
+    "report": AdmissionGate("report", admission.ADMISSION_REPORT_CONCURRENCY, admission.ADMISSION_REPORT_QUEUE,
+                            admission.ADMISSION_REPORT_RATE_PER_MIN, admission.ADMISSION_REPORT_BURST),
+}
+
+# Values owned by other components, read only when /metrics is scraped.
+metrics.REGISTRY.register(metrics.CallbackCounter(
+    "mansematch_quiz_registry_loads_total", "Quiz JSON files parsed and compiled by the registry.",
+    callback=lambda: {(): quiz_registry.load_count}))
+metrics.REGISTRY.register(metrics.CallbackCounter(
+    "mansematch_report_html_cache_lookups_total", "Rendered-report cache lookups by result.", ("result",),
+    callback=lambda: {("hit",): report_html_cache.hits, ("miss",): report_html_cache.misses}))
+metrics.REGISTRY.register(metrics.CallbackCounter(
+    "mansematch_log_records_discarded_total", "Log records not written: rate-limited, or dropped on a full queue.", ("reason",),
+    callback=lambda: {
+        ("rate_limited",): logging_setup.rate_limit_filter.suppressed_total if logging_setup.rate_limit_filter else 0,
+        ("queue_full",): logging_setup.queue_handler.dropped_total if logging_setup.queue_handler else 0,
+    }))
+metrics.REGISTRY.register(metrics.CallbackCounter(
+    "mansematch_profiles_written_total", "Request profiles written to PROFILE_DIR.",
+    callback=lambda: {(): request_profiler.profiles_written}))
+metrics.REGISTRY.register(metrics.CallbackCounter(
+    "mansematch_admission_rejected_total", "Requests shed by admission control, by route group and reason.", ("group", "reason"),
+    callback=lambda: {(group, reason): count for group, gate in admission_gates.items() for reason, count in gate.rejected.items()}))
+metrics.REGISTRY.register(metrics.Gauge(
+    "mansematch_admission_in_flight", "Admitted requests in progress, by route group.", ("group",),
+    callback=lambda: {(group,): gate.limiter.in_flight for group, gate in admission_gates.items()}))
+metrics.REGISTRY.register(metrics.Gauge(
+    "mansematch_admission_queued", "Requests waiting for an admission slot, by route group.", ("group",),
+    callback=lambda: {(group,): gate.limiter.queued for group, gate in admission_gates.items()}))
+metrics.REGISTRY.register(metrics.Gauge(
+    "mansematch_matching_index_users", "Users with at least one trait vector in the matching index.",
+    callback=lambda: {(): len(matching_index)}))
+metrics.REGISTRY.register(metrics.Gauge(
+    "mansematch_db_connected", "1 while connected to MongoDB and the circuit breaker is not open.",
+    callback=lambda: {(): int(database.is_available())}))
+metrics.REGISTRY.register(metrics.Gauge(
+    "mansematch_db_circuit_state", "MongoDB circuit breaker state (1 for the current one).", ("state",),
+    callback=lambda: {(state,): int(database.breaker.state == state) for state in ("closed", "open", "half_open")}))
+metrics.REGISTRY.register(metrics.Gauge(
+    "mansematch_submission_pipeline_pending", "Reports waiting in the write-behind buffer.",
+    callback=lambda: {(): len(submission_pipeline) if submission_pipeline else 0}))
+metrics.REGISTRY.register(metrics.CallbackCounter(
+    "mansematch_submission_dead_lettered_total", "Reports the write-behind buffer could not store and wrote to its dead-letter file.",
+    callback=lambda: {(): submission_pipeline.dead_lettered if submission_pipeline else 0}))
+
+
+async def start_database() -> None:
+    # Runs in the background so the app serves (DB routes answer 503) while MongoDB is still unreachable.
+    if not await database.connect_with_retry():
+        return
+    await warmup.warm_database_pool()
+    warmup_state.database = True
+    await score_norms.refresh()
+    matching_documents = functools.partial(database.iter_report_scores, sorted(SCORING_SPECS), MATCH_LOAD_BATCH_SIZE)
+    await load_matching_index(matching_index, matching_documents())
+    if MATCH_RELOAD_S > 0:
+        await run_matching_reloader(matching_index, matching_documents)
 
 
 @asynccontextmanager
 async def lifespan(app_instance: FastAPI):
-    logger.info("Application startup: connecting to MongoDB...")
-    connect_to_mongo()
+    logger.info("Application startup: compiling quiz registry...")
+    quiz_registry.load()
+    warmup.warm_quizzes(quiz_registry)
+    warmup_state.quizzes = True
+    # Before the server accepts connections, so no request pays for a template compile.
+    warmup.precompile_templates(templates.env)
+    warmup_state.templates = True
+    logger.info("Application startup: connecting to MongoDB in the background...")
+    database_task = asyncio.create_task(start_database(), name="mongo-connect")
+    if submission_pipeline is not None:
+        submission_pipeline.start()
+    loop_lag_task = asyncio.create_task(metrics.monitor_event_loop_lag(), name="event-loop-lag")
+    norms_task = asyncio.create_task(score_norms.run_refresher(), name="score-norms-refresh")
+    metrics_task = asyncio.create_task(metrics.run_snapshot_writer(), name="metrics-snapshot") if metrics.METRICS_MULTIPROC_DIR else None
     yield
+    database_task.cancel()
+    loop_lag_task.cancel()
+    norms_task.cancel()
+    if metrics_task is not None:
+        metrics_task.cancel()
+        metrics.remove_snapshot(metrics.METRICS_MULTIPROC_DIR, os.getpid())
+    if submission_pipeline is not None:
+        logger.info("Application shutdown: draining submission pipeline...")
+        await submission_pipeline.drain()
+    await wait_for_seeds()
     logger.info("Application shutdown: closing MongoDB connection...")
     close_mongo_connection()
 
@@ -54,103 +171,30 @@ FAKE_USERS_DB = {
 }
 
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
+templates.env.template_class = metrics.TimedTemplate
+warmup.install_bytecode_cache(templates.env)
+warmup_state = warmup.WarmupState()
+templates.env.globals['asset_url'] = asset_manifest.url
+templates.env.globals['asset_available'] = asset_manifest.available
+templates.env.globals['asset_integrity'] = asset_manifest.integrity
+# Part of every page ETag so a template or static asset deploy invalidates browser-cached pages.
+PAGE_FINGERPRINT = fingerprint_directory(TEMPLATES_DIR) + asset_manifest.fingerprint()
 templates.env.globals['html_escape'] = html.escape
 templates.env.filters['json_dumps'] = json.dumps
+# Page templates `{% extends layout %}`: the full document, or just what htmx swaps into #main-content.
+PAGE_LAYOUT = "base.html"
+FRAGMENT_LAYOUT = "_fragment.html"
 
-BFI10_TRAIT_DESCRIPTIONS = {
-    "Extraversion": "Reflects tendency to be sociable, assertive, and energetic vs. reserved and quiet.",
-    "Agreeableness": "Reflects tendency to be compassionate, cooperative, and kind vs. antagonistic and critical.",
-    "Conscientiousness": "Reflects tendency to be organized, dependable, and responsible vs. careless and impulsive.",
-    "Neuroticism": "Reflects tendency to experience negative emotions, such as anxiety and sadness (Emotional Stability is the inverse).",
-    "Openness": "Reflects tendency to be imaginative, curious, and open to new experiences vs. conventional and preferring routine."
-}
-
-def get_bfi10_interpretation_details(trait_name: str, score: Optional[float]) -> Dict[str, str]:
-    level = "N/A"
-    level_description = "Score not available or trait not applicable."
-    if score is not None:
-        if score < 2.5: level = "Low"
-        elif score <= 3.5: level = "Average"
-        else: level = "High"
-
-        if trait_name == "Neuroticism":
-            if level == "Low": level_description = "Indicates a tendency to be calm, emotionally stable, and resilient to stress."
-            elif level == "Average": level_description = f"Indicates a moderate or balanced expression of typical {trait_name.lower()} characteristics."
-            else: level_description = "Indicates a tendency to experience emotional fluctuations, anxiety, or moodiness more frequently."
-        else:
-            if level == "Low": level_description = f"Indicates a lower expression of typical {trait_name.lower()} characteristics."
-            elif level == "Average": level_description = f"Indicates a moderate or balanced expression of typical {trait_name.lower()} characteristics."
-            else: level_description = f"Indicates a higher expression of typical {trait_name.lower()} characteristics."
-    else:
-        level = "N/A"
-        level_description = "This trait was not scored."
+def db_unavailable(detail: str = "DB service unavailable.") -> HTTPException:
+    # 503 with a Retry-After matching the circuit breaker (or the reconnect backoff) so clients back off.
+    retry_after = max(1, round(database.breaker.retry_after() or database.MONGO_CONNECT_RETRY_BASE_S))
+    return HTTPException(status_code=503, detail=detail, headers={"Retry-After": str(retry_after)})
 
-    general_description = BFI10_TRAIT_DESCRIPTIONS.get(trait_name, "General description not available.")
-    return {
-        "level": level,
-        "level_specific_description": level_description,
-        "general_trait_description": general_description
-    }
-
-MAS12_SUBSCALE_MAP = {
-    "PP": "Power-Prestige", "RT": "Retention-Time", "D": "Distrust", "A": "Anxiety"
-}
-MAS12_SUBSCALE_FULL_NAMES = list(MAS12_SUBSCALE_MAP.values())
-
-def get_mas12_interpretation_details(dimension_name: str, score: Optional[float]) -> str:
-    if score is None: return "Score not available."
-    level = "Low" if score < 2.5 else "Medium" if score <= 3.5 else "High"
-    interpretation_map = {
-        "Power-Prestige": {
-            "Low": "Minimal view of money as a status symbol.",
-            "Medium": "Views money as a moderate status symbol.",
-            "High": "Strongly views money as a symbol of status and success."
-        },
-        "Retention-Time": {
-            "Low": "Less focused on saving and long-term planning.",
-            "Medium": "Moderate focus on saving and planning for the future.",
-            "High": "Strong focus on saving and future financial planning."
-        },
-        "Distrust": {
-            "Low": "Generally trusting in money matters and dealings with others.",
-            "Medium": "Some caution regarding money and others' motives.",
-            "High": "Significant suspicion or cynicism about money dealings and motives."
-        },
-        "Anxiety": {
-            "Low": "Little worry or stress about financial matters.",
-            "Medium": "Moderate worry or concern about finances.",
-            "High": "Frequent and significant anxiety or stress concerning money."
-        }
-    }
-    interp_text = interpretation_map.get(dimension_name, {}).get(level, "Interpretation not available.")
-    return f"{level}: {interp_text}"
-
-def calculate_mas12_scores(questions: List[Dict[str, Any]], user_answers_dict: Dict[str, Union[int, float]]) -> Dict[str, Optional[float]]:
-    subscale_scores: Dict[str, List[float]] = {name: [] for name in MAS12_SUBSCALE_FULL_NAMES}
-    for question in questions:
-        q_id_str, key_short = str(question.get("id")), question.get("key")
-        user_answer_val = user_answers_dict.get(q_id_str)
-        if user_answer_val is None or key_short is None:
-            logger.warning(f"MAS-12 QID {q_id_str}: missing answer/key. Ans: {user_answers_dict}")
-            continue
-        full_subscale_name = MAS12_SUBSCALE_MAP.get(key_short)
-        if not full_subscale_name:
-            logger.warning(f"MAS-12 QID {q_id_str}: unknown key '{key_short}'")
-            continue
-        try:
-            answer_val = float(user_answer_val)
-            if not (1 <= answer_val <= 5):
-                logger.warning(f"MAS-12 QID {q_id_str}: ans {answer_val} out of 1-5 range.")
-                continue
-            subscale_scores[full_subscale_name].append(answer_val)
-        except (ValueError, TypeError):
-            logger.error(f"MAS-12 QID {q_id_str}: non-numeric ans '{user_answer_val}'")
-            continue
-    final_avg_scores: Dict[str, Optional[float]] = {}
-    for name, scores_list in subscale_scores.items():
-        final_avg_scores[name] = round(sum(scores_list) / len(scores_list), 2) if scores_list else None
-        if not scores_list: logger.warning(f"MAS-12: No valid scores for subscale {name}")
-    return final_avg_scores
+def db_error(error: Exception, detail: str) -> HTTPException:
+    # Connection failures (incl. an open breaker) are the client's cue to retry; anything else is our bug.
+    if database.is_connection_error(error):
+        return db_unavailable()
+    return HTTPException(status_code=500, detail=detail)
 
 class HtmxRedirectException(HTTPException):
     def __init__(self, redirect_url: str):
@@ -161,341 +205,426 @@ async def htmx_redirect_exception_handler(request: Request, exc: HtmxRedirectExc
     return Response(content=exc.detail, status_code=exc.status_code, headers=exc.headers)
 
 def load_quizzes_data() -> Dict[str, Any]:
-    all_quizzes_list = []
-    quiz_files = [BIG_FIVE_QUIZ_FILE, MAS_QUIZ_FILE]
+    # Served from the in-memory registry; the JSON files are only re-read when they change on disk.
+    return {"quizzes": quiz_registry.definitions()}
 
-    for file_path in quiz_files:
-        try:
-            with open(file_path, 'r') as f:
-                data = json.load(f)
-                if "quizzes" in data and isinstance(data["quizzes"], list):
-                    all_quizzes_list.extend(data["quizzes"])
-                    logger.debug(f"Successfully loaded {len(data['quizzes'])} quiz(zes) from {file_path}")
-                else:
-                    logger.warning(f"File {file_path} does not contain a 'quizzes' list. Skipping.")
-        except FileNotFoundError:
-            logger.error(f"Quiz data file {file_path} not found.")
-        except json.JSONDecodeError as e:
-            logger.error(f"Error decoding {file_path}: {e}")
-        except Exception as e:
-            logger.error(f"An unexpected error occurred while loading {file_path}: {e}")
+def wants_fragment(request: Request) -> bool:
+    # Boosted links/forms target #main-content; a history-cache miss still needs the whole page.
+    return "hx-request" in request.headers and "hx-history-restore-request" not in request.headers
 
-    if not all_quizzes_list:
-        logger.warning("No quiz definitions loaded. Returning empty quiz list.")
-        return {"quizzes": []}
+def render_page(request: Request, template_name: str, context: Dict[str, Any]) -> str:
+    context["layout"] = FRAGMENT_LAYOUT if wants_fragment(request) else PAGE_LAYOUT
+    return templates.get_template(template_name).render(context)
 
-    return {"quizzes": all_quizzes_list}
+def page_response(request: Request, template_name: str, context: Dict[str, Any]) -> HTMLResponse:
+    return add_vary(HTMLResponse(content=render_page(request, template_name, context)), "HX-Request")
 
 async def get_current_user_from_cookie(request: Request) -> Optional[Dict[str, Any]]:
-    user_email = request.cookies.get("user_session")
-    if user_email and user_email in FAKE_USERS_DB:
-        return FAKE_USERS_DB[user_email]
-    return None
+    with profiling.span("auth"):
+        user_email = request.cookies.get("user_session")
+        if user_email and user_email in FAKE_USERS_DB:
+            return FAKE_USERS_DB[user_email]
+        return None
 
 async def get_current_user_or_htmx_redirect(
     request: Request,
     current_user: Optional[Dict[str, Any]] = Depends(get_current_user_from_cookie)
 ) -> Dict[str, Any]:
     if not current_user:
-        logger.warning(f"User not authenticated. Path: {request.url.path}. HX-Request: {'hx-request' in request.headers}")
+        logger.warning("User not authenticated. Path: %s. HX-Request: %s", request.url.path, "hx-request" in request.headers)
         if "hx-request" in request.headers:
             raise HtmxRedirectException(redirect_url=app.url_path_for("auth_page_route"))
         else:
             raise HTTPException(status_code=307, detail="Not authenticated", headers={"Location": app.url_path_for("auth_page_route")})
     return current_user
 
+def admitted_user(group: str) -> Callable[..., AsyncIterator[Dict[str, Any]]]:
+    # Dependency for a gated route: the signed-in user, once admitted; the slot is held until the handler returns.
+    gate = admission_gates[group]
+
+    async def dependency(current_user: Dict[str, Any] = Depends(get_current_user_or_htmx_redirect)) -> AsyncIterator[Dict[str, Any]]:
+        try:
+            async with gate.admit(current_user["id"]):
+                yield current_user
+        except AdmissionRejected as e:
+            raise shed(group, current_user, e)
+    return dependency
+
+def shed(group: str, current_user: Dict[str, Any], e: AdmissionRejected) -> HTTPException:
+    logger.warning("Shed %s request from %s: %s.", group, current_user["email"], e.reason)
+    status_code, detail = (429, "Too many requests; slow down.") if e.reason == "rate_limited" else (503, "Server busy; try again shortly.")
+    return HTTPException(status_code=status_code, detail=detail, headers={"Retry-After": e.retry_after_header})
+
 @app.middleware("http")
 async def common_template_vars_middleware(request: Request, call_next):
+    # Also the profiling hook (see app/profiling.py): timings and profiles cover the whole request.
+    operator = profiling.is_operator(request.headers.get("x-profile-token"))
+    profiled = (operator or profiling.sampled()) and request_profiler.start()
+    # Timings are only disclosed when enabled for everyone or asked for by an operator.
+    show_timings = profiling.SERVER_TIMING_ENABLED or operator
+    timings = profiling.start_timings() if profiled or show_timings else None
     request.state.user = await get_current_user_from_cookie(request)
     request.state.current_year = datetime.now().year
-    response = await call_next(request)
+    started = time.perf_counter()
+    status_code = 500
+    response = None
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        route = metrics.route_label(request.scope)
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route, request.method)
+        metrics.HTTP_REQUESTS_TOTAL.inc(route, request.method, str(status_code))
+        if profiled:
+            request_profiler.stop()
+            try:
+                path = await asyncio.to_thread(request_profiler.save, f"{request.method}-{route}")
+                logger.info("Profile of %s %s written to %s.", request.method, request.url.path, path)
+                if response is not None and operator:
+                    response.headers["X-Profile-File"] = path.name
+            except OSError as e:
+                logger.error("Failed to write the profile of %s %s: %s", request.method, request.url.path, e)
+    if show_timings:
+        response.headers["Server-Timing"] = timings.server_timing()
     return response
 
 @app.get("/", response_class=HTMLResponse, name="homepage")
 async def homepage_route(request: Request):
-    logger.info(f"Homepage requested by user: {request.state.user.get('email') if request.state.user else 'Anonymous'}")
-    return templates.TemplateResponse("index.html", {"request": request, "title": "Welcome - mansematch"})
+    logger.info("Homepage requested by user: %s", request.state.user.get("email") if request.state.user else "Anonymous")
+    return page_response(request, "index.html", {"request": request, "title": "Welcome - mansematch"})
 
 @app.post("/subscribe", name="subscribe")
 async def subscribe_email_route(request: Request, email: str = Form(...)):
-    logger.info(f"New email subscription: {email}")
+    logger.info("New email subscription: %s", email)
     return HTMLResponse(f"<p class='text-green-600 font-semibold'>Thank you for subscribing, {html.escape(email)}!</p>")
 
 @app.get("/auth", response_class=HTMLResponse, name="auth_page_route")
 async def auth_page_route(request: Request):
     if request.state.user:
-        logger.info(f"User {request.state.user['email']} already authenticated, redirecting to dashboard.")
+        logger.info("User %s already authenticated, redirecting to dashboard.", request.state.user["email"])
         return RedirectResponse(url=app.url_path_for("dashboard_page_route"), status_code=303)
     logger.info("Auth page requested.")
-    return templates.TemplateResponse("auth.html", {"request": request, "title": "Sign In / Sign Up"})
+    return page_response(request, "auth.html", {"request": request, "title": "Sign In / Sign Up"})
 
 @app.post("/login", name="login_route")
 async def login_user_route(request: Request, email: str = Form(...), password: str = Form(...)):
     user = FAKE_USERS_DB.get(email)
     if not user or user["hashed_password"] != password:
-        logger.warning(f"Login failed for email: {email}")
+        logger.warning("Login failed for email: %s", email)
         return HTMLResponse("<p class='text-red-600'>Invalid email or password. Please try again.</p>", status_code=401)
-    logger.info(f"User {email} logged in successfully.")
+    logger.info("User %s logged in successfully.", email)
     response = HTMLResponse(content="<p>Login successful! Redirecting...</p>", status_code=200)
     response.set_cookie(key="user_session", value=user["email"], httponly=True, max_age=1800, samesite="Lax", secure=request.url.scheme == "https", path="/")
     redirect_url = app.url_path_for("dashboard_page_route")
     response.headers["HX-Redirect"] = redirect_url
-    logger.debug(f"Login successful, HX-Redirecting to: {redirect_url}")
+    logger.debug("Login successful, HX-Redirecting to: %s", redirect_url)
     return response
 
 @app.post("/logout", name="logout_route")
 async def logout_user_route(request: Request):
     user_email = request.state.user.get('email') if request.state.user else "Unknown"
-    logger.info(f"User {user_email} initiating logout.")
-    context = {"request": request, "title": "Welcome - mansematch", "user": None}
-    html_content = templates.get_template("index.html").render(context)
-    response = HTMLResponse(content=html_content)
+    logger.info("User %s initiating logout.", user_email)
+    # The header lives outside #main-content, so the fragment carries it as an out-of-band swap.
+    context = {"request": request, "title": "Welcome - mansematch", "user": None, "oob_header": wants_fragment(request)}
+    response = page_response(request, "index.html", context)
     response.delete_cookie("user_session", httponly=True, samesite="Lax", secure=request.url.scheme == "https", path="/")
     response.headers["HX-Push-Url"] = app.url_path_for("homepage")
     return response
 
 @app.get("/dashboard", response_class=HTMLResponse, name="dashboard_page_route")
 async def dashboard_page_route(request: Request, current_user: Dict[str, Any] = Depends(get_current_user_or_htmx_redirect)):
-    logger.info(f"Dashboard requested by user: {current_user['email']}")
-    quizzes_definitions = load_quizzes_data().get("quizzes", [])
-    user_reports = []
-    if database.reports_collection is not None:
+    logger.info("Dashboard requested by user: %s", current_user["email"])
+    quizzes_definitions = quiz_registry.definitions()
+    user_reports, next_cursor = [], None
+    latest_date_taken, etag, summary = None, None, None
+    if database.is_available():
         try:
-            report_cursor = database.reports_collection.find({"user_id": current_user["id"]}).sort("date_taken", -1)
-            user_reports = list(report_cursor)
-            logger.debug(f"User {current_user['email']} has {len(user_reports)} reports.")
+            # The summary is updated for every stored report, so it both validates the page and
+            # holds its first page of reports: one point read. Write-behind reports reach it only
+            # once flushed, so those still buffered are merged in below.
+            summary = await database.find_user_summary(current_user["id"])
+            pending_reports = submission_pipeline.pending_for_user(current_user["id"]) if submission_pipeline else []
+            stored_latest = None
+            if summary is not None:
+                latest_date_taken, version = summary.get("last_taken"), summary.get("report_count", 0)
+            else:
+                # No summary yet (not seeded or backfilled): validate with the newest date_taken, an index-only lookup.
+                stored_latest = latest_date_taken = await database.find_latest_report_date(current_user["id"])
+                version = "-"
+            if pending_reports:
+                latest_pending = max(doc["date_taken"] for doc in pending_reports)
+                latest_date_taken = max(latest_date_taken, latest_pending) if latest_date_taken else latest_pending
+            etag = make_etag(
+                "dashboard", current_user["id"], version, latest_date_taken.isoformat() if latest_date_taken else "-",
+                quiz_registry.fingerprint(), PAGE_FINGERPRINT, request.state.current_year, wants_fragment(request)
+            )
+            if etag_matches(request, etag):
+                return add_vary(not_modified(etag, latest_date_taken), "HX-Request")
+            if summary is not None:
+                user_reports, next_cursor = summary_page(summary, DASHBOARD_PAGE_SIZE)
+            elif stored_latest is not None:
+                user_reports, next_cursor = await database.find_user_reports_page(current_user["id"], DASHBOARD_PAGE_SIZE)
+            if pending_reports:
+                # Not flushed yet, so not in the DB page; newest first, like the query.
+                pending_ids = {doc["id"] for doc in pending_reports}
+                user_reports = sorted(pending_reports, key=lambda d: d["date_taken"], reverse=True) + [r for r in user_reports if r.get("id") not in pending_ids]
+            logger.debug("User %s dashboard page has %s reports (more: %s).", current_user["email"], len(user_reports), next_cursor is not None)
         except Exception as e:
-            logger.error(f"Error fetching reports for user {current_user['email']}: {e}")
+            logger.error("Error fetching reports for user %s: %s", current_user["email"], e)
+            etag = None  # never let a degraded page be revalidated as current
     else:
         logger.warning("Reports collection N/A. Cannot fetch reports for dashboard.")
-    return templates.TemplateResponse("dashboard.html", {
+    response = page_response(request, "dashboard.html", {
         "request": request, "title": "Dashboard - mansematch", "user": current_user,
-        "quizzes": quizzes_definitions, "reports": user_reports
+        "quizzes": quizzes_definitions, "reports": user_reports, "next_cursor": next_cursor,
+        "quiz_counts": (summary or {}).get("quiz_counts") or {}
+    })
+    if etag is not None:
+        set_validators(response, etag, latest_date_taken)
+    return response
+
+@app.get("/dashboard/reports", response_class=HTMLResponse, name="dashboard_reports_fragment_route")
+async def dashboard_reports_fragment_route(request: Request, cursor: str, current_user: Dict[str, Any] = Depends(get_current_user_or_htmx_redirect)):
+    # HTMX "load more" target: returns just the next batch of <li> items plus a new load-more button.
+    try:
+        after = database.decode_page_cursor(cursor)
+    except ValueError:
+        logger.warning("Invalid dashboard cursor from %s: %r", current_user["email"], cursor)
+        raise HTTPException(status_code=400, detail="Invalid cursor.")
+    if not database.is_available():
+        logger.error("DB N/A. Cannot fetch more dashboard reports.")
+        raise db_unavailable()
+    try:
+        user_reports, next_cursor = await database.find_user_reports_page(current_user["id"], DASHBOARD_PAGE_SIZE, after)
+    except Exception as e:
+        logger.error("Error fetching more reports for user %s: %s", current_user["email"], e)
+        raise db_error(e, "Failed to load reports.")
+    return templates.TemplateResponse("_report_list_items.html", {
+        "request": request, "reports": user_reports, "next_cursor": next_cursor
     })
 
 @app.get("/quiz/{quiz_id}", response_class=HTMLResponse, name="quiz_page_route")
 async def quiz_page_route(request: Request, quiz_id: str, current_user: Dict[str, Any] = Depends(get_current_user_or_htmx_redirect)):
-    logger.info(f"Quiz page for quiz_id: {quiz_id} by user: {current_user['email']}")
-    all_quiz_definitions = load_quizzes_data()
-    quiz_detail = next((q for q in all_quiz_definitions.get("quizzes", []) if q["id"] == quiz_id), None)
-    if not quiz_detail:
-        logger.warning(f"Quiz ID: {quiz_id} not found for user {current_user['email']}.")
+    logger.info("Quiz page for quiz_id: %s by user: %s", quiz_id, current_user["email"])
+    with profiling.span("quiz"):
+        compiled_quiz = quiz_registry.get(quiz_id)
+    if not compiled_quiz:
+        logger.warning("Quiz ID: %s not found for user %s.", quiz_id, current_user["email"])
         raise HTTPException(status_code=404, detail=f"Quiz ID: {quiz_id} not found.")
-    quiz_detail.setdefault("questions", [])
-    logger.debug(f"Quiz '{quiz_detail.get('title')}' ({len(quiz_detail['questions'])}Q) for template.")
-    return templates.TemplateResponse("quiz_page.html", {
+    etag = make_etag("quiz", quiz_id, compiled_quiz.definition_hash, current_user["id"], PAGE_FINGERPRINT, request.state.current_year, wants_fragment(request))
+    if etag_matches(request, etag):
+        return add_vary(not_modified(etag), "HX-Request")
+    quiz_detail = compiled_quiz.definition
+    logger.debug("Quiz '%s' (%sQ) for template.", quiz_detail.get("title"), len(quiz_detail['questions']))
+    response = page_response(request, "quiz_page.html", {
         "request": request, "title": f"Quiz: {html.escape(quiz_detail.get('title', 'Quiz'))}",
-        "user": current_user, "quiz": quiz_detail
+        "user": current_user, "quiz": quiz_detail,
+        "definition_url": app.url_path_for("quiz_definition_route", quiz_id=quiz_id, version=compiled_quiz.definition_version),
     })
-
-def calculate_bfi10_scores(questions: List[Dict[str, Any]], user_answers_dict: Dict[str, Union[int, float]]) -> Dict[str, Optional[float]]:
-    scores: Dict[str, List[float]] = {"E": [], "A": [], "C": [], "N": [], "O": []}
-    trait_map = {
-        "E": "Extraversion", "A": "Agreeableness", "C": "Conscientiousness",
-        "N": "Neuroticism", "O": "Openness"
-    }
-    for question in questions:
-        q_id_str, key = str(question.get("id")), question.get("key")
-        user_answer_val = user_answers_dict.get(q_id_str)
-        if user_answer_val is None or key is None:
-            logger.warning(f"BFI-10 QID {q_id_str}: missing answer/key. Ans: {user_answers_dict}")
-            continue
+    return set_validators(response, etag)
+
+@app.get("/quiz/{quiz_id}/definition.{version}.json", name="quiz_definition_route", include_in_schema=False)
+async def quiz_definition_route(request: Request, quiz_id: str, version: str):
+    # Serialized and compressed once per definition version; the URL changes with the content,
+    # so browsers and CDNs may keep it forever. Quiz definitions are not per-user.
+    compiled_quiz = quiz_registry.get(quiz_id)
+    if not compiled_quiz:
+        raise HTTPException(status_code=404, detail=f"Quiz ID: {quiz_id} not found.")
+    if version != compiled_quiz.definition_version:
+        # A page rendered before the quiz file changed (or by another worker mid-deploy).
+        current_url = app.url_path_for("quiz_definition_route", quiz_id=quiz_id, version=compiled_quiz.definition_version)
+        return RedirectResponse(url=current_url, status_code=307, headers={"Cache-Control": "no-store"})
+    return compiled_quiz.definition_asset.response(request, immutable=True)
+
+async def apply_stored_report(report_doc: Dict[str, Any]) -> None:
+    # Updates derived from a report, applied once it is stored: right after insert_one, or by
+    # the write-behind pipeline after its batch is flushed (never for a dead-lettered report).
+    user_id, report_id, quiz_id, report_score = report_doc["user_id"], report_doc["id"], report_doc["quiz_id"], report_doc.get("score")
+    try:
+        await record_report(report_doc)
+    except Exception as e:
+        # The report is stored; `python -m app.summaries rebuild --user-id ...` repairs the summary.
+        logger.error("Failed to update the dashboard summary of %s for report %s: %s", user_id, report_id, e)
+    increments = histogram_increments(report_score)
+    if increments:
         try:
-            answer_val = float(user_answer_val)
-        except (ValueError, TypeError):
-            logger.error(f"BFI-10 QID {q_id_str}: non-numeric ans '{user_answer_val}'")
-            continue
-        trait_code, is_reversed = key[0], key.endswith("_R")
-        if trait_code not in scores:
-            logger.warning(f"BFI-10 QID {q_id_str}: unknown trait '{trait_code}' in key '{key}'")
-            continue
-        scores[trait_code].append((6 - answer_val) if is_reversed else answer_val)
-    final_scores: Dict[str, Optional[float]] = {}
-    for trait_code, items_scores in scores.items():
-        trait_name = trait_map.get(trait_code)
-        if not trait_name: continue
-        final_scores[trait_name] = round(sum(items_scores) / len(items_scores), 2) if items_scores else None
-        if not items_scores: logger.warning(f"BFI-10: No valid scores for trait {trait_name}")
-    return final_scores
+            if await database.increment_score_stats(quiz_id, increments):
+                score_norms.apply(quiz_id, report_score)
+        except Exception as e:
+            # The report is stored; `python -m app.norms rebuild` repairs the histograms.
+            logger.error("Failed to update score norms for report %s: %s", report_id, e)
+    matching_index.upsert(user_id, quiz_id, report_score, report_doc["date_taken"])
 
 @app.post("/quiz/{quiz_id}/submit", name="submit_quiz_route")
-async def submit_quiz_route(request: Request, quiz_id: str, answers: str = Form(...), current_user: Dict[str, Any] = Depends(get_current_user_or_htmx_redirect)):
-    logger.info(f"Quiz submission: {quiz_id} by user: {current_user['email']}")
-    logger.debug(f"Raw answers JSON: {answers}") # Use debug to avoid logging PII in prod INFO
-    if database.reports_collection is None:
-        logger.error("DB N/A. Cannot save quiz submission.")
-        raise HTTPException(status_code=503, detail="DB service unavailable.")
-    all_quiz_definitions = load_quizzes_data()
-    quiz_detail = next((q for q in all_quiz_definitions.get("quizzes", []) if q["id"] == quiz_id), None)
-    if not quiz_detail:
-        logger.error(f"Quiz ID {quiz_id} not found during submission by {current_user['email']}.")
+async def submit_quiz_route(request: Request, quiz_id: str, current_user: Dict[str, Any] = Depends(admitted_user("submit"))):
+    logger.info("Quiz submission: %s by user: %s", quiz_id, current_user["email"])
+    with profiling.span("quiz"):
+        compiled_quiz = quiz_registry.get(quiz_id)
+    if not compiled_quiz:
+        logger.error("Quiz ID %s not found during submission by %s.", quiz_id, current_user["email"])
         raise HTTPException(status_code=404, detail=f"Quiz ID {quiz_id} not found.")
     try:
-        user_answers_dict: Dict[str, Any] = json.loads(answers)
-        logger.debug(f"Parsed user answers: {user_answers_dict}")
-    except json.JSONDecodeError as e:
-        logger.error(f"Invalid answers JSON from {current_user['email']} for {quiz_id}: {e}")
-        raise HTTPException(status_code=400, detail="Invalid answers format.")
+        decoded = decode_answers(get_answer_decoder(compiled_quiz), await read_answers_payload(request))
+    except AnswerDecodeError as e:
+        logger.warning("Rejected %s submission from %s: %s", quiz_id, current_user["email"], e)
+        raise HTTPException(status_code=422, detail=str(e))
+    user_answers_dict = decoded.answers
+    logger.debug("Decoded %s answers for %s.", len(user_answers_dict), quiz_id) # answers themselves are PII
+    if not database.is_available():
+        logger.error("DB N/A. Cannot save quiz submission.")
+        raise db_unavailable()
 
-    quiz_questions = quiz_detail.get("questions", [])
     report_score: Union[str, Dict[str, Optional[float]]]
-    report_type = "standard"
-
-    if quiz_id == "bfi-10":
-        report_type = "bfi-10"
-        bfi_numeric_answers: Dict[str, Union[int, float]] = {}
-        for q in quiz_questions:
-            q_id_str = str(q.get("id"))
-            ans_val = user_answers_dict.get(q_id_str)
-            if ans_val is not None:
-                try:
-                    bfi_numeric_answers[q_id_str] = float(ans_val)
-                except (ValueError, TypeError):
-                    logger.warning(f"BFI-10 QID {q_id_str}: could not convert answer '{ans_val}' to float. Skipping.")
-            else:
-                logger.warning(f"BFI-10 QID {q_id_str}: answer not found in submission. Skipping.")
-
-        report_score = calculate_bfi10_scores(quiz_questions, bfi_numeric_answers)
-        logger.info(f"User {current_user['email']} BFI-10 scores: {report_score}")
-
-    elif quiz_id == "mas-12":
-        report_type = "mas-12"
-        mas_numeric_answers: Dict[str, Union[int, float]] = {}
-        for q in quiz_questions:
-            q_id_str = str(q.get("id"))
-            ans_val = user_answers_dict.get(q_id_str)
-            if ans_val is not None:
-                try:
-                    mas_numeric_answers[q_id_str] = float(ans_val)
-                except (ValueError, TypeError):
-                     logger.warning(f"MAS-12 QID {q_id_str}: could not convert answer '{ans_val}' to float. Skipping.")
-            else:
-                logger.warning(f"MAS-12 QID {q_id_str}: answer not found in submission. Skipping.")
-        report_score = calculate_mas12_scores(quiz_questions, mas_numeric_answers)
-        logger.info(f"User {current_user['email']} MAS-12 scores: {report_score}")
+    scorer = get_scorer(compiled_quiz)
+    if scorer is not None:
+        with profiling.span("score"):
+            report_score = scorer.score_values(decoded.values)
+        logger.debug("User %s %s scores: %s", current_user["email"], quiz_id, report_score)
     else:
-        logger.warning(f"Quiz {quiz_id} submitted by {current_user['email']} has no specific scoring. Defaulting score.")
-        report_score = "N/A - Scoring not implemented for this quiz type"
-        report_type = quiz_id
+        logger.warning("Quiz %s submitted by %s has no specific scoring. Defaulting score.", quiz_id, current_user["email"])
+        report_score = UNSCORED_REPORT_SCORE
 
     new_report_id = f"rep_{uuid4().hex[:10]}"
-    new_report_doc = {
-        "id": new_report_id, "user_id": current_user["id"], "quiz_id": quiz_id,
-        "quiz_title": quiz_detail.get('title', 'Quiz'),
-        "quiz_description": quiz_detail.get('description', 'No description.'),
-        "score": report_score, "date_taken": datetime.utcnow(),
-        "answers_submitted": user_answers_dict, "report_type": report_type
-    }
+    new_report_doc = build_report_document(compiled_quiz, new_report_id, current_user["id"], user_answers_dict, report_score, datetime.utcnow())
     try:
-        insert_result = database.reports_collection.insert_one(new_report_doc)
-        logger.info(f"New report {new_report_id} (DB _id: {insert_result.inserted_id}) saved for {current_user['email']}.")
+        if submission_pipeline is not None and submission_pipeline.enqueue(new_report_doc):
+            logger.info("New report %s queued for write-behind for %s.", new_report_id, current_user["email"])
+            queued = True
+        else:
+            inserted_id = await database.insert_report(new_report_doc)
+            logger.info("New report %s (DB _id: %s) saved for %s.", new_report_id, inserted_id, current_user["email"])
+            queued = False
     except Exception as e:
-        logger.error(f"Error saving report {new_report_id} to DB for {current_user['email']}: {e}")
-        raise HTTPException(status_code=500, detail="Failed to save quiz results.")
+        logger.error("Error saving report %s to DB for %s: %s", new_report_id, current_user["email"], e)
+        raise db_error(e, "Failed to save quiz results.")
+    if not queued:
+        await apply_stored_report(new_report_doc)
     report_page_url = app.url_path_for("report_page_route", report_id=new_report_id)
-    logger.info(f"Redirecting {current_user['email']} to report: {report_page_url}")
+    if request.headers.get("content-type", "").startswith("application/json"):
+        return JSONResponse({"id": new_report_id, "url": report_page_url, "score": report_score}, status_code=201, headers={"Location": report_page_url})
+    logger.info("Redirecting %s to report: %s", current_user["email"], report_page_url)
     return RedirectResponse(url=report_page_url, status_code=303)
 
+@app.get("/matches", name="matches_route")
+async def matches_route(request: Request, k: int = MATCH_DEFAULT_K, weights: Optional[str] = None, current_user: Dict[str, Any] = Depends(get_current_user_or_htmx_redirect)):
+    # Top-k users closest to the caller's latest BFI-10/MAS-12 scores; `weights` overrides MATCH_WEIGHTS.
+    if not 1 <= k <= MATCH_MAX_K:
+        raise HTTPException(status_code=422, detail=f"k must be between 1 and {MATCH_MAX_K}.")
+    try:
+        weight_vector = parse_weights(weights) if weights else None
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    # A million-row scan is a few ms of numpy that releases the GIL; keep it off the event loop.
+    matches = await asyncio.to_thread(matching_index.top_k, current_user["id"], k, weight_vector)
+    logger.info("Matches for %s: %s of %s indexed user(s).", current_user["email"], len(matches), len(matching_index))
+    return {
+        "matches": [{"user_id": m.user_id, "compatibility": m.compatibility, "distance": m.distance} for m in matches],
+        "index_loaded": matching_index.loaded,
+    }
+
+@app.get("/export/reports", name="export_reports_route", include_in_schema=False)
+async def export_reports_route(
+    request: Request, format: str = "ndjson", fields: Optional[str] = None, quiz_id: Optional[str] = None,
+    user_id: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None, gzip: bool = False,
+):
+    # Analyst export across all users, so it takes a separate token rather than a user session.
+    if EXPORT_TOKEN is None:
+        raise HTTPException(status_code=403, detail="Export is disabled; set EXPORT_TOKEN.")
+    if not is_export_authorized(request.headers.get("authorization")):
+        raise HTTPException(status_code=401, detail="Export token required.")
+    try:
+        query = build_export_query(quiz_id, user_id, parse_timestamp(since, "since"), parse_timestamp(until, "until"))
+        encoder = ExportEncoder(format, parse_fields(fields), gzip)
+    except ExportRequestError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if not database.is_available():
+        raise db_unavailable("Report storage is unavailable.")
+    filename = encoder.filename(f"reports-{datetime.utcnow():%Y%m%dT%H%M%SZ}")
+    logger.info("Export started: %s as %s.", query, filename)
+    return StreamingResponse(stream_export(query, encoder), media_type=encoder.media_type, headers={
+        "Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store",
+    })
+
 @app.get("/healthz", status_code=200)
 async def health_check_route(): return {"status": "ok"}
 
+@app.get("/readyz", name="readiness_route")
+async def readiness_route():
+    # Liveness is /healthz; this one tells the load balancer whether to route traffic here.
+    state = await database.check_readiness()
+    state["warm"] = warmup_state.warm  # templates compiled, quiz coders and DB pool warmed
+    state["ready"] = state["ready"] and state["warm"]
+    return JSONResponse(state, status_code=200 if state["ready"] else 503, headers={"Cache-Control": "no-store"})
+
+@app.get("/static/{asset_path:path}", name="static_asset_route", include_in_schema=False)
+async def static_asset_route(request: Request, asset_path: str):
+    asset, fingerprinted = asset_manifest.resolve(asset_path)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Asset not found.")
+    return asset.response(request, immutable=fingerprinted)
+
+@app.get("/metrics", name="metrics_route", include_in_schema=False)
+async def metrics_route(request: Request):
+    if not metrics.is_authorized(request.headers.get("authorization")):
+        raise HTTPException(status_code=401, detail="Metrics token required.")
+    return PlainTextResponse(metrics.exposition(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/report/{report_id}", name="report_page_route")
 async def report_page_route(request: Request, report_id: str, current_user: Dict[str, Any] = Depends(get_current_user_or_htmx_redirect)):
-    logger.info(f"User {current_user['email']} requesting report: {report_id}")
-    if database.reports_collection is None:
-        logger.error(f"DB N/A for report {report_id}")
-        raise HTTPException(status_code=503, detail="DB service unavailable.")
+    logger.info("User %s requesting report: %s", current_user["email"], report_id)
+    fragment = wants_fragment(request)
+    # Stored reports are immutable; percentiles move only when the norms are refreshed from the DB.
+    etag = make_etag("report", report_id, current_user["id"], SCORING_VERSION, score_norms.version, PAGE_FINGERPRINT, request.state.current_year, fragment)
+    if etag_matches(request, etag):
+        return add_vary(not_modified(etag), "HX-Request")
+    cache_key = (report_id, current_user["id"], SCORING_VERSION, score_norms.version, str(request.base_url), fragment)
+    cached = report_html_cache.get(cache_key)
+    if cached is not None:
+        logger.debug("Report %s served from the render cache.", report_id)
+        cached_html, date_taken = cached
+        return add_vary(set_validators(HTMLResponse(content=cached_html), etag, date_taken), "HX-Request")
+    # Only the lookup and render are admission-controlled; revalidations and cache hits above are free.
     try:
-        report_detail = database.reports_collection.find_one({"id": report_id, "user_id": current_user["id"]})
-    except Exception as e:
-        logger.error(f"Error fetching report {report_id} from DB for {current_user['email']}: {e}")
-        raise HTTPException(status_code=500, detail="Failed to load report.")
+        async with admission_gates["report"].admit(current_user["id"]):
+            html_content, date_taken = await render_report_page(request, report_id, current_user)
+    except AdmissionRejected as e:
+        raise shed("report", current_user, e)
+    report_html_cache.set(cache_key, (html_content, date_taken))
+    return add_vary(set_validators(HTMLResponse(content=html_content), etag, date_taken), "HX-Request")
+
+async def render_report_page(request: Request, report_id: str, current_user: Dict[str, Any]) -> Tuple[str, Optional[datetime]]:
+    # A freshly submitted report may still be waiting in the write-behind buffer.
+    report_detail = submission_pipeline.get_pending(report_id, current_user["id"]) if submission_pipeline else None
+    if report_detail is None:
+        if not database.is_available():
+            logger.error("DB N/A for report %s", report_id)
+            raise db_unavailable()
+        try:
+            report_detail = await database.find_report(report_id, current_user["id"])
+        except Exception as e:
+            logger.error("Error fetching report %s from DB for %s: %s", report_id, current_user["email"], e)
+            raise db_error(e, "Failed to load report.")
     if not report_detail:
-        logger.warning(f"Report {report_id} not found or access denied for {current_user['email']}.")
+        logger.warning("Report %s not found or access denied for %s.", report_id, current_user["email"])
         raise HTTPException(status_code=404, detail=f"Report {report_id} not found/denied.")
 
+    view_model = get_report_view_model(report_detail)
     context = {
         "request": request, "title": f"Report: {html.escape(report_detail.get('quiz_title', 'Report'))}",
-        "user": current_user, "report": report_detail
+        "user": current_user, "report": report_detail,
+        "percentiles": score_norms.percentiles(report_detail.get("quiz_id"), report_detail.get("score"))
     }
-    report_type, score_data = report_detail.get("report_type"), report_detail.get("score")
-
-    # Log the type of score_data for diagnosis
-    logger.debug(f"Report {report_id} - Report Type: {report_type}, Score Data Type: {type(score_data)}, Score Data: {str(score_data)[:200]}")
-
-
-    if report_type == "bfi-10" and isinstance(score_data, dict):
-        trait_scores: Dict[str, Optional[float]] = score_data
-        radar_labels = ["Extraversion", "Agreeableness", "Conscientiousness", "Neuroticism", "Openness"]
-        # Ensure data exists for all labels, defaulting to 0.0 if not found or if score_data[label] is None
-        radar_data = [trait_scores.get(label, 0.0) if trait_scores.get(label) is not None else 0.0 for label in radar_labels]
-
-        context["radar_chart_labels"], context["radar_chart_data"] = radar_labels, radar_data
-        table_data = []
-        for trait in radar_labels:
-            score_val = trait_scores.get(trait) # Can be None if not in score_data
-            interp = get_bfi10_interpretation_details(trait, score_val)
-            table_data.append({
-                "trait": trait, "score": score_val if score_val is not None else "N/A",
-                "interpretation_level": interp["level"],
-                "interpretation_description": interp["level_specific_description"],
-                "general_trait_description": interp["general_trait_description"]
-            })
-        context["bfi_table_data"] = table_data
-        logger.info(f"Rendering BFI-10 report template ('big_five_report.html') for report {report_id}")
-        logger.debug(f"Context for BFI-10 report {report_id} (first 500 chars of radar_data): {str(context.get('radar_chart_data'))[:500]}")
-        return templates.TemplateResponse("big_five_report.html", context)
-
-    elif report_type == "mas-12" and isinstance(score_data, dict):
-        subscale_scores: Dict[str, Optional[float]] = score_data
-        pie_labels, pie_values = [], []
-        for name in MAS12_SUBSCALE_FULL_NAMES: # Iterate in defined order
-            score = subscale_scores.get(name) # Can be None
-            if score is not None: # Only include if score exists
-                pie_labels.append(name)
-                pie_values.append(float(score)) # Ensure float
-            else: # If a subscale score is missing, log it but don't add to chart
-                logger.warning(f"MAS-12 report {report_id}: Missing score for subscale '{name}'. Not including in pie chart.")
-
-
-        total_sum = sum(pie_values)
-        if total_sum > 0:
-            pie_percentages = [(v / total_sum) * 100 for v in pie_values]
-        elif pie_values: # total_sum is 0 but there are values (all must be 0)
-            pie_percentages = [0.0 for _ in pie_values] # Show as 0%
-        else: # No valid pie_values (all subscales were None or list was empty)
-            pie_percentages = []
-            pie_labels = [] # Ensure labels are also empty if no data
-
-        # Check for all_positive for Jinja if needed
-        context["all_positive_pie_data"] = any(p > 0 for p in pie_percentages)
-
-
-        context["pie_chart_labels"], context["pie_chart_data"] = pie_labels, pie_percentages
-        mas_table_data = []
-        for name in MAS12_SUBSCALE_FULL_NAMES:
-            score_val = subscale_scores.get(name)
-            mas_table_data.append({
-                "dimension": name, "score": score_val if score_val is not None else "N/A",
-                "interpretation": get_mas12_interpretation_details(name, score_val)
-            })
-        context["mas_table_data"] = mas_table_data
-        logger.info(f"Rendering MAS-12 report template ('mas_report.html') for report {report_id}")
-        logger.debug(f"Context for MAS-12 report {report_id} (pie_chart_data): {str(context.get('pie_chart_data'))}")
-        return templates.TemplateResponse("mas_report.html", context)
-    else:
-        logger.warning(
-            f"Rendering GENERIC report template ('report_page.html') for report {report_id}. "
-            f"Report Type: {report_type}, Score Data Type: {type(score_data)}"
-        )
-        return templates.TemplateResponse("report_page.html", context)
+    context.update({k: v for k, v in view_model.items() if k not in ("template", "scoring_version")})
+    template_name = view_model["template"]
+    logger.debug("Rendering report template ('%s') for report %s", template_name, report_id)
+    return render_page(request, template_name, context), report_detail.get("date_taken")
 
 if __name__ == "__main__":
     import uvicorn
     logger.info("Attempting to run Uvicorn for local development...")
     if os.getenv("MONGO_URI") and database.reports_collection is None and hasattr(app.router, 'lifespan_context') and app.router.lifespan_context:
          logger.warning("MongoDB URI set, but reports_collection is None. DB features might be unavailable.")
-    elif not os.getenv("MONGO_URI"):
+    elif not os.getenv("MONGO_URI") and database.STORAGE_BACKEND == "mongo":
         logger.warning("MONGO_URI not set. MongoDB features will be disabled.")
     uvicorn.run(
         "app.main:app", host=os.getenv("HOST", "0.0.0.0"), port=int(os.getenv("PORT", 8000)),
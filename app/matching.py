@@ -0,0 +1,282 @@
+# app/matching.py
+# Compatibility matching over each user's latest BFI-10 and MAS-12 scores. Every user is one
+# row of a float32 matrix whose columns are all scored traits, so a top-k query is two
+# matrix-vector products over the whole population plus an argpartition.
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Tuple, Iterable, Mapping, Callable
+
+import numpy as np
+
+from .scoring import SCORING_SPECS
+
+logger = logging.getLogger(__name__)
+
+# Default per-trait weights, e.g. "Neuroticism=2,Anxiety=0.5"; unlisted traits weigh 1.
+MATCH_WEIGHTS: str = os.getenv("MATCH_WEIGHTS", "")
+MATCH_DEFAULT_K: int = int(os.getenv("MATCH_DEFAULT_K", "10"))
+MATCH_MAX_K: int = int(os.getenv("MATCH_MAX_K", "100"))
+MATCH_LOAD_BATCH_SIZE: int = int(os.getenv("MATCH_LOAD_BATCH_SIZE", "5000"))
+# Seconds between full reloads from the reports; 0 loads once at startup. A worker only sees its own
+# live submissions, so multi-worker servers (app/gunicorn_conf.py) reload to pick up the others'.
+MATCH_RELOAD_S: float = float(os.getenv("MATCH_RELOAD_S", "0"))
+
+# Columns: every scored quiz's traits, in SCORING_SPECS order.
+QUIZ_COLUMNS: Dict[str, Tuple[int, ...]] = {}
+TRAIT_COLUMNS: List[Tuple[str, str]] = []  # (quiz_id, trait name) per column
+for _quiz_id, _spec in SCORING_SPECS.items():
+    QUIZ_COLUMNS[_quiz_id] = tuple(range(len(TRAIT_COLUMNS), len(TRAIT_COLUMNS) + len(_spec.trait_names)))
+    TRAIT_COLUMNS.extend((_quiz_id, name) for name in _spec.trait_names.values())
+QUIZ_SLOTS: Dict[str, int] = {quiz_id: i for i, quiz_id in enumerate(SCORING_SPECS)}
+QUIZ_BITS: Dict[str, int] = {quiz_id: 1 << i for quiz_id, i in QUIZ_SLOTS.items()}
+DIMENSIONS = len(TRAIT_COLUMNS)
+# Missing traits (e.g. a user who only took one quiz) sit at the scale midpoint; they are
+# ignored anyway unless the *query* user has that quiz.
+NEUTRAL_SCORE = 3.0
+SCORE_RANGE = 4.0  # 1..5 scales
+# NO_OVERLAP_PENALTY[query_bits][present_bits] is +inf when two users share no quiz; adding a
+# gathered row of this table is several times cheaper than a boolean-mask assignment.
+# Writes a search can patch up after its scan; more than this meanwhile and it rescans a copy.
+WRITE_LOG_SIZE = 1024
+NO_OVERLAP_PENALTY: Dict[int, np.ndarray] = {
+    bits: np.array([0.0 if other & bits else np.inf for other in range(256)], dtype=np.float32)
+    for bits in range(1, 1 << len(QUIZ_BITS))
+}
+
+
+def parse_weights(spec: str) -> np.ndarray:
+    # "Trait=weight,..." -> weight per column. Names match the stored score keys.
+    weights = np.ones(DIMENSIONS, dtype=np.float32)
+    by_name = {name: column for column, (_, name) in enumerate(TRAIT_COLUMNS)}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, sep, raw = part.partition("=")
+        column = by_name.get(name.strip())
+        if not sep or column is None:
+            raise ValueError(f"Unknown trait weight {part!r}; expected one of {', '.join(by_name)}.")
+        value = float(raw)
+        if not math.isfinite(value) or value < 0:
+            raise ValueError(f"Weight for {name.strip()} must be a non-negative number.")
+        weights[column] = value
+    return weights
+
+
+DEFAULT_WEIGHTS = parse_weights(MATCH_WEIGHTS)
+
+
+@dataclass(frozen=True)
+class Match:
+    user_id: str
+    distance: float  # weighted RMS difference on the shared 1-5 scales
+    compatibility: float  # 0-100, 100 = identical answers on every compared trait
+
+
+class MatchingIndex:
+    """Latest trait vector per user, kept in preallocated numpy arrays.
+
+    Traits are stored column-major (one contiguous float32 row per trait, one column per
+    user), which makes the two matrix-vector products of a search stream memory linearly.
+    Users are written in place and the arrays only reallocate (doubling) when full, so a
+    search scans references taken under the lock and never blocks submissions for the
+    duration of the scan. A write landing mid-scan can tear its row (new values, old
+    squares); every write bumps a version and logs its row, and the search recomputes the
+    rows written meanwhile from a copy taken under the lock (everything, if the log overflowed).
+    """
+
+    def __init__(self, capacity: int = 1024):
+        capacity = max(16, capacity)
+        self._values = np.full((DIMENSIONS, capacity), NEUTRAL_SCORE, dtype=np.float32)
+        self._squares = np.full((DIMENSIONS, capacity), NEUTRAL_SCORE * NEUTRAL_SCORE, dtype=np.float32)
+        self._present = np.zeros(capacity, dtype=np.uint8)  # QUIZ_BITS of the quizzes each user has taken
+        self._taken_at = np.full((capacity, len(QUIZ_BITS)), -np.inf, dtype=np.float64)
+        self._user_ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._version = 0
+        self._written_rows: deque = deque(maxlen=WRITE_LOG_SIZE)  # row of each of the latest writes
+        self.loaded = False
+        self.skipped = 0  # malformed reports load_documents passed over
+
+    def __len__(self) -> int:
+        return len(self._user_ids)
+
+    def _grow(self, minimum: int) -> None:
+        capacity = len(self._present)
+        if minimum <= capacity:
+            return
+        new_capacity = max(minimum, capacity * 2)
+        # Fresh arrays rather than resize(): in-flight searches keep reading the old ones.
+        for name, fill in (("_values", NEUTRAL_SCORE), ("_squares", NEUTRAL_SCORE * NEUTRAL_SCORE)):
+            new = np.full((DIMENSIONS, new_capacity), fill, dtype=np.float32)
+            new[:, :capacity] = getattr(self, name)
+            setattr(self, name, new)
+        for name, fill in (("_present", 0), ("_taken_at", -np.inf)):
+            old = getattr(self, name)
+            new = np.full((new_capacity,) + old.shape[1:], fill, dtype=old.dtype)
+            new[:capacity] = old
+            setattr(self, name, new)
+
+    def upsert(self, user_id: str, quiz_id: str, score: Any, date_taken: Optional[datetime] = None) -> bool:
+        # Newest report per (user, quiz) wins, so loads and live submissions can arrive in any order.
+        # A malformed score (a non-numeric or non-finite trait) raises ValueError or TypeError.
+        columns = QUIZ_COLUMNS.get(quiz_id)
+        if columns is None or not user_id or not isinstance(score, Mapping):
+            return False
+        vector = [score.get(TRAIT_COLUMNS[c][1]) for c in columns]
+        if all(v is None for v in vector):
+            return False
+        vector = [None if v is None else float(v) for v in vector]
+        if not all(v is None or math.isfinite(v) for v in vector):
+            raise ValueError(f"non-finite {quiz_id} score")
+        taken_at = date_taken.timestamp() if date_taken is not None else time.time()
+        return self._write(user_id, quiz_id, vector, taken_at)
+
+    def _write(self, user_id: str, quiz_id: str, vector: List[Optional[float]], taken_at: float) -> bool:
+        columns, quiz_slot = QUIZ_COLUMNS[quiz_id], QUIZ_SLOTS[quiz_id]
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is None:
+                row = len(self._user_ids)
+                self._grow(row + 1)
+                self._user_ids.append(user_id)
+                self._rows[user_id] = row
+            elif self._taken_at[row, quiz_slot] > taken_at:
+                return False
+            values = np.array([NEUTRAL_SCORE if v is None else v for v in vector], dtype=np.float32)
+            self._values[columns[0]:columns[-1] + 1, row] = values
+            self._squares[columns[0]:columns[-1] + 1, row] = values * values
+            self._present[row] |= QUIZ_BITS[quiz_id]
+            self._taken_at[row, quiz_slot] = taken_at
+            self._version += 1
+            self._written_rows.append(row)
+        return True
+
+    def replace_with(self, fresh: "MatchingIndex") -> None:
+        # Adopt a bulk-loaded index, re-applying rows written here meanwhile (newest still wins).
+        with self._lock:
+            for user_id, row in self._rows.items():
+                for quiz_id, columns in QUIZ_COLUMNS.items():
+                    if self._present[row] & QUIZ_BITS[quiz_id]:
+                        vector = [float(self._values[c, row]) for c in columns]
+                        fresh._write(user_id, quiz_id, vector, float(self._taken_at[row, QUIZ_SLOTS[quiz_id]]))
+            self._values, self._squares, self._present, self._taken_at = fresh._values, fresh._squares, fresh._present, fresh._taken_at
+            self._user_ids, self._rows = fresh._user_ids, fresh._rows
+            self._version += WRITE_LOG_SIZE + 1  # in-flight searches rescan
+            self._written_rows.clear()
+            self.loaded = True
+
+    def _rows_written_since(self, version: int) -> Optional[List[int]]:
+        # Caller holds the lock. None when the log no longer reaches back to `version`.
+        count = self._version - version
+        if count > len(self._written_rows):
+            return None
+        return list(self._written_rows)[len(self._written_rows) - count:]
+
+    def top_k(self, user_id: str, k: int = MATCH_DEFAULT_K, weights: Optional[np.ndarray] = None) -> List[Match]:
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is None:
+                return []
+            size, version = len(self._user_ids), self._version
+            values, squares, present, user_ids = self._values[:, :size], self._squares[:, :size], self._present[:size], self._user_ids
+            query, query_bits = values[:, row].copy(), int(present[row])
+        # Only traits of quizzes the querying user has taken count towards the distance.
+        weights = (DEFAULT_WEIGHTS if weights is None else weights).copy()
+        for quiz_id, bit in QUIZ_BITS.items():
+            if not query_bits & bit:
+                weights[list(QUIZ_COLUMNS[quiz_id])] = 0.0
+        total_weight = float(weights.sum())
+        if total_weight <= 0 or k <= 0:
+            return []
+        # sum_i w_i (x_i - q_i)^2 = X^2 . w - 2 X . (w q) + (w q) . q
+        weighted_query = weights * query
+        query_term = float(weighted_query @ query)
+
+        def distances_of(values: np.ndarray, squares: np.ndarray, present: np.ndarray) -> np.ndarray:
+            distances = weights @ squares
+            distances -= 2.0 * (weighted_query @ values)
+            distances += np.take(NO_OVERLAP_PENALTY[query_bits], present)
+            distances += query_term
+            return distances
+
+        distances = distances_of(values, squares, present)
+        with self._lock:
+            rows = self._rows_written_since(version) if self._version != version else []
+            if rows is None:  # too many writes, or a reload: nothing writes to these arrays without the lock
+                values, squares, present = values.copy(), squares.copy(), present.copy()
+            else:
+                rows = sorted({r for r in rows if r < size})
+                patch = (self._values[:, rows].copy(), self._squares[:, rows].copy(), self._present[rows].copy())
+        if rows is None:
+            distances = distances_of(values, squares, present)
+        elif rows:
+            distances[rows] = distances_of(*patch)
+        distances[row] = np.inf
+        k = min(k, size - 1)
+        if k <= 0:
+            return []
+        candidates = np.argpartition(distances, k - 1)[:k]
+        candidates = candidates[np.argsort(distances[candidates], kind="stable")]
+        matches = []
+        for index in candidates.tolist():
+            squared = float(distances[index])
+            if not math.isfinite(squared):
+                break
+            rms = math.sqrt(max(0.0, squared) / total_weight)
+            matches.append(Match(user_ids[index], round(rms, 4), round(100.0 * max(0.0, 1.0 - rms / SCORE_RANGE), 1)))
+        return matches
+
+    @classmethod
+    def from_arrays(cls, user_ids: List[str], values: np.ndarray, present: np.ndarray) -> "MatchingIndex":
+        # Vectorised build for synthetic populations (benchmarks); rows count as taken at load time.
+        index = cls(capacity=len(user_ids))
+        size = len(user_ids)
+        index._values[:, :size] = values.T
+        index._squares[:, :size] = values.T.astype(np.float32) ** 2
+        index._present[:size] = present
+        index._taken_at[:size] = 0.0
+        index._user_ids = list(user_ids)
+        index._rows = {user_id: row for row, user_id in enumerate(index._user_ids)}
+        index.loaded = True
+        return index
+
+    def load_documents(self, documents: Iterable[Mapping[str, Any]]) -> int:
+        # One bad report (e.g. a hand-edited score or date) is skipped and counted, not fatal to the load.
+        loaded = 0
+        for doc in documents:
+            try:
+                if self.upsert(doc.get("user_id"), doc.get("quiz_id"), doc.get("score"), doc.get("date_taken")):
+                    loaded += 1
+            except (TypeError, ValueError, AttributeError, OverflowError) as e:
+                self.skipped += 1
+                if self.skipped <= 10:
+                    logger.warning("Skipping report %s in the matching index: %s", doc.get("id"), e)
+        return loaded
+
+
+async def load_matching_index(index: MatchingIndex, documents: Iterable[Mapping[str, Any]]) -> None:
+    # Builds a fresh index from `documents` (a blocking DB cursor) on a worker thread, then swaps it in.
+    def _build() -> Tuple[MatchingIndex, int]:
+        fresh = MatchingIndex()
+        return fresh, fresh.load_documents(documents)
+    try:
+        fresh, loaded = await asyncio.to_thread(_build)
+    except Exception as e:
+        logger.error("Failed to bulk-load the matching index; serving live submissions only: %s", e)
+        return
+    index.replace_with(fresh)
+    logger.info("Matching index loaded: %s user(s) from %s report(s).", len(index), loaded)
+    if fresh.skipped:
+        logger.warning("Matching index skipped %s malformed report(s).", fresh.skipped)
+
+
+async def run_matching_reloader(index: MatchingIndex, documents: Callable[[], Iterable[Mapping[str, Any]]], interval: float = MATCH_RELOAD_S) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await load_matching_index(index, documents())
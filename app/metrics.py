@@ -0,0 +1,280 @@
+# app/metrics.py
+import abc
+import asyncio
+import hmac
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Optional, Dict, Any, List, Tuple, Callable, Sequence
+
+import jinja2
+
+from . import profiling
+
+logger = logging.getLogger(__name__)
+
+# Bearer token required to scrape /metrics; unset means the endpoint is open (e.g. behind a private network).
+METRICS_TOKEN: Optional[str] = os.getenv("METRICS_TOKEN") or None
+EVENT_LOOP_LAG_INTERVAL_S: float = float(os.getenv("EVENT_LOOP_LAG_INTERVAL_S", "0.5"))
+# Multi-worker servers (app/gunicorn_conf.py sets it): a directory every worker writes its metrics
+# to, as <pid>.prom, so whichever worker takes the scrape serves all of them, labelled by worker.
+METRICS_MULTIPROC_DIR: str = os.getenv("METRICS_MULTIPROC_DIR", "")
+METRICS_SNAPSHOT_INTERVAL_S: float = float(os.getenv("METRICS_SNAPSHOT_INTERVAL_S", "5"))
+
+LATENCY_BUCKETS: Tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS: Tuple[float, ...] = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def is_authorized(authorization: Optional[str]) -> bool:
+    # Open without METRICS_TOKEN; otherwise "Bearer <METRICS_TOKEN>", compared in constant time.
+    if METRICS_TOKEN is None:
+        return True
+    return authorization is not None and hmac.compare_digest(
+        authorization.encode("utf-8"), f"Bearer {METRICS_TOKEN}".encode("utf-8"))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(abc.ABC):
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+    @abc.abstractmethod
+    def render(self) -> List[str]:
+        """Exposition lines for this family, header included."""
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        # Plain dict update; a lost increment under a thread race is acceptable for a counter this hot.
+        self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labelvalues, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), callback: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._callback = callback
+
+    def set(self, value: float, *labelvalues: str) -> None:
+        self._values[labelvalues] = value
+
+    def render(self) -> List[str]:
+        values = dict(self._values)
+        if self._callback is not None:
+            try:
+                values.update(self._callback())
+            except Exception as e:
+                logger.error("Metric callback for %s failed: %s", self.name, e)
+        lines = self.header()
+        for labelvalues, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labelvalues)} {_format_value(float(value))}")
+        return lines
+
+
+class CallbackCounter(Gauge):
+    # A counter whose value lives elsewhere (e.g. QuizRegistry.load_count) and is read at scrape time.
+    type_name = "counter"
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labelvalues -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        series = self._series.get(labelvalues)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(labelvalues, [[0] * (len(self.buckets) + 1), 0.0, 0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labelvalues, (bucket_counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames + ("le",), labelvalues + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, labelvalues)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS_TOTAL: Counter = REGISTRY.register(Counter(
+    "mansematch_http_requests_total", "HTTP requests by route template, method and status.", ("route", "method", "status")))
+HTTP_REQUEST_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "mansematch_http_request_duration_seconds", "HTTP request latency by route template and method.", ("route", "method")))
+DB_OPERATION_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "mansematch_db_operation_duration_seconds", "MongoDB call latency by call site, including thread-pool queueing.", ("operation",)))
+DB_OPERATION_ERRORS_TOTAL: Counter = REGISTRY.register(Counter(
+    "mansematch_db_operation_errors_total", "Failed MongoDB calls by call site.", ("operation",)))
+DB_CIRCUIT_REJECTIONS_TOTAL: Counter = REGISTRY.register(Counter(
+    "mansematch_db_circuit_rejections_total", "MongoDB calls refused by the open circuit breaker, by call site.", ("operation",)))
+TEMPLATE_RENDER_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "mansematch_template_render_duration_seconds", "Jinja render time per top-level template.", ("template",), FAST_BUCKETS))
+EVENT_LOOP_LAG_SECONDS: Histogram = REGISTRY.register(Histogram(
+    "mansematch_event_loop_lag_seconds", "How late the event loop woke a periodic sleeper.", (), FAST_BUCKETS))
+
+
+def route_label(scope: Dict[str, Any]) -> str:
+    # Route template (e.g. /report/{report_id}) rather than the raw path, to keep label cardinality bounded.
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class TimedTemplate(jinja2.Template):
+    # Installed as the environment's template_class so every top-level render is timed.
+    def render(self, *args: Any, **kwargs: Any) -> str:
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            TEMPLATE_RENDER_SECONDS.observe(elapsed, self.name or "<string>")
+            profiling.record("render", elapsed)
+
+
+# --- multi-worker exposition --------------------------------------------------------------
+
+def snapshot_path(directory: str, pid: int) -> str:
+    return os.path.join(directory, f"{pid}.prom")
+
+
+def write_snapshot(directory: str = METRICS_MULTIPROC_DIR) -> None:
+    path = snapshot_path(directory, os.getpid())
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        f.write(REGISTRY.render())
+    os.replace(f"{path}.tmp", path)  # scrapes never read a half-written file
+
+
+def remove_snapshot(directory: str, pid: int) -> None:
+    # A worker's series disappear with it (gunicorn's child_exit hook calls this).
+    try:
+        os.remove(snapshot_path(directory, pid))
+    except FileNotFoundError:
+        pass
+
+
+def _add_label(sample: str, name: str, value: str) -> str:
+    label = f'{name}="{value}"'
+    metric, sep, rest = sample.partition("{")
+    if sep:
+        return f"{metric}{{{label},{rest}"
+    metric, _, rest = sample.partition(" ")
+    return f"{metric}{{{label}}} {rest}"
+
+
+def merge_snapshots(directory: str) -> str:
+    # Every worker's series under one HELP/TYPE header per family, with a worker="<pid>" label.
+    families: Dict[str, Tuple[List[str], List[str]]] = {}  # name -> (header lines, samples), first-seen order
+    for entry in sorted(os.listdir(directory)):
+        if not entry.endswith(".prom"):
+            continue
+        try:
+            with open(os.path.join(directory, entry), encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:  # the worker exited meanwhile
+            continue
+        headers, samples = [], []
+        for line in text.splitlines():
+            if line.startswith("#"):
+                headers, samples = families.setdefault(line.split(" ", 3)[2], ([], []))
+                if line not in headers:
+                    headers.append(line)
+            elif line:
+                samples.append(_add_label(line, "worker", entry[:-len(".prom")]))
+    lines: List[str] = []
+    for headers, samples in families.values():
+        lines.extend(headers)
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def exposition() -> str:
+    # What /metrics serves: this process alone, or every worker when METRICS_MULTIPROC_DIR is set.
+    if not METRICS_MULTIPROC_DIR:
+        return REGISTRY.render()
+    try:
+        write_snapshot()  # this worker's numbers as of now; siblings' are at most one interval old
+        return merge_snapshots(METRICS_MULTIPROC_DIR)
+    except OSError as e:
+        logger.error("Cannot read worker metrics from %s; serving this worker's only: %s", METRICS_MULTIPROC_DIR, e)
+        return REGISTRY.render()
+
+
+async def run_snapshot_writer(interval: float = METRICS_SNAPSHOT_INTERVAL_S) -> None:
+    while True:
+        try:
+            write_snapshot()
+        except OSError as e:
+            logger.warning("Failed to write metrics snapshot to %s: %s", METRICS_MULTIPROC_DIR, e)
+        await asyncio.sleep(interval)
+
+
+async def monitor_event_loop_lag(interval: float = EVENT_LOOP_LAG_INTERVAL_S) -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG_SECONDS.observe(max(0.0, loop.time() - expected))
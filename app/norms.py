@@ -0,0 +1,197 @@
+# app/norms.py
+# Population norms for percentile ranks. Each scored quiz has one document in the stats
+# collection:
+#   {_id: quiz_id, total: N, traits: {trait: {n: count, buckets: {"<score*100>": count}}}}
+# submit_quiz_route $inc's it for every stored report and ScoreNorms mirrors it in memory, so a
+# percentile is a walk over at most a few hundred buckets instead of a query over all reports.
+# Rebuild from the reports collection (e.g. after a re-score) with:
+#   python -m app.norms rebuild [--quiz-id bfi-10] [--batch-size 1000]
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Mapping, Iterable, Iterator, Tuple
+
+from . import database
+from .scoring import SCORING_SPECS
+
+logger = logging.getLogger(__name__)
+
+# Stored scores are rounded to 2 decimals, so a bucket per 0.01 keeps the histogram exact.
+BUCKETS_PER_POINT = 100
+# Percentiles are hidden until a trait has this many scores behind it.
+NORMS_MIN_SAMPLE: int = int(os.getenv("NORMS_MIN_SAMPLE", "30"))
+# How often each worker re-reads the stats documents to pick up other workers' submissions.
+NORMS_REFRESH_S: float = float(os.getenv("NORMS_REFRESH_S", "300"))
+
+
+def bucket_key(score: float) -> str:
+    return str(int(round(score * BUCKETS_PER_POINT)))
+
+
+def scored_traits(score: Any) -> Iterator[Tuple[str, float]]:
+    # (trait, value) for every trait a report's score dict actually has a number for.
+    if isinstance(score, dict):
+        for trait, value in score.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield trait, value
+
+
+def histogram_increments(score: Any) -> Dict[str, int]:
+    # The $inc document for one report's score dict; empty when nothing was scored.
+    increments: Dict[str, int] = {}
+    for trait, value in scored_traits(score):
+        increments[f"traits.{trait}.n"] = 1
+        increments[f"traits.{trait}.buckets.{bucket_key(value)}"] = 1
+    if increments:
+        increments["total"] = 1
+    return increments
+
+
+class TraitHistogram:
+    __slots__ = ("n", "buckets")
+
+    def __init__(self, n: int = 0, buckets: Optional[Dict[int, int]] = None):
+        self.n = n
+        self.buckets: Dict[int, int] = buckets or {}
+
+    @classmethod
+    def from_document(cls, raw: Mapping[str, Any]) -> "TraitHistogram":
+        buckets = {int(key): int(count) for key, count in (raw.get("buckets") or {}).items()}
+        return cls(int(raw.get("n", 0)), buckets)
+
+    def add(self, value: float) -> None:
+        key = int(bucket_key(value))
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+        self.n += 1
+
+    def percentile(self, value: float) -> Optional[float]:
+        # Mid-rank percentile: share of scores below plus half of the ties, in percent.
+        if self.n < max(1, NORMS_MIN_SAMPLE):
+            return None
+        key = int(bucket_key(value))
+        below = ties = 0
+        for bucket, count in self.buckets.items():
+            if bucket < key:
+                below += count
+            elif bucket == key:
+                ties = count
+        return round(100.0 * (below + 0.5 * ties) / self.n, 1)
+
+
+class ScoreNorms:
+    """In-process mirror of the stats collection.
+
+    Local submissions are applied immediately; `refresh()` replaces everything with what
+    the DB holds. `version` only moves when a refresh changes the data, so it can key page
+    caches without invalidating them on every submission.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self._quizzes: Dict[str, Dict[str, TraitHistogram]] = {}
+        self._raw: Dict[str, Any] = {}
+
+    def apply(self, quiz_id: str, score: Any) -> None:
+        traits = self._quizzes.setdefault(quiz_id, {})
+        for trait, value in scored_traits(score):
+            traits.setdefault(trait, TraitHistogram()).add(value)
+
+    def load_documents(self, documents: Iterable[Mapping[str, Any]]) -> bool:
+        raw = {str(doc["_id"]): doc.get("traits") or {} for doc in documents}
+        if raw == self._raw:
+            return False
+        self._quizzes = {
+            quiz_id: {trait: TraitHistogram.from_document(hist) for trait, hist in traits.items()}
+            for quiz_id, traits in raw.items()
+        }
+        self._raw = raw
+        self.version += 1
+        return True
+
+    async def refresh(self) -> None:
+        if database.stats_collection is None:
+            return
+        try:
+            if self.load_documents(await database.find_score_stats()):
+                logger.info("Score norms refreshed (version %s, %s quiz(zes)).", self.version, len(self._quizzes))
+        except Exception as e:
+            logger.error("Failed to refresh score norms; keeping the previous histograms: %s", e)
+
+    async def run_refresher(self, interval: float = NORMS_REFRESH_S) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(interval)
+
+    def percentiles(self, quiz_id: Optional[str], score: Any) -> Dict[str, Optional[float]]:
+        traits = self._quizzes.get(quiz_id or "", {})
+        result: Dict[str, Optional[float]] = {}
+        for trait, value in scored_traits(score):
+            histogram = traits.get(trait)
+            result[trait] = histogram.percentile(value) if histogram is not None else None
+        return result
+
+
+# --- rebuild ---------------------------------------------------------------------------
+
+def rebuild_norms(reports, stats, quiz_ids: List[str], batch_size: int, dry_run: bool) -> Dict[str, int]:
+    # Streams every report's score and replaces each quiz's stats document in one write.
+    # Submissions landing while the scan runs may be missed; run during a quiet period.
+    totals: Dict[str, int] = {}
+    for quiz_id in quiz_ids:
+        histograms: Dict[str, TraitHistogram] = {}
+        total = 0
+        cursor = reports.find({"quiz_id": quiz_id}, {"_id": 0, "score": 1}, no_cursor_timeout=True).batch_size(batch_size)
+        try:
+            for doc in cursor:
+                values = list(scored_traits(doc.get("score")))
+                if values:
+                    total += 1
+                for trait, value in values:
+                    histograms.setdefault(trait, TraitHistogram()).add(value)
+        finally:
+            cursor.close()
+        totals[quiz_id] = total
+        logger.info("%s: %s scored report(s) across %s trait(s).", quiz_id, total, len(histograms))
+        if dry_run:
+            continue
+        document = {
+            "_id": quiz_id, "total": total, "updated_at": datetime.utcnow(),
+            "traits": {
+                trait: {"n": hist.n, "buckets": {str(k): c for k, c in sorted(hist.buckets.items())}}
+                for trait, hist in histograms.items()
+            },
+        }
+        stats.replace_one({"_id": quiz_id}, document, upsert=True)
+    return totals
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Maintain the population score histograms used for percentiles.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild = sub.add_parser("rebuild", help="Recompute the histograms from all stored reports.")
+    rebuild.add_argument("--quiz-id", action="append", choices=sorted(SCORING_SPECS), help="Limit to a quiz (repeatable). Default: all scored quizzes.")
+    rebuild.add_argument("--batch-size", type=int, default=1000)
+    rebuild.add_argument("--dry-run", action="store_true", help="Compute and log counts but do not write.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+
+    database.connect_to_mongo()
+    if database.reports_collection is None or database.stats_collection is None:
+        logger.critical("MongoDB is not available; cannot rebuild norms.")
+        return 1
+    try:
+        totals = rebuild_norms(
+            database.reports_collection, database.stats_collection,
+            args.quiz_id or sorted(SCORING_SPECS), max(1, args.batch_size), args.dry_run
+        )
+    finally:
+        database.close_mongo_connection()
+    logger.info("Norms rebuild finished: %s%s.", totals, " (dry run)" if args.dry_run else "")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,203 @@
+# app/profiling.py
+# Per-request phase timings and on-demand profiles.
+#  * span("db") / record("render", seconds) add to the current request's timings, which are
+#    sent back as a Server-Timing header; outside a timed request they cost one ContextVar get.
+#  * A request is profiled when it carries `X-Profile-Token: <PROFILE_TOKEN>` or is picked by
+#    PROFILE_SAMPLE_RATE. "collapsed" samples the event-loop thread's stack every
+#    PROFILE_SAMPLE_INTERVAL_MS into flamegraph.pl / speedscope input; "pstats" runs cProfile
+#    (load with `python -m pstats`). Either way the profile covers everything the event loop
+#    ran meanwhile, including other requests; blocking DB calls show up as the "db" span
+#    rather than as stacks, since they run on the executor threads.
+import cProfile
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, Dict, List, ContextManager
+
+# Operators send this in X-Profile-Token to profile one request; unset disables on-demand profiles.
+PROFILE_TOKEN: Optional[str] = os.getenv("PROFILE_TOKEN") or None
+# Fraction of all requests profiled without being asked (0 = never).
+PROFILE_SAMPLE_RATE: float = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR: Path = Path(os.getenv("PROFILE_DIR", "profiles"))
+PROFILE_FORMAT: str = os.getenv("PROFILE_FORMAT", "collapsed").lower()  # collapsed | pstats
+PROFILE_SAMPLE_INTERVAL_MS: float = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1"))
+# Server-Timing on every response; otherwise only profiled requests get one.
+SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "false").lower() in ("1", "true", "yes")
+
+PROFILE_FORMATS = ("collapsed", "pstats")
+
+
+class RequestTimings:
+    """Total time and count per named phase of one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, List[float]] = {}  # name -> [seconds, count]
+
+    def add(self, name: str, seconds: float) -> None:
+        phase = self.phases.get(name)
+        if phase is None:
+            self.phases[name] = [seconds, 1]
+        else:
+            phase[0] += seconds
+            phase[1] += 1
+
+    def server_timing(self) -> str:
+        # Concurrent phases (e.g. gathered DB calls) add up, so they can exceed "total".
+        entries = [
+            f'{name};dur={seconds * 1000:.2f}' + (f';desc="{int(count)}x"' if count > 1 else "")
+            for name, (seconds, count) in self.phases.items()
+        ]
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(entries)
+
+
+_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def start_timings() -> RequestTimings:
+    # Called by the middleware before the handler runs; tasks it spawns inherit the same object.
+    timings = RequestTimings()
+    _timings.set(timings)
+    return timings
+
+
+def record(name: str, seconds: float) -> None:
+    timings = _timings.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+class _Span:
+    __slots__ = ("timings", "name", "started")
+
+    def __init__(self, timings: RequestTimings, name: str):
+        self.timings, self.name = timings, name
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self.timings.add(self.name, time.perf_counter() - self.started)
+
+
+_NO_SPAN = nullcontext()
+
+
+def span(name: str) -> ContextManager[None]:
+    # `with span("score"): ...`; a shared no-op outside timed requests.
+    timings = _timings.get()
+    return _NO_SPAN if timings is None else _Span(timings, name)
+
+
+def _frame_label(code) -> str:
+    path = code.co_filename.replace("\\", "/").rsplit("/", 2)
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer thread and counts identical stacks."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = max(0.0001, interval)
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        labels: Dict[object, str] = {}
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfiler:
+    """Profiles one request at a time per process; a request arriving meanwhile is just timed."""
+
+    def __init__(self, fmt: str = PROFILE_FORMAT, directory: Path = PROFILE_DIR, interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS):
+        if fmt not in PROFILE_FORMATS:
+            raise ValueError(f"PROFILE_FORMAT must be one of {', '.join(PROFILE_FORMATS)}, got {fmt!r}.")
+        self.format = fmt
+        self.directory = directory
+        self.interval = interval_ms / 1000.0
+        self.profiles_written = 0
+        self._busy = threading.Lock()
+        self._sampler: Optional[StackSampler] = None
+        self._profile: Optional[cProfile.Profile] = None
+
+    def start(self) -> bool:
+        if not self._busy.acquire(blocking=False):
+            return False
+        if self.format == "pstats":
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError:  # another profiler (e.g. a debugger) is active
+                self._profile = None
+                self._busy.release()
+                return False
+        else:
+            self._sampler = StackSampler(threading.get_ident(), self.interval)
+            self._sampler.start()
+        return True
+
+    def stop(self) -> None:
+        # On the thread that called start(); cheap. The file is written by save().
+        if self._profile is not None:
+            self._profile.disable()
+        elif self._sampler is not None:
+            self._sampler.stop()
+
+    def save(self, label: str) -> Path:
+        # Blocking file write; releases the profiler for the next request.
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            safe_label = re.sub(r"[^A-Za-z0-9_.-]+", "_", label).strip("_")[:80] or "root"
+            path = self.directory / f"{datetime.utcnow():%Y%m%dT%H%M%S.%f}-{safe_label}.{'pstats' if self.format == 'pstats' else 'collapsed'}"
+            if self._profile is not None:
+                self._profile.dump_stats(str(path))
+            elif self._sampler is not None:
+                path.write_text(self._sampler.collapsed(), encoding="utf-8")
+            self.profiles_written += 1
+            return path
+        finally:
+            self._profile, self._sampler = None, None
+            self._busy.release()
+
+
+def is_operator(token: Optional[str]) -> bool:
+    # The X-Profile-Token header matches PROFILE_TOKEN.
+    return token is not None and PROFILE_TOKEN is not None and hmac.compare_digest(token.encode("utf-8"), PROFILE_TOKEN.encode("utf-8"))
+
+
+def sampled() -> bool:
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
@@ -0,0 +1,226 @@
+# app/quizzes.py
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Optional, Dict, Any, List, Tuple, FrozenSet, Mapping, Sequence
+
+from .assets import StaticAsset, build_asset
+
+logger = logging.getLogger(__name__)
+
+# How often (seconds) the registry is allowed to stat() the quiz files to look for edits.
+# 0 checks on every access, a negative value disables hot reload entirely.
+QUIZ_RELOAD_CHECK_SECONDS: float = float(os.getenv("QUIZ_RELOAD_CHECK_SECONDS", "5"))
+QUIZ_DIR = Path(__file__).resolve().parent
+# The definitions the app serves. The maintenance CLIs build their own QuizRegistry(QUIZ_FILES)
+# instead of importing app.main, which would set up the whole web app.
+QUIZ_FILES: Tuple[Path, ...] = (QUIZ_DIR / "big_five.json", QUIZ_DIR / "mas.json")
+
+
+@dataclass(frozen=True)
+class CompiledQuestion:
+    id: str
+    index: int
+    key: Optional[str]
+    trait_key: Optional[str]  # "E_R" -> "E", "PP" -> "PP"
+    is_reversed: bool
+    valid_values: FrozenSet[float]  # values allowed by options_map; empty means unconstrained
+
+
+@dataclass(frozen=True)
+class CompiledQuiz:
+    id: str
+    title: str
+    description: str
+    questions: Tuple[CompiledQuestion, ...]
+    questions_by_id: Mapping[str, CompiledQuestion]
+    definition: Dict[str, Any]  # original quiz JSON for templates; treat as read-only
+    definition_hash: str  # sha256 of the canonical definition JSON
+    # That JSON, precompressed, served by GET /quiz/{id}/definition.{definition_version}.json.
+    definition_asset: StaticAsset
+
+    @property
+    def definition_version(self) -> str:
+        return self.definition_hash[:12]
+
+
+def compile_question(raw_question: Dict[str, Any], index: int) -> CompiledQuestion:
+    key = raw_question.get("key")
+    trait_key: Optional[str] = None
+    is_reversed = False
+    if isinstance(key, str) and key:
+        is_reversed = key.endswith("_R")
+        trait_key = key[:-2] if is_reversed else key
+    valid_values = set()
+    for option in raw_question.get("options_map") or []:
+        try:
+            valid_values.add(float(option["value"]))
+        except (KeyError, ValueError, TypeError):
+            logger.warning("Question %s: ignoring malformed option %r", raw_question.get("id"), option)
+    return CompiledQuestion(
+        id=str(raw_question.get("id")), index=index, key=key, trait_key=trait_key,
+        is_reversed=is_reversed, valid_values=frozenset(valid_values)
+    )
+
+
+def compile_quiz(raw_quiz: Dict[str, Any]) -> CompiledQuiz:
+    definition = copy.deepcopy(raw_quiz)
+    definition.setdefault("questions", [])
+    questions = tuple(compile_question(q, i) for i, q in enumerate(definition["questions"]))
+    canonical = json.dumps(definition, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return CompiledQuiz(
+        id=str(definition["id"]),
+        title=definition.get("title", "Quiz"),
+        description=definition.get("description", "No description."),
+        questions=questions,
+        questions_by_id=MappingProxyType({q.id: q for q in questions}),
+        definition=definition,
+        definition_hash=hashlib.sha256(canonical).hexdigest(),
+        definition_asset=build_asset(f"quiz/{definition['id']}/definition.json", canonical, "application/json"),
+    )
+
+
+class _FileState:
+    __slots__ = ("mtime_ns", "content_hash", "quizzes")
+
+    def __init__(self, mtime_ns: int, content_hash: str, quizzes: Tuple[CompiledQuiz, ...]):
+        self.mtime_ns = mtime_ns
+        self.content_hash = content_hash
+        self.quizzes = quizzes
+
+
+class QuizRegistry:
+    """Compiled, id-indexed view of the quiz JSON files.
+
+    Built once at startup; afterwards lookups are pure dict reads. The source files are
+    re-stat()ed at most every ``check_interval`` seconds and only re-parsed when the
+    mtime moved *and* the content hash actually changed.
+    """
+
+    def __init__(self, quiz_files: Sequence[Path], check_interval: float = QUIZ_RELOAD_CHECK_SECONDS):
+        self.quiz_files = [Path(p) for p in quiz_files]
+        self.check_interval = check_interval
+        self.load_count = 0
+        self._files: Dict[Path, _FileState] = {}
+        self._snapshot: Tuple[Mapping[str, CompiledQuiz], Tuple[CompiledQuiz, ...], str] = (MappingProxyType({}), (), "")
+        self._loaded = False
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        with self._lock:
+            self._reload_files(force=True)
+            self._loaded = True
+            self._last_check = time.monotonic()
+
+    def refresh_if_stale(self) -> bool:
+        if not self._loaded:
+            self.load()
+            return True
+        if self.check_interval < 0:
+            return False
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return False
+        if not self._lock.acquire(blocking=False):
+            return False  # another thread is already checking; keep serving the current snapshot
+        try:
+            self._last_check = now
+            return self._reload_files(force=False)
+        finally:
+            self._lock.release()
+
+    def get(self, quiz_id: str) -> Optional[CompiledQuiz]:
+        self.refresh_if_stale()
+        return self._snapshot[0].get(quiz_id)
+
+    def all(self) -> Tuple[CompiledQuiz, ...]:
+        self.refresh_if_stale()
+        return self._snapshot[1]
+
+    def fingerprint(self) -> str:
+        # Changes whenever any quiz definition (or the set of quizzes) changes.
+        self.refresh_if_stale()
+        return self._snapshot[2]
+
+    def definitions(self) -> List[Dict[str, Any]]:
+        return [quiz.definition for quiz in self.all()]
+
+    def _reload_files(self, force: bool) -> bool:
+        changed = False
+        for file_path in self.quiz_files:
+            previous = self._files.get(file_path)
+            try:
+                mtime_ns = file_path.stat().st_mtime_ns
+            except FileNotFoundError:
+                logger.error("Quiz data file %s not found.", file_path)
+                if previous is not None:
+                    del self._files[file_path]
+                    changed = True
+                continue
+            if not force and previous is not None and previous.mtime_ns == mtime_ns:
+                continue
+            state = self._load_file(file_path, mtime_ns, previous)
+            if state is None:
+                continue
+            if previous is not None and previous.content_hash == state.content_hash:
+                previous.mtime_ns = mtime_ns  # touched but unchanged; nothing to rebuild
+                continue
+            self._files[file_path] = state
+            changed = True
+        if changed or force:
+            self._rebuild_index()
+        return changed
+
+    def _load_file(self, file_path: Path, mtime_ns: int, previous: Optional[_FileState]) -> Optional[_FileState]:
+        try:
+            raw_bytes = file_path.read_bytes()
+        except OSError as e:
+            logger.error("An unexpected error occurred while loading %s: %s", file_path, e)
+            return None
+        content_hash = hashlib.sha256(raw_bytes).hexdigest()
+        if previous is not None and previous.content_hash == content_hash:
+            return _FileState(mtime_ns, content_hash, previous.quizzes)
+        try:
+            data = json.loads(raw_bytes)
+        except json.JSONDecodeError as e:
+            logger.error("Error decoding %s: %s. Keeping previously loaded quizzes, if any.", file_path, e)
+            return None
+        if "quizzes" not in data or not isinstance(data["quizzes"], list):
+            logger.warning("File %s does not contain a 'quizzes' list. Skipping.", file_path)
+            return None
+        compiled = []
+        for raw_quiz in data["quizzes"]:
+            try:
+                compiled.append(compile_quiz(raw_quiz))
+            except Exception as e:
+                logger.error("Could not compile quiz %r from %s: %s", raw_quiz.get("id") if isinstance(raw_quiz, dict) else raw_quiz, file_path, e)
+        self.load_count += 1
+        logger.info("Loaded %s quiz(zes) from %s (sha256 %s).", len(compiled), file_path, content_hash[:12])
+        return _FileState(mtime_ns, content_hash, tuple(compiled))
+
+    def _rebuild_index(self) -> None:
+        ordered: List[CompiledQuiz] = []
+        by_id: Dict[str, CompiledQuiz] = {}
+        for file_path in self.quiz_files:
+            state = self._files.get(file_path)
+            if state is None:
+                continue
+            for quiz in state.quizzes:
+                if quiz.id in by_id:
+                    logger.warning("Duplicate quiz id '%s' in %s; keeping the first definition.", quiz.id, file_path)
+                    continue
+                by_id[quiz.id] = quiz
+                ordered.append(quiz)
+        if not ordered:
+            logger.warning("No quiz definitions loaded. Returning empty quiz list.")
+        # Swap both views in one assignment so readers never see a half-built registry.
+        fingerprint = hashlib.sha256("|".join(q.definition_hash for q in ordered).encode("ascii")).hexdigest()[:16]
+        self._snapshot = (MappingProxyType(by_id), tuple(ordered), fingerprint)
@@ -0,0 +1,172 @@
+# app/report_views.py
+import logging
+from datetime import datetime
+from typing import Optional, Dict, Any, List
+
+from .quizzes import CompiledQuiz
+from .scoring import BFI10_SPEC, MAS12_SPEC, SCORING_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Stored as the score of reports for quizzes without scoring rules.
+UNSCORED_REPORT_SCORE = "N/A - Scoring not implemented for this quiz type"
+
+BFI10_TRAIT_DESCRIPTIONS = {
+    "Extraversion": "Reflects tendency to be sociable, assertive, and energetic vs. reserved and quiet.",
+    "Agreeableness": "Reflects tendency to be compassionate, cooperative, and kind vs. antagonistic and critical.",
+    "Conscientiousness": "Reflects tendency to be organized, dependable, and responsible vs. careless and impulsive.",
+    "Neuroticism": "Reflects tendency to experience negative emotions, such as anxiety and sadness (Emotional Stability is the inverse).",
+    "Openness": "Reflects tendency to be imaginative, curious, and open to new experiences vs. conventional and preferring routine."
+}
+
+def get_bfi10_interpretation_details(trait_name: str, score: Optional[float]) -> Dict[str, str]:
+    level = "N/A"
+    level_description = "Score not available or trait not applicable."
+    if score is not None:
+        if score < 2.5: level = "Low"
+        elif score <= 3.5: level = "Average"
+        else: level = "High"
+
+        if trait_name == "Neuroticism":
+            if level == "Low": level_description = "Indicates a tendency to be calm, emotionally stable, and resilient to stress."
+            elif level == "Average": level_description = f"Indicates a moderate or balanced expression of typical {trait_name.lower()} characteristics."
+            else: level_description = "Indicates a tendency to experience emotional fluctuations, anxiety, or moodiness more frequently."
+        else:
+            if level == "Low": level_description = f"Indicates a lower expression of typical {trait_name.lower()} characteristics."
+            elif level == "Average": level_description = f"Indicates a moderate or balanced expression of typical {trait_name.lower()} characteristics."
+            else: level_description = f"Indicates a higher expression of typical {trait_name.lower()} characteristics."
+    else:
+        level = "N/A"
+        level_description = "This trait was not scored."
+
+    general_description = BFI10_TRAIT_DESCRIPTIONS.get(trait_name, "General description not available.")
+    return {
+        "level": level,
+        "level_specific_description": level_description,
+        "general_trait_description": general_description
+    }
+
+MAS12_SUBSCALE_MAP = dict(MAS12_SPEC.trait_names)
+MAS12_SUBSCALE_FULL_NAMES = list(MAS12_SUBSCALE_MAP.values())
+
+def get_mas12_interpretation_details(dimension_name: str, score: Optional[float]) -> str:
+    if score is None: return "Score not available."
+    level = "Low" if score < 2.5 else "Medium" if score <= 3.5 else "High"
+    interpretation_map = {
+        "Power-Prestige": {
+            "Low": "Minimal view of money as a status symbol.",
+            "Medium": "Views money as a moderate status symbol.",
+            "High": "Strongly views money as a symbol of status and success."
+        },
+        "Retention-Time": {
+            "Low": "Less focused on saving and long-term planning.",
+            "Medium": "Moderate focus on saving and planning for the future.",
+            "High": "Strong focus on saving and future financial planning."
+        },
+        "Distrust": {
+            "Low": "Generally trusting in money matters and dealings with others.",
+            "Medium": "Some caution regarding money and others' motives.",
+            "High": "Significant suspicion or cynicism about money dealings and motives."
+        },
+        "Anxiety": {
+            "Low": "Little worry or stress about financial matters.",
+            "Medium": "Moderate worry or concern about finances.",
+            "High": "Frequent and significant anxiety or stress concerning money."
+        }
+    }
+    interp_text = interpretation_map.get(dimension_name, {}).get(level, "Interpretation not available.")
+    return f"{level}: {interp_text}"
+
+
+BFI10_TRAIT_ORDER: List[str] = list(BFI10_SPEC.trait_names.values())
+
+
+def _build_bfi10_view_model(trait_scores: Dict[str, Optional[float]]) -> Dict[str, Any]:
+    radar_labels = BFI10_TRAIT_ORDER
+    # Ensure data exists for all labels, defaulting to 0.0 if not found or if score_data[label] is None
+    radar_data = [trait_scores.get(label) if trait_scores.get(label) is not None else 0.0 for label in radar_labels]
+    table_data = []
+    for trait in radar_labels:
+        score_val = trait_scores.get(trait) # Can be None if not in score_data
+        interp = get_bfi10_interpretation_details(trait, score_val)
+        table_data.append({
+            "trait": trait, "score": score_val if score_val is not None else "N/A",
+            "interpretation_level": interp["level"],
+            "interpretation_description": interp["level_specific_description"],
+            "general_trait_description": interp["general_trait_description"]
+        })
+    return {"radar_chart_labels": list(radar_labels), "radar_chart_data": radar_data, "bfi_table_data": table_data}
+
+
+def _build_mas12_view_model(subscale_scores: Dict[str, Optional[float]], report_id: Optional[str]) -> Dict[str, Any]:
+    pie_labels, pie_values, missing = [], [], []
+    for name in MAS12_SUBSCALE_FULL_NAMES: # Iterate in defined order
+        score = subscale_scores.get(name) # Can be None
+        if score is not None: # Only include if score exists
+            pie_labels.append(name)
+            pie_values.append(float(score)) # Ensure float
+        else: # If a subscale score is missing, don't add it to the chart
+            missing.append(name)
+    if missing: # One line per report, however many subscales are missing
+        logger.warning("MAS-12 report %s: missing scores for %s; not included in pie chart.", report_id, missing)
+
+    total_sum = sum(pie_values)
+    if total_sum > 0:
+        pie_percentages = [(v / total_sum) * 100 for v in pie_values]
+    elif pie_values: # total_sum is 0 but there are values (all must be 0)
+        pie_percentages = [0.0 for _ in pie_values] # Show as 0%
+    else: # No valid pie_values (all subscales were None or list was empty)
+        pie_percentages = []
+        pie_labels = [] # Ensure labels are also empty if no data
+
+    mas_table_data = []
+    for name in MAS12_SUBSCALE_FULL_NAMES:
+        score_val = subscale_scores.get(name)
+        mas_table_data.append({
+            "dimension": name, "score": score_val if score_val is not None else "N/A",
+            "interpretation": get_mas12_interpretation_details(name, score_val)
+        })
+    return {
+        "pie_chart_labels": pie_labels, "pie_chart_data": pie_percentages,
+        "all_positive_pie_data": any(p > 0 for p in pie_percentages),
+        "mas_table_data": mas_table_data
+    }
+
+
+def build_report_view_model(report_type: Optional[str], score_data: Any, report_id: Optional[str] = None) -> Dict[str, Any]:
+    # Everything the report templates need beyond the report document itself. Computed once at
+    # submit time and stored on the report as "view_model"; only plain JSON/BSON types inside.
+    if report_type == "bfi-10" and isinstance(score_data, dict):
+        view_model = _build_bfi10_view_model(score_data)
+        view_model["template"] = "big_five_report.html"
+    elif report_type == "mas-12" and isinstance(score_data, dict):
+        view_model = _build_mas12_view_model(score_data, report_id)
+        view_model["template"] = "mas_report.html"
+    else:
+        view_model = {"template": "report_page.html"}
+    view_model["scoring_version"] = SCORING_VERSION
+    return view_model
+
+
+def build_report_document(
+    quiz: CompiledQuiz, report_id: str, user_id: str, answers: Dict[str, Any], score: Any, date_taken: datetime
+) -> Dict[str, Any]:
+    # The stored report, shared by the submit route and bulk imports.
+    definition = quiz.definition
+    return {
+        "id": report_id, "user_id": user_id, "quiz_id": quiz.id,
+        "quiz_title": definition.get('title', 'Quiz'),
+        "quiz_description": definition.get('description', 'No description.'),
+        "score": score, "date_taken": date_taken,
+        "answers_submitted": answers, "report_type": quiz.id,
+        "scoring_version": SCORING_VERSION,
+        "view_model": build_report_view_model(quiz.id, score, report_id),
+    }
+
+
+def get_report_view_model(report_detail: Dict[str, Any]) -> Dict[str, Any]:
+    # Stored view model when it was built by the current scoring version, otherwise rebuild (old reports).
+    stored = report_detail.get("view_model")
+    if isinstance(stored, dict) and stored.get("scoring_version") == SCORING_VERSION and stored.get("template"):
+        return stored
+    return build_report_view_model(report_detail.get("report_type"), report_detail.get("score"), report_detail.get("id"))
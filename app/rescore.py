@@ -0,0 +1,112 @@
+# app/rescore.py
+# Re-score stored reports with the current scoring rules, e.g. after changing a key or pivot:
+#   python -m app.rescore [--quiz-id bfi-10] [--batch-size 1000] [--only-stale] [--dry-run] [--skip-derived]
+# Scores are copied into derived data, which is rebuilt afterwards unless --skip-derived: the
+# norm histograms (python -m app.norms rebuild) and the dashboard summaries (python -m app.summaries
+# rebuild). Running workers' matching indexes keep the old scores until they reload (MATCH_RELOAD_S)
+# or restart.
+import argparse
+import logging
+import os
+import sys
+from typing import Dict, Any, List, Optional
+
+from pymongo import UpdateOne
+
+from . import database
+from .norms import rebuild_norms
+from .summaries import rebuild_summaries
+from .quizzes import QuizRegistry, QUIZ_FILES
+from .scoring import get_scorer, SCORING_SPECS, SCORING_VERSION
+from .report_views import build_report_view_model
+
+logger = logging.getLogger(__name__)
+
+quiz_registry = QuizRegistry(QUIZ_FILES)
+
+RESCORE_PROJECTION = {"_id": 1, "id": 1, "quiz_id": 1, "report_type": 1, "answers_submitted": 1}
+
+
+def rescore_reports(collection, quiz_ids: List[str], batch_size: int, only_stale: bool, dry_run: bool) -> Dict[str, int]:
+    totals = {"scanned": 0, "modified": 0}
+    for quiz_id in quiz_ids:
+        quiz = quiz_registry.get(quiz_id)
+        scorer = get_scorer(quiz) if quiz else None
+        if scorer is None:
+            logger.error("Quiz %s has no definition or no scoring rules; skipping.", quiz_id)
+            continue
+        query: Dict[str, Any] = {"quiz_id": quiz_id}
+        if only_stale:
+            query["scoring_version"] = {"$ne": SCORING_VERSION}
+        cursor = collection.find(query, RESCORE_PROJECTION, no_cursor_timeout=True).batch_size(batch_size)
+        batch: List[Dict[str, Any]] = []
+        try:
+            for doc in cursor:
+                batch.append(doc)
+                if len(batch) >= batch_size:
+                    _rescore_batch(collection, scorer, batch, totals, dry_run)
+                    batch = []
+            if batch:
+                _rescore_batch(collection, scorer, batch, totals, dry_run)
+        finally:
+            cursor.close()
+        logger.info("%s: scanned %s report(s) so far, modified %s.", quiz_id, totals["scanned"], totals["modified"])
+    return totals
+
+
+def _rescore_batch(collection, scorer, batch: List[Dict[str, Any]], totals: Dict[str, int], dry_run: bool) -> None:
+    scores = scorer.score_batch([doc.get("answers_submitted") or {} for doc in batch])
+    totals["scanned"] += len(batch)
+    if dry_run:
+        return
+    operations = [
+        UpdateOne({"_id": doc["_id"]}, {"$set": {
+            "score": score, "scoring_version": SCORING_VERSION,
+            "view_model": build_report_view_model(doc.get("report_type"), score, doc.get("id")),
+        }})
+        for doc, score in zip(batch, scores)
+    ]
+    result = collection.bulk_write(operations, ordered=False)
+    totals["modified"] += result.modified_count
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Re-score stored quiz reports in batches.")
+    parser.add_argument("--quiz-id", action="append", choices=sorted(SCORING_SPECS), help="Limit to a quiz (repeatable). Default: all scored quizzes.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--only-stale", action="store_true", help=f"Only reports whose scoring_version != {SCORING_VERSION}.")
+    parser.add_argument("--dry-run", action="store_true", help="Score but do not write anything back.")
+    parser.add_argument("--skip-derived", action="store_true", help="Do not rebuild the norms and dashboard summaries afterwards.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+
+    database.connect_to_mongo()
+    if database.reports_collection is None:
+        logger.critical("MongoDB is not available; nothing to re-score.")
+        return 1
+    quiz_ids, batch_size = args.quiz_id or sorted(SCORING_SPECS), max(1, args.batch_size)
+    try:
+        quiz_registry.load()
+        totals = rescore_reports(database.reports_collection, quiz_ids, batch_size, args.only_stale, args.dry_run)
+        logger.info("Re-score finished: scanned %s, modified %s%s.", totals["scanned"], totals["modified"], " (dry run)" if args.dry_run else "")
+        if totals["modified"] and not args.skip_derived:
+            if database.stats_collection is not None:
+                rebuild_norms(database.reports_collection, database.stats_collection, quiz_ids, batch_size, dry_run=False)
+            if database.summaries_collection is not None:
+                logger.info("Summaries rebuilt: %s.", rebuild_summaries(
+                    database.reports_collection, database.summaries_collection, None, batch_size, dry_run=False
+                ))
+        elif totals["modified"]:
+            logger.warning(
+                "Derived data still holds the old scores; run `python -m app.norms rebuild%s` and "
+                "`python -m app.summaries rebuild`.", "".join(f" --quiz-id {q}" for q in quiz_ids)
+            )
+    finally:
+        database.close_mongo_connection()
+    if totals["modified"]:
+        logger.warning("Running app workers keep the old scores in their matching index until it reloads (MATCH_RELOAD_S) or they restart.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
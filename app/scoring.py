@@ -0,0 +1,163 @@
+# app/scoring.py
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Tuple, Mapping, Sequence, Union
+
+import numpy as np
+
+from .quizzes import CompiledQuiz, CompiledQuestion, compile_question
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever a scoring key, reverse pivot or valid range changes. Stored on every report
+# so `python -m app.rescore --only-stale` can find documents scored by an older version.
+SCORING_VERSION = 1
+
+
+@dataclass(frozen=True)
+class ScoringSpec:
+    quiz_id: str
+    trait_names: Mapping[str, str]  # trait key from the quiz JSON -> name stored in the report (ordered)
+    reverse_pivot: float = 6.0  # reversed items score as (pivot - answer)
+    valid_range: Optional[Tuple[float, float]] = None  # answers outside the range are ignored
+
+
+BFI10_SPEC = ScoringSpec(
+    quiz_id="bfi-10",
+    trait_names={
+        "E": "Extraversion", "A": "Agreeableness", "C": "Conscientiousness",
+        "N": "Neuroticism", "O": "Openness"
+    },
+)
+MAS12_SPEC = ScoringSpec(
+    quiz_id="mas-12",
+    trait_names={"PP": "Power-Prestige", "RT": "Retention-Time", "D": "Distrust", "A": "Anxiety"},
+    valid_range=(1.0, 5.0),
+)
+SCORING_SPECS: Dict[str, ScoringSpec] = {spec.quiz_id: spec for spec in (BFI10_SPEC, MAS12_SPEC)}
+
+
+class CompiledScorer:
+    """Scores answer sets for one quiz as a single matrix product.
+
+    Each quiz is compiled into a (questions x traits) 0/1 weight matrix plus a reverse-item
+    mask. N answer sets become an (N x questions) float matrix with NaN for missing or
+    invalid answers, so a trait mean is ``sum(A @ W) / count(mask @ W)``.
+    """
+
+    def __init__(self, spec: ScoringSpec, questions: Sequence[CompiledQuestion]):
+        self.spec = spec
+        self.trait_names: Tuple[str, ...] = tuple(spec.trait_names.values())
+        trait_columns = {key: i for i, key in enumerate(spec.trait_names)}
+        scored: List[Tuple[CompiledQuestion, int]] = []
+        for question in questions:
+            if question.trait_key is None:
+                logger.warning("%s QID %s: no scoring key; question ignored.", spec.quiz_id, question.id)
+                continue
+            column = trait_columns.get(question.trait_key)
+            if column is None:
+                logger.warning("%s QID %s: unknown trait key '%s'; question ignored.", spec.quiz_id, question.id, question.key)
+                continue
+            scored.append((question, column))
+        self.question_ids: Tuple[str, ...] = tuple(q.id for q, _ in scored)
+        # Positions of the scored questions within the quiz, to pick them out of a decoded answer vector.
+        self.question_indexes = np.array([q.index for q, _ in scored], dtype=np.intp)
+        self.weights = np.zeros((len(scored), len(self.trait_names)), dtype=np.float64)
+        for row, (_, column) in enumerate(scored):
+            self.weights[row, column] = 1.0
+        self.reversed_mask = np.array([q.is_reversed for q, _ in scored], dtype=bool)
+
+    def encode(self, answer_sets: Sequence[Mapping[str, Any]]) -> np.ndarray:
+        matrix = np.full((len(answer_sets), len(self.question_ids)), np.nan, dtype=np.float64)
+        for row, answers in enumerate(answer_sets):
+            if not answers:
+                continue
+            for column, question_id in enumerate(self.question_ids):
+                value = answers.get(question_id)
+                if value is None:
+                    continue
+                try:
+                    matrix[row, column] = float(value)
+                except (ValueError, TypeError):
+                    continue
+        return matrix
+
+    def score_matrix(self, answers: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Returns (means, counts), both (N x traits); means are NaN where a trait had no valid answers.
+        values = np.where(self.reversed_mask, self.spec.reverse_pivot - answers, answers)
+        if self.spec.valid_range is not None:
+            low, high = self.spec.valid_range
+            with np.errstate(invalid="ignore"):
+                values = np.where((answers >= low) & (answers <= high), values, np.nan)
+        valid = ~np.isnan(values)
+        sums = np.where(valid, values, 0.0) @ self.weights
+        counts = valid.astype(np.float64) @ self.weights
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / counts
+        return means, counts
+
+    def score_batch(self, answer_sets: Sequence[Mapping[str, Any]]) -> List[Dict[str, Optional[float]]]:
+        return self._results(*self.score_matrix(self.encode(answer_sets)))
+
+    def _results(self, means: np.ndarray, counts: np.ndarray) -> List[Dict[str, Optional[float]]]:
+        results: List[Dict[str, Optional[float]]] = []
+        for row_means, row_counts in zip(means.tolist(), counts.tolist()):
+            results.append({
+                name: (round(mean, 2) if count > 0 else None)
+                for name, mean, count in zip(self.trait_names, row_means, row_counts)
+            })
+        return results
+
+    def score(self, answers: Mapping[str, Any]) -> Dict[str, Optional[float]]:
+        return self._log_missing(self.score_batch([answers])[0])
+
+    def score_values(self, values: np.ndarray) -> Dict[str, Optional[float]]:
+        # `values` is an AnswerDecoder vector (one float per quiz question, NaN if unanswered), already validated.
+        return self._log_missing(self.score_values_batch(values.reshape(1, -1))[0])
+
+    def score_values_batch(self, values: np.ndarray) -> List[Dict[str, Optional[float]]]:
+        # (N x quiz questions) stack of AnswerDecoder vectors, scored in one pass.
+        return self._results(*self.score_matrix(values[:, self.question_indexes]))
+
+    def _log_missing(self, result: Dict[str, Optional[float]]) -> Dict[str, Optional[float]]:
+        missing = [name for name, value in result.items() if value is None]
+        if missing:
+            logger.warning("%s: no valid scores for %s", self.spec.quiz_id, ", ".join(missing))
+        return result
+
+
+_scorer_cache: Dict[Tuple[str, str], CompiledScorer] = {}
+_scorer_cache_lock = threading.Lock()
+
+
+def get_scorer(quiz: CompiledQuiz) -> Optional[CompiledScorer]:
+    # One compiled scorer per quiz definition version; None for quizzes without scoring rules.
+    spec = SCORING_SPECS.get(quiz.id)
+    if spec is None:
+        return None
+    cache_key = (quiz.id, quiz.definition_hash)
+    scorer = _scorer_cache.get(cache_key)
+    if scorer is None:
+        with _scorer_cache_lock:
+            scorer = _scorer_cache.get(cache_key)
+            if scorer is None:
+                scorer = CompiledScorer(spec, quiz.questions)
+                for stale_key in [k for k in _scorer_cache if k[0] == quiz.id]:
+                    del _scorer_cache[stale_key]
+                _scorer_cache[cache_key] = scorer
+    return scorer
+
+
+def _score_raw_questions(spec: ScoringSpec, questions: List[Dict[str, Any]], user_answers_dict: Mapping[str, Any]) -> Dict[str, Optional[float]]:
+    compiled = [compile_question(q, i) for i, q in enumerate(questions)]
+    return CompiledScorer(spec, compiled).score(user_answers_dict)
+
+
+def calculate_bfi10_scores(questions: List[Dict[str, Any]], user_answers_dict: Dict[str, Union[int, float]]) -> Dict[str, Optional[float]]:
+    # Convenience wrapper for raw question lists; request handlers use get_scorer() instead.
+    return _score_raw_questions(BFI10_SPEC, questions, user_answers_dict)
+
+
+def calculate_mas12_scores(questions: List[Dict[str, Any]], user_answers_dict: Dict[str, Union[int, float]]) -> Dict[str, Optional[float]]:
+    return _score_raw_questions(MAS12_SPEC, questions, user_answers_dict)
@@ -0,0 +1,319 @@
+# app/storage.py
+# Where reports live. app/database.py keeps the async, breaker-guarded API the routes use and
+# calls one ReportStore, chosen by STORAGE_BACKEND:
+#   mongo  (default) the reports collection, as before.
+#   sqlite an embedded SQLite file (SQLITE_PATH) in WAL mode, for single-node deployments and
+#          benchmarks. Readers never block the writer; inserts are batched per transaction.
+# Store methods are blocking and run on the DB thread pool (database.run_db). Score norms, the
+# dashboard summaries and the maintenance CLIs (import, rescore, norms/summaries rebuild) remain
+# MongoDB features; without them the app falls back to reading the reports themselves.
+import abc
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List, Tuple, Iterator
+
+from pymongo import DESCENDING
+from pymongo.collection import Collection
+
+logger = logging.getLogger(__name__)
+
+# Only what the dashboard list renders; keeps answers_submitted and friends off the wire.
+DASHBOARD_REPORT_PROJECTION: Dict[str, int] = {
+    "_id": 0, "id": 1, "quiz_id": 1, "quiz_title": 1, "report_type": 1, "score": 1, "date_taken": 1
+}
+
+
+class ReportStore(abc.ABC):
+    """Blocking report storage used by app/database.py; every method may run on any pool thread."""
+
+    name = "reports"
+
+    @abc.abstractmethod
+    def insert_report(self, report_doc: Dict[str, Any]) -> Any:
+        """Store one report; a duplicate id raises."""
+
+    @abc.abstractmethod
+    def insert_reports(self, report_docs: List[Dict[str, Any]]) -> List[Any]:
+        """Store a batch. Reports whose id is already stored are not written again (Mongo reports
+        them as duplicate-key write errors, SQLite skips them); SubmissionPipeline accepts both."""
+
+    @abc.abstractmethod
+    def find_report(self, report_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        """The full report, if it belongs to user_id."""
+
+    @abc.abstractmethod
+    def find_user_reports(self, user_id: str, limit: int, after: Optional[Tuple[datetime, str]] = None) -> List[Dict[str, Any]]:
+        """Dashboard fields of the user's reports, newest first, keyset-paged over (date_taken, id)."""
+
+    @abc.abstractmethod
+    def find_latest_report_date(self, user_id: str) -> Optional[datetime]:
+        """date_taken of the user's newest report."""
+
+    @abc.abstractmethod
+    def open_cursor(self, query: Dict[str, Any], projection: Dict[str, Any], batch_size: int):
+        """Lazy iterable over every matching report, with close(). `query` is the equality /
+        $in / range subset of a Mongo filter on id, user_id, quiz_id and date_taken."""
+
+    @abc.abstractmethod
+    def ping(self) -> bool:
+        """Whether the backend answers."""
+
+    def close(self) -> None:
+        pass
+
+
+class MongoReportStore(ReportStore):
+    def __init__(self, collection: Collection):
+        self.collection = collection
+        self.name = collection.name
+
+    def insert_report(self, report_doc: Dict[str, Any]) -> Any:
+        return self.collection.insert_one(report_doc).inserted_id
+
+    def insert_reports(self, report_docs: List[Dict[str, Any]]) -> List[Any]:
+        return self.collection.insert_many(report_docs, ordered=False).inserted_ids
+
+    def find_report(self, report_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        return self.collection.find_one({"id": report_id, "user_id": user_id})
+
+    def find_user_reports(self, user_id: str, limit: int, after: Optional[Tuple[datetime, str]] = None) -> List[Dict[str, Any]]:
+        query: Dict[str, Any] = {"user_id": user_id}
+        if after is not None:
+            after_date, after_id = after
+            query["$or"] = [
+                {"date_taken": {"$lt": after_date}},
+                {"date_taken": after_date, "id": {"$lt": after_id}},
+            ]
+        cursor = (
+            self.collection.find(query, DASHBOARD_REPORT_PROJECTION)
+            .sort([("date_taken", DESCENDING), ("id", DESCENDING)])
+            .limit(limit)
+        )
+        return list(cursor)
+
+    def find_latest_report_date(self, user_id: str) -> Optional[datetime]:
+        # Covered by the (user_id, date_taken) index.
+        doc = self.collection.find_one({"user_id": user_id}, {"_id": 0, "date_taken": 1}, sort=[("date_taken", DESCENDING)])
+        return doc.get("date_taken") if doc else None
+
+    def open_cursor(self, query: Dict[str, Any], projection: Dict[str, Any], batch_size: int):
+        # Nothing is sent to the server until the first batch is read.
+        return self.collection.find(query, projection, no_cursor_timeout=True).batch_size(batch_size)
+
+    def ping(self) -> bool:
+        return bool(self.collection.database.client.admin.command("ping").get("ok"))
+
+
+# --- SQLite --------------------------------------------------------------------------------
+
+# Fixed-width, so the TEXT column sorts and compares like the datetimes it holds.
+_SQL_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+_FILTER_COLUMNS = ("id", "user_id", "quiz_id", "date_taken")
+_TEXT_COLUMNS = ("id", "user_id", "quiz_id")  # stored as-is (date_taken is reformatted)
+_RANGE_OPERATORS = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<=", "$ne": "!="}
+
+SQLITE_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS reports (
+        id TEXT NOT NULL UNIQUE,
+        user_id TEXT NOT NULL,
+        quiz_id TEXT,
+        date_taken TEXT,
+        listing TEXT NOT NULL,
+        document TEXT NOT NULL
+    )""",
+    # Keyset pagination and the latest-date lookup for one user, both index-only.
+    "CREATE INDEX IF NOT EXISTS reports_user_date ON reports (user_id, date_taken DESC, id DESC)",
+    # Score loads for the matching index and per-quiz exports.
+    "CREATE INDEX IF NOT EXISTS reports_quiz_date ON reports (quiz_id, date_taken)",
+)
+_INSERT_COLUMNS = "(id, user_id, quiz_id, date_taken, listing, document) VALUES (?, ?, ?, ?, ?, ?)"
+_LISTING_FIELDS = tuple(k for k, v in DASHBOARD_REPORT_PROJECTION.items() if v)
+
+
+def _sql_date(value: Any) -> Any:
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.strftime(_SQL_DATE_FORMAT)
+    return value
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": _sql_date(value)}
+    return str(value)  # ObjectId and other BSON types
+
+
+def _json_object(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and "$date" in obj:
+        return datetime.fromisoformat(obj["$date"])
+    return obj
+
+
+# Built once: json.dumps/json.loads with custom hooks construct a new coder per call.
+_dumps = json.JSONEncoder(default=_json_default, ensure_ascii=False, separators=(",", ":")).encode
+_loads = json.JSONDecoder(object_hook=_json_object).decode
+
+
+def sqlite_select(projection: Optional[Dict[str, Any]]) -> Tuple[str, List[Any]]:
+    # Projects inside SQLite from the narrowest source holding each field (a column, then the
+    # small listing), so e.g. an export of the default fields never reads the full documents.
+    # Fields absent from a report come back null.
+    fields = [field for field, include in (projection or {}).items() if include and field != "_id"]
+    if not fields or len(fields) > 60:  # SQLite functions take at most 127 arguments
+        return "document", []
+    parts: List[str] = []
+    params: List[Any] = []
+    for field in fields:
+        if field in _TEXT_COLUMNS:
+            parts.append(f"?, {field}")
+            params.append(field)
+        else:
+            parts.append(f"?, json_extract({'listing' if field in _LISTING_FIELDS else 'document'}, ?)")
+            params.extend((field, f'$."{field}"'))
+    return f"json_object({', '.join(parts)})", params
+
+
+def _report_row(report_doc: Dict[str, Any]) -> Tuple[Any, ...]:
+    doc = {k: v for k, v in report_doc.items() if k != "_id"}
+    listing = {field: doc.get(field) for field in _LISTING_FIELDS}
+    return (doc["id"], doc["user_id"], doc.get("quiz_id"), _sql_date(doc.get("date_taken")), _dumps(listing), _dumps(doc))
+
+
+def sqlite_where(query: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    # Translates the Mongo filter subset ReportStore.open_cursor accepts; ValueError otherwise.
+    clauses: List[str] = []
+    params: List[Any] = []
+    for field, condition in query.items():
+        if field not in _FILTER_COLUMNS:
+            raise ValueError(f"SQLite report store cannot filter on {field!r}.")
+        if not isinstance(condition, dict):
+            clauses.append(f"{field} = ?")
+            params.append(_sql_date(condition))
+            continue
+        for operator, operand in condition.items():
+            if operator == "$in":
+                values = [_sql_date(v) for v in operand]
+                if not values:
+                    clauses.append("0")
+                    continue
+                clauses.append(f"{field} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+            elif operator in _RANGE_OPERATORS:
+                clauses.append(f"{field} {_RANGE_OPERATORS[operator]} ?")
+                params.append(_sql_date(operand))
+            else:
+                raise ValueError(f"SQLite report store does not support {operator!r}.")
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+class SQLiteReportStore(ReportStore):
+    """Reports in one SQLite file: indexed columns for lookups, the document itself as JSON.
+
+    Each pool thread gets its own connection (sqlite3 connections must not be shared between
+    concurrent threads); WAL lets them all read while one writes. Streams opened by open_cursor
+    use a connection of their own, so a long export reads one consistent snapshot.
+    """
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000, cache_statements: int = 128):
+        self.path = path
+        self.name = f"sqlite:{path}"
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_statements = cache_statements
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        connection = self._connection()
+        mode = connection.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        if mode.lower() != "wal":
+            logger.warning("SQLite database %s is in %s journal mode, not WAL; readers will block writers.", path, mode)
+        with connection:
+            for statement in SQLITE_SCHEMA:
+                connection.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        # check_same_thread=False: streams are read batch by batch from whichever pool thread is free.
+        connection = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000.0, check_same_thread=False,
+                                     cached_statements=self.cache_statements)
+        connection.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        # With WAL, NORMAL only syncs at checkpoints: a power loss may drop the latest commits but never corrupts.
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def insert_report(self, report_doc: Dict[str, Any]) -> Any:
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute("INSERT INTO reports " + _INSERT_COLUMNS, _report_row(report_doc))
+        return cursor.lastrowid
+
+    def insert_reports(self, report_docs: List[Dict[str, Any]]) -> List[Any]:
+        # One transaction (one WAL commit) for the whole batch.
+        rows = [_report_row(doc) for doc in report_docs]
+        connection = self._connection()
+        with connection:
+            connection.executemany("INSERT OR IGNORE INTO reports " + _INSERT_COLUMNS, rows)
+        return [row[0] for row in rows]
+
+    def find_report(self, report_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT document FROM reports WHERE id = ? AND user_id = ?", (report_id, user_id)
+        ).fetchone()
+        return _loads(row[0]) if row else None
+
+    def find_user_reports(self, user_id: str, limit: int, after: Optional[Tuple[datetime, str]] = None) -> List[Dict[str, Any]]:
+        if after is None:
+            rows = self._connection().execute(
+                "SELECT listing FROM reports WHERE user_id = ? ORDER BY date_taken DESC, id DESC LIMIT ?", (user_id, limit)
+            )
+        else:
+            rows = self._connection().execute(
+                "SELECT listing FROM reports WHERE user_id = ? AND (date_taken, id) < (?, ?)"
+                " ORDER BY date_taken DESC, id DESC LIMIT ?", (user_id, _sql_date(after[0]), after[1], limit)
+            )
+        return [_loads(listing) for (listing,) in rows]
+
+    def find_latest_report_date(self, user_id: str) -> Optional[datetime]:
+        row = self._connection().execute(
+            "SELECT date_taken FROM reports WHERE user_id = ? ORDER BY date_taken DESC LIMIT 1", (user_id,)
+        ).fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    def open_cursor(self, query: Dict[str, Any], projection: Dict[str, Any], batch_size: int):
+        select, select_params = sqlite_select(projection)
+        where, where_params = sqlite_where(query)  # fail on an unsupported filter before anything is opened
+
+        def documents() -> Iterator[Dict[str, Any]]:
+            connection = self._connect()
+            try:
+                cursor = connection.execute(f"SELECT {select} FROM reports{where}", select_params + where_params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        return
+                    for (document,) in rows:
+                        yield _loads(document)
+            finally:
+                connection.close()
+
+        return documents()  # a generator: close() ends the read and releases the connection
+
+    def ping(self) -> bool:
+        return self._connection().execute("SELECT 1").fetchone() == (1,)
+
+    def close(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
@@ -0,0 +1,206 @@
+# app/submissions.py
+import asyncio
+import json
+import logging
+import os
+from collections import OrderedDict
+from itertools import islice
+from typing import Optional, Dict, Any, List, Callable, Awaitable
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+SUBMISSION_PIPELINE_ENABLED: bool = os.getenv("SUBMISSION_PIPELINE_ENABLED", "false").lower() in ("1", "true", "yes")
+SUBMISSION_BATCH_SIZE: int = int(os.getenv("SUBMISSION_BATCH_SIZE", "100"))
+SUBMISSION_FLUSH_INTERVAL_S: float = float(os.getenv("SUBMISSION_FLUSH_INTERVAL_S", "0.5"))
+SUBMISSION_MAX_PENDING: int = int(os.getenv("SUBMISSION_MAX_PENDING", "10000"))
+SUBMISSION_MAX_RETRIES: int = int(os.getenv("SUBMISSION_MAX_RETRIES", "5"))
+SUBMISSION_RETRY_BASE_DELAY_S: float = float(os.getenv("SUBMISSION_RETRY_BASE_DELAY_S", "0.2"))
+SUBMISSION_RETRY_MAX_DELAY_S: float = float(os.getenv("SUBMISSION_RETRY_MAX_DELAY_S", "5"))
+# Reports the database rejected, or that still failed after SUBMISSION_MAX_RETRIES, one JSON line
+# each in the bulk import format, so `python -m app.bulk_import <file>` replays them.
+SUBMISSION_DEAD_LETTER_PATH: str = os.getenv("SUBMISSION_DEAD_LETTER_PATH", "submissions.deadletter.jsonl")
+
+DUPLICATE_KEY_ERROR = 11000
+# Per-document write errors worth retrying: the server was stepping down, shutting down or timed out.
+TRANSIENT_WRITE_ERRORS = frozenset({50, 91, 189, 262, 10107, 11600, 11602, 13435, 13436})
+
+
+class SubmissionPipeline:
+    """Write-behind buffer for new reports.
+
+    Handlers enqueue scored report documents and return immediately; a background task
+    flushes them with insert_many once SUBMISSION_BATCH_SIZE documents are waiting or
+    SUBMISSION_FLUSH_INTERVAL_S has passed. A document stays readable through
+    get_pending() until its batch has been acknowledged by the database and `on_stored`
+    (the updates derived from a report: summary, norms, matching index) has run for it.
+
+    Failures are handled per document: duplicates count as written, documents the database
+    rejects go to the dead-letter file at once, and a transient failure (connection loss, a
+    step-down) keeps the batch buffered with backoff for up to SUBMISSION_MAX_RETRIES flushes,
+    after which its documents are dead-lettered too. One bad report never blocks the rest.
+    """
+
+    def __init__(
+        self,
+        insert_many: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+        batch_size: int = SUBMISSION_BATCH_SIZE,
+        flush_interval: float = SUBMISSION_FLUSH_INTERVAL_S,
+        max_pending: int = SUBMISSION_MAX_PENDING,
+        max_retries: int = SUBMISSION_MAX_RETRIES,
+        retry_base_delay: float = SUBMISSION_RETRY_BASE_DELAY_S,
+        retry_max_delay: float = SUBMISSION_RETRY_MAX_DELAY_S,
+        dead_letter_path: str = SUBMISSION_DEAD_LETTER_PATH,
+        on_stored: Optional[Callable[[Dict[str, Any]], Awaitable[Any]]] = None,
+    ):
+        self._insert_many = insert_many
+        self._on_stored = on_stored
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.dead_letter_path = dead_letter_path
+        self.flushed_count = 0
+        self.failed_flushes = 0
+        self.dead_lettered = 0
+        self._pending: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._attempts: Dict[str, int] = {}  # failed flushes per pending report id
+        self._retry_delay = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopping = False
+        self._task = asyncio.create_task(self._run(), name="submission-pipeline")
+        logger.info("Submission pipeline started (batch %s, interval %ss).", self.batch_size, self.flush_interval)
+
+    def enqueue(self, report_doc: Dict[str, Any]) -> bool:
+        # False means the caller must write the document itself (pipeline stopped or buffer full).
+        if not self.running or self._stopping or len(self._pending) >= self.max_pending:
+            return False
+        self._pending[report_doc["id"]] = report_doc
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def get_pending(self, report_id: str, user_id: str) -> Optional[Dict[str, Any]]:
+        doc = self._pending.get(report_id)
+        if doc is not None and doc.get("user_id") == user_id:
+            return doc
+        return None
+
+    def pending_for_user(self, user_id: str) -> List[Dict[str, Any]]:
+        return [doc for doc in self._pending.values() if doc.get("user_id") == user_id]
+
+    async def drain(self) -> None:
+        # Stop accepting work, then flush everything still buffered (with retries) before returning.
+        self._stopping = True
+        self._wakeup.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        while self._pending:
+            # Terminates: every failed flush moves its reports closer to the dead-letter file.
+            if not await self._flush_batch():
+                await asyncio.sleep(self._retry_delay)
+        logger.info("Submission pipeline drained (%s report(s) written, %s dead-lettered in total).", self.flushed_count, self.dead_lettered)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._pending and not self._stopping:
+                if not await self._flush_batch():
+                    await asyncio.sleep(self._retry_delay)  # backoff; the next cycle retries
+                    break
+                if len(self._pending) < self.batch_size:
+                    break
+
+    async def _flush_batch(self) -> bool:
+        # True when the whole batch left the buffer (stored, or dead-lettered); False when some
+        # of it stays for a retry after self._retry_delay.
+        batch = list(islice(self._pending.values(), self.batch_size))
+        if not batch:
+            return True
+        try:
+            await self._insert_many(batch)
+            rejected: Dict[int, str] = {}
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            if e.details.get("writeConcernErrors") or any(err.get("code") in TRANSIENT_WRITE_ERRORS for err in write_errors):
+                return await self._retry_later(batch, e)
+            # Unordered insert: every document without a write error is stored, and a duplicate
+            # id means an earlier, unacknowledged attempt stored it.
+            rejected = {
+                err.get("index"): f"{err.get('code')}: {err.get('errmsg', '')}"
+                for err in write_errors if err.get("code") != DUPLICATE_KEY_ERROR
+            }
+        except Exception as e:
+            return await self._retry_later(batch, e)
+        if self._on_stored is not None:
+            # Dead-lettered reports never get here, so nothing derived counts a report that isn't stored.
+            for index, doc in enumerate(batch):
+                if index not in rejected:
+                    try:
+                        await self._on_stored(doc)
+                    except Exception as e:
+                        logger.error("Post-store updates for report %s failed: %s", doc.get("id"), e)
+        for index, doc in enumerate(batch):
+            self._pending.pop(doc["id"], None)
+            self._attempts.pop(doc["id"], None)
+            if index in rejected:
+                await self._dead_letter(doc, rejected[index])
+        self.flushed_count += len(batch) - len(rejected)
+        self._retry_delay = 0.0
+        logger.debug("Flushed %s report(s); %s still pending.", len(batch) - len(rejected), len(self._pending))
+        return True
+
+    async def _retry_later(self, batch: List[Dict[str, Any]], error: Exception) -> bool:
+        self.failed_flushes += 1
+        attempts = 0
+        for doc in batch:
+            attempts = self._attempts[doc["id"]] = self._attempts.get(doc["id"], 0) + 1
+            if attempts > self.max_retries:
+                self._pending.pop(doc["id"], None)
+                self._attempts.pop(doc["id"], None)
+                await self._dead_letter(doc, f"gave up after {attempts} attempts: {error}")
+        self._retry_delay = min(self.retry_max_delay, self.retry_base_delay * (2 ** (attempts - 1)))
+        logger.warning("Flushing %s report(s) failed (attempt %s): %s. Retrying in %.2fs.", len(batch), attempts, error, self._retry_delay)
+        return False
+
+    async def _dead_letter(self, doc: Dict[str, Any], reason: str) -> None:
+        self.dead_lettered += 1
+        date_taken = doc.get("date_taken")
+        line = json.dumps({
+            "id": doc.get("id"), "user_id": doc.get("user_id"), "quiz_id": doc.get("quiz_id"),
+            "answers": doc.get("answers_submitted"),
+            "date_taken": date_taken.isoformat() if hasattr(date_taken, "isoformat") else date_taken,
+            "error": reason,
+        }, default=str)
+        try:
+            await asyncio.to_thread(self._append_dead_letter, line)
+        except OSError as e:
+            logger.critical("Report %s lost: cannot write dead-letter file %s (%s): %s", doc.get("id"), self.dead_letter_path, e, line)
+            return
+        logger.error("Report %s could not be stored (%s); written to %s.", doc.get("id"), reason, self.dead_letter_path)
+
+    def _append_dead_letter(self, line: str) -> None:
+        # Runs in a worker thread: a slow disk must not stall the event loop.
+        with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
@@ -0,0 +1,198 @@
+# app/summaries.py
+# Per-user summary documents, so the dashboard is one point read however long a user's history:
+#   {_id: user_id, user_id, report_count, quiz_counts: {quiz_id: n}, last_taken,
+#    latest: {quiz_id: {id, score, date_taken}}, recent: [newest USER_SUMMARY_RECENT_SIZE list entries]}
+# apply_stored_report (app/main.py) records each stored report with record_report(): one atomic
+# update of an existing summary. A user without one yet is seeded from their whole history by a
+# background task; until it lands the dashboard uses its reports-collection fallback.
+# `recent` holds exactly what the dashboard list renders (and doubles as the data for score trends).
+# Build or repair summaries from the reports collection (e.g. after a bulk import) with:
+#   python -m app.summaries rebuild [--user-id user1] [--batch-size 1000]
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Iterable, Mapping, Set, Tuple
+
+from pymongo import ASCENDING, DESCENDING, ReplaceOne
+
+from . import database
+
+logger = logging.getLogger(__name__)
+
+# Newest reports kept inline; the dashboard's first page is served from these.
+USER_SUMMARY_RECENT_SIZE: int = int(os.getenv("USER_SUMMARY_RECENT_SIZE", "20"))
+SUMMARY_ENTRY_FIELDS = tuple(k for k, v in database.DASHBOARD_REPORT_PROJECTION.items() if v)
+
+# Users whose summary is being seeded, with the reports recorded for them meanwhile.
+_seeding: Dict[str, List[Mapping[str, Any]]] = {}
+_seed_tasks: Set[asyncio.Task] = set()
+
+
+def summary_entry(report: Mapping[str, Any]) -> Dict[str, Any]:
+    return {field: report.get(field) for field in SUMMARY_ENTRY_FIELDS}
+
+
+def summary_update(report: Mapping[str, Any], recent_size: int = USER_SUMMARY_RECENT_SIZE) -> Dict[str, Any]:
+    # Update document for a newly submitted report. `latest` is $set outright: a live submission
+    # is always the user's newest report (imports go through rebuild_summaries instead).
+    quiz_id, date_taken = report["quiz_id"], report["date_taken"]
+    return {
+        "$inc": {"report_count": 1, f"quiz_counts.{quiz_id}": 1},
+        "$max": {"last_taken": date_taken},
+        "$set": {
+            f"latest.{quiz_id}": {"id": report["id"], "score": report.get("score"), "date_taken": date_taken},
+            "updated_at": datetime.utcnow(),
+        },
+        "$push": {"recent": {"$each": [summary_entry(report)], "$sort": {"date_taken": -1, "id": -1}, "$slice": max(1, recent_size)}},
+    }
+
+
+def build_summary(user_id: str, reports: Iterable[Mapping[str, Any]], recent_size: int = USER_SUMMARY_RECENT_SIZE) -> Dict[str, Any]:
+    # Full summary document from a user's reports, which must come newest first.
+    summary: Dict[str, Any] = {
+        "_id": user_id, "user_id": user_id, "report_count": 0, "quiz_counts": {}, "last_taken": None,
+        "latest": {}, "recent": [], "updated_at": datetime.utcnow(),
+    }
+    for report in reports:
+        quiz_id = report.get("quiz_id")
+        summary["report_count"] += 1
+        summary["quiz_counts"][quiz_id] = summary["quiz_counts"].get(quiz_id, 0) + 1
+        if summary["last_taken"] is None:
+            summary["last_taken"] = report.get("date_taken")
+        if quiz_id not in summary["latest"]:
+            summary["latest"][quiz_id] = {"id": report.get("id"), "score": report.get("score"), "date_taken": report.get("date_taken")}
+        if len(summary["recent"]) < recent_size:
+            summary["recent"].append(summary_entry(report))
+    return summary
+
+
+async def record_report(report: Mapping[str, Any]) -> None:
+    # Called once the report is stored (see apply_stored_report in app/main.py). Never reads the
+    # user's history: without a summary, the seed is left to a background task.
+    user_id, report_id = report["user_id"], report["id"]
+    if await database.update_user_summary(user_id, report_id, summary_update(report)):
+        return
+    waiting = _seeding.get(user_id)
+    if waiting is not None:
+        waiting.append(report)
+        return
+    _seeding[user_id] = [report]
+    task = asyncio.create_task(_seed_summary(user_id), name=f"summary-seed-{user_id}")
+    _seed_tasks.add(task)
+    task.add_done_callback(_seed_tasks.discard)
+
+
+async def _seed_summary(user_id: str) -> None:
+    try:
+        history = {doc["id"]: doc for doc in await database.find_all_user_reports(user_id)}
+        for doc in _seeding[user_id]:
+            history.setdefault(doc["id"], doc)
+        reports = sorted(history.values(), key=lambda d: (d["date_taken"], d["id"]), reverse=True)
+        await database.insert_user_summary(build_summary(user_id, reports))
+    except Exception as e:
+        # Retried on the user's next submit; `python -m app.summaries rebuild --user-id ...` also repairs it.
+        logger.error("Failed to seed the dashboard summary of %s: %s", user_id, e)
+    finally:
+        recorded = _seeding.pop(user_id, [])
+    # Reports stored while the history was read, or a summary seeded concurrently elsewhere:
+    # the guarded update counts each exactly once.
+    for report in recorded:
+        try:
+            await database.update_user_summary(user_id, report["id"], summary_update(report))
+        except Exception as e:
+            logger.error("Failed to update the dashboard summary of %s for report %s: %s", user_id, report["id"], e)
+
+
+async def wait_for_seeds() -> None:
+    # Lets shutdown (and tests) finish the summary seeds still running.
+    while _seed_tasks:
+        await asyncio.gather(*list(_seed_tasks), return_exceptions=True)
+
+
+def summary_page(summary: Mapping[str, Any], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    # The dashboard's first page and the keyset cursor for "load more", which reads the reports collection.
+    reports = list(summary.get("recent") or [])[:limit]
+    next_cursor = None
+    if reports and summary.get("report_count", 0) > len(reports):
+        last = reports[-1]
+        if last.get("date_taken") is not None and last.get("id"):
+            next_cursor = database.encode_page_cursor(last["date_taken"], last["id"])
+    return reports, next_cursor
+
+
+# --- rebuild ---------------------------------------------------------------------------
+
+def rebuild_summaries(reports, summaries, user_ids: Optional[List[str]], batch_size: int, dry_run: bool) -> Dict[str, int]:
+    # Streams reports in (user_id, date_taken desc, id desc) order, which the dashboard index
+    # serves, so only one user's reports are in memory at a time. Summaries are replaced
+    # wholesale; a submission landing mid-scan may be lost, so run during a quiet period.
+    query: Dict[str, Any] = {"user_id": {"$in": user_ids}} if user_ids else {}
+    projection = {**database.DASHBOARD_REPORT_PROJECTION, "user_id": 1}
+    cursor = (
+        reports.find(query, projection, no_cursor_timeout=True)
+        .sort([("user_id", ASCENDING), ("date_taken", DESCENDING), ("id", DESCENDING)])
+        .batch_size(batch_size)
+    )
+    totals = {"users": 0, "reports": 0}
+    pending: List[ReplaceOne] = []
+
+    def flush() -> None:
+        if pending and not dry_run:
+            summaries.bulk_write(pending, ordered=False)
+        pending.clear()
+
+    def finish(user_id: str, user_reports: List[Mapping[str, Any]]) -> None:
+        summary = build_summary(user_id, user_reports)
+        totals["users"] += 1
+        totals["reports"] += summary["report_count"]
+        pending.append(ReplaceOne({"_id": user_id}, summary, upsert=True))
+        if len(pending) >= batch_size:
+            flush()
+
+    current_user: Optional[str] = None
+    user_reports: List[Mapping[str, Any]] = []
+    try:
+        for doc in cursor:
+            user_id = doc.get("user_id")
+            if user_id != current_user:
+                if current_user is not None:
+                    finish(current_user, user_reports)
+                current_user, user_reports = user_id, []
+            user_reports.append(doc)
+        if current_user is not None:
+            finish(current_user, user_reports)
+        flush()
+    finally:
+        cursor.close()
+    return totals
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Maintain the per-user summary documents behind the dashboard.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild = sub.add_parser("rebuild", help="Recompute summaries from all stored reports.")
+    rebuild.add_argument("--user-id", action="append", help="Limit to a user (repeatable). Default: every user with reports.")
+    rebuild.add_argument("--batch-size", type=int, default=1000)
+    rebuild.add_argument("--dry-run", action="store_true", help="Compute and log counts but do not write.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
+
+    database.connect_to_mongo()
+    if database.reports_collection is None or database.summaries_collection is None:
+        logger.critical("MongoDB is not available; cannot rebuild summaries.")
+        return 1
+    try:
+        totals = rebuild_summaries(
+            database.reports_collection, database.summaries_collection, args.user_id, max(1, args.batch_size), args.dry_run
+        )
+    finally:
+        database.close_mongo_connection()
+    logger.info("Summaries rebuild finished: %s%s.", totals, " (dry run)" if args.dry_run else "")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
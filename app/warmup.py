@@ -0,0 +1,106 @@
+# app/warmup.py
+# Start-up warm-up, so the first requests a worker takes are not its slowest:
+#  * every template is compiled before the worker accepts connections, through a persistent
+#    bytecode cache (TEMPLATE_BYTECODE_CACHE_DIR) that later starts and sibling workers load
+#    instead of re-parsing the sources;
+#  * each quiz's answer decoder and scorer are built;
+#  * once the database is connected, WARMUP_DB_CONNECTIONS concurrent pings open that many
+#    pool connections and DB executor threads.
+# /readyz answers 503 until all of it has happened. The Dockerfile fills the cache at build time:
+#   python -m app.warmup
+import asyncio
+import logging
+import os
+import sys
+import time
+from typing import Optional, List
+
+from jinja2 import Environment, FileSystemBytecodeCache
+
+from . import database
+from .answers import get_answer_decoder
+from .quizzes import QuizRegistry
+from .scoring import get_scorer
+
+logger = logging.getLogger(__name__)
+
+# Directory for compiled template bytecode; unset uses Jinja's per-user temp directory, "off" disables.
+TEMPLATE_BYTECODE_CACHE_DIR: str = os.getenv("TEMPLATE_BYTECODE_CACHE_DIR", "").strip()
+WARMUP_DB_CONNECTIONS: int = int(os.getenv("WARMUP_DB_CONNECTIONS", str(min(4, database.MONGO_MAX_POOL_SIZE))))
+
+
+class WarmupState:
+    def __init__(self):
+        self.templates = False
+        self.quizzes = False
+        self.database = False
+
+    @property
+    def warm(self) -> bool:
+        return self.templates and self.quizzes and self.database
+
+
+def install_bytecode_cache(env: Environment, directory: str = TEMPLATE_BYTECODE_CACHE_DIR) -> None:
+    # Must run before the first template is loaded; the cache is keyed by template name and
+    # source checksum, so an edited template simply compiles again.
+    if directory.lower() == "off":
+        return
+    try:
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        env.bytecode_cache = FileSystemBytecodeCache(directory or None)
+    except OSError as e:
+        logger.warning("Template bytecode cache unavailable (%s); templates compile in memory only.", e)
+
+
+def precompile_templates(env: Environment, extensions: Optional[List[str]] = None) -> int:
+    started = time.perf_counter()
+    names = env.list_templates(extensions=extensions or ["html"])
+    compiled = 0
+    for name in names:
+        try:
+            env.get_template(name)  # kept in the environment's template cache from here on
+            compiled += 1
+        except Exception as e:
+            logger.error("Failed to precompile template %s: %s", name, e)
+    logger.info("Precompiled %s/%s template(s) in %.0fms.", compiled, len(names), (time.perf_counter() - started) * 1000)
+    return compiled
+
+
+def warm_quizzes(registry: QuizRegistry) -> int:
+    # The registry is loaded (definitions compiled and precompressed); build the per-quiz coders.
+    quizzes = registry.all()
+    for quiz in quizzes:
+        get_answer_decoder(quiz)
+        get_scorer(quiz)
+    return len(quizzes)
+
+
+async def warm_database_pool(connections: int = WARMUP_DB_CONNECTIONS) -> None:
+    # Concurrent pings make the driver open that many connections (and the executor spawn
+    # that many threads) now rather than under the first burst of traffic.
+    store = database.report_store
+    if store is None or connections <= 0:
+        return
+    results = await asyncio.gather(
+        *(database.run_db("warmup_ping", store.ping) for _ in range(connections)), return_exceptions=True
+    )
+    failed = [r for r in results if isinstance(r, BaseException)]
+    if failed:
+        logger.warning("%s of %s warm-up ping(s) failed: %s", len(failed), connections, failed[0])
+    else:
+        logger.info("Warmed %s database connection(s).", connections)
+
+
+def main() -> int:
+    # Build-time precompile into TEMPLATE_BYTECODE_CACHE_DIR (see the Dockerfile).
+    from .main import templates  # installs the bytecode cache on import
+    if templates.env.bytecode_cache is None:
+        logger.critical("Template bytecode cache is disabled; nothing to precompile.")
+        return 1
+    precompile_templates(templates.env)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+# benchmarks/compare.py
+# Diff two benchmarks.run result files:  python -m benchmarks.compare before.json after.json
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+
+def pct_change(before: Optional[float], after: Optional[float]) -> str:
+    if not before or after is None:
+        return "n/a"
+    return f"{(after - before) / before * 100.0:+.1f}%"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("before", type=Path)
+    parser.add_argument("after", type=Path)
+    parser.add_argument("--metric", default="p50_ms", choices=["mean_ms", "p50_ms", "p95_ms", "p99_ms", "throughput_per_s"])
+    parser.add_argument("--threshold", type=float, default=10.0, help="Flag changes larger than this many percent.")
+    args = parser.parse_args()
+    before: Dict[str, Any] = json.loads(args.before.read_text())
+    after: Dict[str, Any] = json.loads(args.after.read_text())
+    print(f"{args.metric}: {before['meta'].get('git_revision')} -> {after['meta'].get('git_revision')}")
+
+    regressions = 0
+    for section in ("routes", "micro"):
+        names = sorted(set(before.get(section, {})) | set(after.get(section, {})))
+        print(f"\n{section}:")
+        for name in names:
+            b = before.get(section, {}).get(name, {}).get(args.metric)
+            a = after.get(section, {}).get(name, {}).get(args.metric)
+            change = pct_change(b, a)
+            flag = ""
+            if b and a is not None:
+                delta = (a - b) / b * 100.0
+                worse = delta < -args.threshold if args.metric == "throughput_per_s" else delta > args.threshold
+                if worse:
+                    flag, regressions = "  <-- regression", regressions + 1
+            print(f"  {name:<32} {b if b is not None else '-':>12} {a if a is not None else '-':>12} {change:>9}{flag}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
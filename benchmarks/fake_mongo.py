@@ -0,0 +1,321 @@
+# benchmarks/fake_mongo.py
+# In-memory stand-in for the subset of the pymongo Collection API the app uses, so the
+# benchmarks exercise the real handlers without a Mongo server. Equality lookups on the
+# fields in INDEXED_FIELDS go through hash indexes; range filters and sorts then scan those
+# candidates, so e.g. the 10k-report dashboard includes an O(history) fake-side cost that a
+# real compound index would not have. Compare runs against runs, not against production.
+import copy
+import itertools
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Tuple, Union
+
+from pymongo import InsertOne, UpdateOne, ReplaceOne
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+
+INDEXED_FIELDS = ("id", "user_id", "quiz_id", "_id")
+
+SortSpec = List[Tuple[str, int]]
+
+
+def _get_path(doc: Dict[str, Any], path: str) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        if isinstance(value, list):  # "recent.id": the field of every element, as Mongo matches it
+            return [item.get(part) for item in value if isinstance(item, dict)]
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _compare(op: str, value: Any, operand: Any) -> bool:
+    if isinstance(value, list) and not isinstance(operand, list):
+        # An array field matches when any element does; $ne and $nin when none does.
+        if op in ("$ne", "$nin"):
+            return all(_compare(op, item, operand) for item in value)
+        return any(_compare(op, item, operand) for item in value)
+    if op == "$eq":
+        return value == operand
+    if op == "$ne":
+        return value != operand
+    if op == "$in":
+        return value in operand
+    if op == "$nin":
+        return value not in operand
+    if op == "$exists":
+        return (value is not None) == bool(operand)
+    if value is None:
+        return False
+    if op == "$lt":
+        return value < operand
+    if op == "$lte":
+        return value <= operand
+    if op == "$gt":
+        return value > operand
+    if op == "$gte":
+        return value >= operand
+    raise NotImplementedError(f"fake_mongo does not support query operator {op}")
+
+
+def matches(doc: Dict[str, Any], query: Dict[str, Any]) -> bool:
+    for key, condition in query.items():
+        if key == "$or":
+            if not any(matches(doc, sub) for sub in condition):
+                return False
+        elif key == "$and":
+            if not all(matches(doc, sub) for sub in condition):
+                return False
+        elif isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            value = _get_path(doc, key)
+            if not all(_compare(op, value, operand) for op, operand in condition.items()):
+                return False
+        elif not _compare("$eq", _get_path(doc, key), condition):
+            return False
+    return True
+
+
+def project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not projection:
+        return copy.deepcopy(doc)
+    included = [k for k, v in projection.items() if v and k != "_id"]
+    if included:
+        out = {k: copy.deepcopy(doc[k]) for k in included if k in doc}
+        if projection.get("_id", 1) and "_id" in doc:
+            out["_id"] = doc["_id"]
+        return out
+    excluded = {k for k, v in projection.items() if not v}
+    return {k: copy.deepcopy(v) for k, v in doc.items() if k not in excluded}
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    # None sorts before everything, like BSON null.
+    return (0, 0) if value is None else (1, value)
+
+
+def _normalize_sort(key_or_list: Union[str, SortSpec], direction: Optional[int] = None) -> SortSpec:
+    if isinstance(key_or_list, str):
+        return [(key_or_list, direction or 1)]
+    return list(key_or_list)
+
+
+class FakeCursor:
+    def __init__(self, collection: "FakeCollection", query: Dict[str, Any], projection: Optional[Dict[str, Any]]):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort: SortSpec = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key_or_list: Union[str, SortSpec], direction: Optional[int] = None) -> "FakeCursor":
+        self._sort = _normalize_sort(key_or_list, direction)
+        return self
+
+    def skip(self, count: int) -> "FakeCursor":
+        self._skip = count
+        return self
+
+    def limit(self, count: int) -> "FakeCursor":
+        self._limit = count
+        return self
+
+    def batch_size(self, size: int) -> "FakeCursor":
+        return self
+
+    def close(self) -> None:
+        pass
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        docs = self._collection._candidates(self._query)
+        docs = [doc for doc in docs if matches(doc, self._query)]
+        for field, direction in reversed(self._sort):
+            docs.sort(key=lambda d: _sort_key(_get_path(d, field)), reverse=direction == -1)
+        end = self._skip + self._limit if self._limit else None
+        for doc in itertools.islice(docs, self._skip, end):
+            yield project(doc, self._projection)
+
+
+class FakeCollection:
+    def __init__(self, name: str = "reports"):
+        self.name = name
+        self._docs: Dict[int, Dict[str, Any]] = {}
+        self._indexes: Dict[str, Dict[Any, Dict[int, None]]] = {field: defaultdict(dict) for field in INDEXED_FIELDS}
+        self._unique_fields = {"_id"}
+        self._next_id = itertools.count(1)
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    # --- indexes -------------------------------------------------------------------------
+
+    def create_indexes(self, indexes: Iterable[Any]) -> List[str]:
+        names = []
+        for index in indexes:
+            spec = index.document
+            if spec.get("unique"):
+                self._unique_fields.update(spec["key"].keys())
+            names.append(spec["name"])
+        return names
+
+    def create_index(self, keys: Any, unique: bool = False, name: Optional[str] = None, **kwargs: Any) -> str:
+        keys = _normalize_sort(keys)
+        if unique:
+            self._unique_fields.update(k for k, _ in keys)
+        return name or "_".join(f"{k}_{d}" for k, d in keys)
+
+    def _candidates(self, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        for field in INDEXED_FIELDS:
+            value = query.get(field)
+            if value is not None and not isinstance(value, dict):
+                return [self._docs[key] for key in self._indexes[field].get(value, {})]
+        return list(self._docs.values())
+
+    def _add(self, doc: Dict[str, Any]) -> None:
+        for field in self._unique_fields:
+            value = doc.get(field)
+            if value is not None and field in self._indexes and self._indexes[field].get(value):
+                raise DuplicateKeyError(f"E11000 duplicate key error: {field}={value!r}", code=11000)
+        doc.setdefault("_id", next(self._next_id))
+        key = id(doc)
+        self._docs[key] = doc
+        for field in INDEXED_FIELDS:
+            value = doc.get(field)
+            if value is not None:
+                self._indexes[field][value][key] = None
+
+    def _reindex(self, doc: Dict[str, Any], before: Dict[str, Any]) -> None:
+        key = id(doc)
+        for field in INDEXED_FIELDS:
+            old, new = before.get(field), doc.get(field)
+            if old != new:
+                if old is not None:
+                    self._indexes[field][old].pop(key, None)
+                if new is not None:
+                    self._indexes[field][new][key] = None
+
+    # --- reads ---------------------------------------------------------------------------
+
+    def find(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None, **kwargs: Any) -> FakeCursor:
+        cursor = FakeCursor(self, filter or {}, projection)
+        if kwargs.get("sort"):
+            cursor.sort(kwargs["sort"])
+        if kwargs.get("limit"):
+            cursor.limit(kwargs["limit"])
+        return cursor
+
+    def find_one(self, filter: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Optional[Dict[str, Any]]:
+        for doc in self.find(filter, projection, sort=kwargs.get("sort")).limit(1):
+            return doc
+        return None
+
+    def count_documents(self, filter: Dict[str, Any], **kwargs: Any) -> int:
+        return sum(1 for doc in self._candidates(filter) if matches(doc, filter))
+
+    # --- writes --------------------------------------------------------------------------
+
+    def insert_one(self, document: Dict[str, Any], **kwargs: Any) -> SimpleNamespace:
+        stored = copy.deepcopy(document)
+        self._add(stored)
+        document.setdefault("_id", stored["_id"])
+        return SimpleNamespace(inserted_id=stored["_id"], acknowledged=True)
+
+    def insert_many(self, documents: List[Dict[str, Any]], ordered: bool = True, **kwargs: Any) -> SimpleNamespace:
+        inserted, errors = [], []
+        for index, document in enumerate(documents):
+            try:
+                inserted.append(self.insert_one(document).inserted_id)
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted)})
+        return SimpleNamespace(inserted_ids=inserted, acknowledged=True)
+
+    def update_one(self, filter: Dict[str, Any], update: Dict[str, Any], upsert: bool = False, **kwargs: Any) -> SimpleNamespace:
+        for doc in self._candidates(filter):
+            if matches(doc, filter):
+                before = dict(doc)
+                self._apply_update(doc, update, inserting=False)
+                self._reindex(doc, before)
+                return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+        if not upsert:
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+        doc = {k: v for k, v in filter.items() if not k.startswith("$") and not isinstance(v, dict)}
+        self._apply_update(doc, update, inserting=True)
+        self._add(doc)
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=doc["_id"])
+
+    def replace_one(self, filter: Dict[str, Any], replacement: Dict[str, Any], upsert: bool = False, **kwargs: Any) -> SimpleNamespace:
+        for doc in self._candidates(filter):
+            if matches(doc, filter):
+                before = dict(doc)
+                _id = doc["_id"]
+                doc.clear()
+                doc.update(copy.deepcopy(replacement))
+                doc["_id"] = _id
+                self._reindex(doc, before)
+                return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=self.insert_one(dict(replacement)).inserted_id)
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    def bulk_write(self, requests: List[Any], ordered: bool = True, **kwargs: Any) -> SimpleNamespace:
+        counts = {"inserted_count": 0, "matched_count": 0, "modified_count": 0, "upserted_count": 0}
+        errors = []
+        for index, request in enumerate(requests):
+            try:
+                if isinstance(request, InsertOne):
+                    self.insert_one(request._doc)
+                    counts["inserted_count"] += 1
+                    continue
+                if isinstance(request, UpdateOne):
+                    result = self.update_one(request._filter, request._doc, upsert=request._upsert)
+                elif isinstance(request, ReplaceOne):
+                    result = self.replace_one(request._filter, request._doc, upsert=request._upsert)
+                else:
+                    raise NotImplementedError(f"fake_mongo does not support {type(request).__name__}")
+                counts["matched_count"] += result.matched_count
+                counts["modified_count"] += result.modified_count
+                counts["upserted_count"] += 1 if result.upserted_id is not None else 0
+            except DuplicateKeyError as e:
+                errors.append({"index": index, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, **counts})
+        return SimpleNamespace(acknowledged=True, **counts)
+
+    @staticmethod
+    def _apply_update(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool) -> None:
+        for op, fields in update.items():
+            for path, value in fields.items():
+                parent, _, leaf = path.rpartition(".")
+                target = doc
+                if parent:
+                    for part in parent.split("."):
+                        target = target.setdefault(part, {})
+                if op == "$set":
+                    target[leaf] = copy.deepcopy(value)
+                elif op == "$setOnInsert":
+                    if inserting:
+                        target[leaf] = copy.deepcopy(value)
+                elif op == "$inc":
+                    target[leaf] = target.get(leaf, 0) + value
+                elif op == "$max":
+                    if target.get(leaf) is None or value > target[leaf]:
+                        target[leaf] = value
+                elif op == "$push":
+                    items = target.setdefault(leaf, [])
+                    if isinstance(value, dict) and "$each" in value:
+                        items.extend(copy.deepcopy(value["$each"]))
+                        for field, direction in reversed(list(value.get("$sort", {}).items())):
+                            items.sort(key=lambda d: _sort_key(_get_path(d, field)), reverse=direction == -1)
+                        if "$slice" in value:
+                            limit = value["$slice"]
+                            items[:] = items[limit:] if limit < 0 else items[:limit]
+                    else:
+                        items.append(copy.deepcopy(value))
+                else:
+                    raise NotImplementedError(f"fake_mongo does not support update operator {op}")
@@ -0,0 +1,62 @@
+# benchmarks/harness.py
+import asyncio
+import statistics
+import time
+from typing import Dict, Any, List, Callable, Awaitable, Optional
+
+
+def summarize(samples_s: List[float], wall_s: float) -> Dict[str, Any]:
+    ordered = sorted(samples_s)
+
+    def pct(p: float) -> float:
+        if not ordered:
+            return 0.0
+        index = min(len(ordered) - 1, max(0, int(round(p / 100.0 * len(ordered))) - 1))
+        return ordered[index] * 1000.0
+
+    return {
+        "count": len(ordered),
+        "throughput_per_s": round(len(ordered) / wall_s, 2) if wall_s > 0 else None,
+        "mean_ms": round(statistics.fmean(ordered) * 1000.0, 4) if ordered else 0.0,
+        "p50_ms": round(pct(50), 4),
+        "p95_ms": round(pct(95), 4),
+        "p99_ms": round(pct(99), 4),
+        "max_ms": round(ordered[-1] * 1000.0, 4) if ordered else 0.0,
+    }
+
+
+def bench_sync(fn: Callable[[], Any], iterations: int, warmup: int) -> Dict[str, Any]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples, time.perf_counter() - started)
+
+
+async def bench_async(
+    fn: Callable[[int], Awaitable[Any]], iterations: int, warmup: int, concurrency: int = 1,
+    check: Optional[Callable[[Any], None]] = None,
+) -> Dict[str, Any]:
+    # `fn` receives the iteration number; `concurrency` workers share the iteration budget.
+    for i in range(warmup):
+        result = await fn(-1 - i)
+        if check:
+            check(result)
+    samples: List[float] = []
+    counter = iter(range(iterations))
+
+    async def worker() -> None:
+        for i in counter:
+            t0 = time.perf_counter()
+            result = await fn(i)
+            samples.append(time.perf_counter() - t0)
+            if check:
+                check(result)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return summarize(samples, time.perf_counter() - started)
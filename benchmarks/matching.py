@@ -0,0 +1,68 @@
+# benchmarks/matching.py
+# Top-k matching latency at production-like population sizes, on a synthetic index:
+#   python -m benchmarks.matching [--users 1000000] [--k 10] [--iterations 200] [--budget-ms 50]
+# Exits non-zero when p99 exceeds --budget-ms, so it can gate CI.
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Any
+
+import numpy as np
+
+from app.matching import MatchingIndex, QUIZ_BITS, QUIZ_COLUMNS, DIMENSIONS, parse_weights
+from benchmarks.harness import bench_sync
+
+SEED = 1234
+
+
+def build_index(users: int, seed: int = SEED) -> MatchingIndex:
+    rng = np.random.default_rng(seed)
+    # Scores are trait means on 1-5 scales, rounded like stored reports.
+    values = np.round(np.clip(rng.normal(3.0, 0.8, size=(users, DIMENSIONS)), 1.0, 5.0), 2).astype(np.float32)
+    # ~70% took both quizzes, the rest only one of them.
+    both = sum(QUIZ_BITS.values())
+    choices = np.array([both] + list(QUIZ_BITS.values()), dtype=np.uint8)
+    present = rng.choice(choices, size=users, p=[0.7] + [0.3 / len(QUIZ_BITS)] * len(QUIZ_BITS))
+    for quiz_id, bit in QUIZ_BITS.items():
+        values[np.ix_((present & bit) == 0, list(QUIZ_COLUMNS[quiz_id]))] = 3.0
+    return MatchingIndex.from_arrays([f"user{i}" for i in range(users)], values, present)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark MatchingIndex.top_k.")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="Fail when p99 is above this.")
+    parser.add_argument("--output", type=Path, default=None, help="Also write the results as JSON.")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = build_index(args.users)
+    build_s = time.perf_counter() - started
+    rng = np.random.default_rng(SEED + 1)
+    queries = [f"user{i}" for i in rng.integers(0, args.users, size=max(1, args.iterations + args.warmup))]
+    position = iter(range(len(queries) * 4))
+    weights = parse_weights("Neuroticism=2,Anxiety=2")
+
+    results: Dict[str, Any] = {
+        "top_k": bench_sync(lambda: index.top_k(queries[next(position) % len(queries)], args.k), args.iterations, args.warmup),
+        "top_k_weighted": bench_sync(lambda: index.top_k(queries[next(position) % len(queries)], args.k, weights), args.iterations, args.warmup),
+    }
+    print(f"{args.users} users indexed in {build_s:.1f}s")
+    for name, stats in results.items():
+        print(f"  {name:<16} p50 {stats['p50_ms']:>8.3f}ms  p95 {stats['p95_ms']:>8.3f}ms  p99 {stats['p99_ms']:>8.3f}ms")
+    if args.output:
+        args.output.write_text(json.dumps({"users": args.users, "k": args.k, "micro": results}, indent=2, sort_keys=True))
+    worst = max(stats["p99_ms"] for stats in results.values())
+    if worst > args.budget_ms:
+        print(f"p99 {worst:.1f}ms exceeds the {args.budget_ms:.0f}ms budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
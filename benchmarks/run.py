@@ -0,0 +1,292 @@
+# benchmarks/run.py
+# Reproducible route and micro benchmarks. Drives the real FastAPI app in-process through an
+# ASGI client with benchmarks.fake_mongo standing in for MongoDB, and writes a JSON file that
+# benchmarks.compare can diff against another run:
+#   python -m benchmarks.run [--quick] [--concurrency 4] [--storage sqlite] [--output bench_results.json]
+#   python -m benchmarks.compare baseline.json bench_results.json
+import os
+
+# Never let a benchmark reach the cluster configured in .env; load_dotenv() does not override.
+os.environ["MONGO_URI"] = ""
+os.environ.setdefault("EXPORT_TOKEN", "bench-export-token")
+# One bench user submits hundreds of times; per-user rate limits would turn that into 429s.
+os.environ.setdefault("ADMISSION_SUBMIT_RATE_PER_MIN", "0")
+os.environ.setdefault("ADMISSION_REPORT_RATE_PER_MIN", "0")
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, Callable
+
+import httpx
+from starlette.requests import Request
+
+from app import database
+from app.answers import get_answer_decoder
+from app.bulk_import import score_chunk
+from app.export import ExportEncoder, DEFAULT_EXPORT_FIELDS
+from app.norms import ScoreNorms
+from app.storage import MongoReportStore, SQLiteReportStore
+from app.summaries import rebuild_summaries
+from app import main as app_main
+from app.report_views import build_report_view_model
+from app.scoring import calculate_bfi10_scores, calculate_mas12_scores, get_scorer, SCORING_VERSION
+from benchmarks.fake_mongo import FakeCollection
+from benchmarks.harness import bench_sync, bench_async
+from benchmarks.matching import build_index
+
+SEED = 1234
+DASHBOARD_SIZES = (0, 100, 10_000)
+BENCH_PASSWORD = "bench-password"
+
+
+def bench_email(size: int) -> str:
+    return f"bench{size}@example.com"
+
+
+def register_bench_users() -> None:
+    for size in DASHBOARD_SIZES:
+        email = bench_email(size)
+        app_main.FAKE_USERS_DB[email] = {"hashed_password": BENCH_PASSWORD, "email": email, "id": f"bench{size}"}
+
+
+def random_answers(rng: random.Random, quiz_id: str) -> Dict[str, int]:
+    quiz = app_main.quiz_registry.get(quiz_id)
+    return {q.id: rng.randint(1, 5) for q in quiz.questions}
+
+
+def make_report(rng: random.Random, user_id: str, quiz_id: str, date_taken: datetime, index: int) -> Dict[str, Any]:
+    quiz = app_main.quiz_registry.get(quiz_id)
+    answers = random_answers(rng, quiz_id)
+    score = get_scorer(quiz).score_batch([answers])[0]
+    report_id = f"rep_{user_id}_{index:06d}"
+    return {
+        "id": report_id, "user_id": user_id, "quiz_id": quiz_id, "quiz_title": quiz.title,
+        "quiz_description": quiz.description, "score": score, "date_taken": date_taken,
+        "answers_submitted": answers, "report_type": quiz_id, "scoring_version": SCORING_VERSION,
+        "view_model": build_report_view_model(quiz_id, score, report_id),
+    }
+
+
+def seed_reports(collection: FakeCollection) -> Dict[int, List[str]]:
+    rng = random.Random(SEED)
+    start = datetime(2025, 1, 1)
+    report_ids: Dict[int, List[str]] = {}
+    for size in DASHBOARD_SIZES:
+        user_id = f"bench{size}"
+        report_ids[size] = []
+        for i in range(size):
+            doc = make_report(rng, user_id, "bfi-10" if i % 2 == 0 else "mas-12", start + timedelta(minutes=i), i)
+            collection.insert_one(doc)
+            report_ids[size].append(doc["id"])
+    return report_ids
+
+
+def make_template_request() -> Request:
+    scope = {
+        "type": "http", "method": "GET", "path": "/", "raw_path": b"/", "query_string": b"",
+        "headers": [(b"host", b"testserver")], "scheme": "http", "server": ("testserver", 80),
+        "root_path": "", "app": app_main.app, "router": app_main.app.router,
+    }
+    request = Request(scope)
+    request.state.user = app_main.FAKE_USERS_DB[bench_email(100)]
+    request.state.current_year = datetime.now().year
+    return request
+
+
+def expect_status(*codes: int) -> Callable[[httpx.Response], None]:
+    def check(response: httpx.Response) -> None:
+        if response.status_code not in codes:
+            raise AssertionError(f"{response.request.method} {response.request.url} -> {response.status_code}, expected {codes}")
+    return check
+
+
+async def run_route_benchmarks(client: httpx.AsyncClient, report_ids: Dict[int, List[str]], iterations: int, warmup: int, concurrency: int) -> Dict[str, Any]:
+    rng = random.Random(SEED + 1)
+    cookie = {size: {"Cookie": f"user_session={bench_email(size)}"} for size in DASHBOARD_SIZES}
+    results: Dict[str, Any] = {}
+
+    async def login(i: int) -> httpx.Response:
+        return await client.post("/login", data={"email": bench_email(0), "password": BENCH_PASSWORD})
+    results["login"] = await bench_async(login, iterations, warmup, concurrency, expect_status(200))
+
+    for size in DASHBOARD_SIZES:
+        async def dashboard(i: int, headers=cookie[size]) -> httpx.Response:
+            return await client.get("/dashboard", headers=headers)
+        results[f"dashboard_{size}_reports"] = await bench_async(dashboard, iterations, warmup, concurrency, expect_status(200))
+
+    async def dashboard_boosted(i: int) -> httpx.Response:
+        return await client.get("/dashboard", headers={**cookie[100], "HX-Request": "true", "HX-Boosted": "true"})
+    results["dashboard_100_reports_boosted"] = await bench_async(dashboard_boosted, iterations, warmup, concurrency, expect_status(200))
+
+    async def quiz_page(i: int) -> httpx.Response:
+        return await client.get("/quiz/bfi-10", headers=cookie[100])
+    results["quiz_page"] = await bench_async(quiz_page, iterations, warmup, concurrency, expect_status(200))
+
+    definition_url = app_main.app.url_path_for(
+        "quiz_definition_route", quiz_id="bfi-10", version=app_main.quiz_registry.get("bfi-10").definition_version
+    )
+
+    async def quiz_definition(i: int) -> httpx.Response:
+        return await client.get(definition_url, headers={"Accept-Encoding": "gzip, br"})
+    results["quiz_definition"] = await bench_async(quiz_definition, iterations, warmup, concurrency, expect_status(200))
+
+    bfi_answers = json.dumps(random_answers(rng, "bfi-10"))
+
+    async def submit(i: int) -> httpx.Response:
+        return await client.post("/quiz/bfi-10/submit", data={"answers": bfi_answers}, headers=cookie[0])
+    results["submit_bfi10"] = await bench_async(submit, iterations, warmup, concurrency, expect_status(303))
+
+    ids = report_ids[100]
+
+    async def report_uncached(i: int) -> httpx.Response:
+        app_main.report_html_cache.clear()
+        return await client.get(f"/report/{ids[i % len(ids)]}", headers=cookie[100])
+    results["report_page_uncached"] = await bench_async(report_uncached, iterations, warmup, concurrency, expect_status(200))
+
+    async def report_cached(i: int) -> httpx.Response:
+        return await client.get(f"/report/{ids[0]}", headers=cookie[100])
+    results["report_page_cached"] = await bench_async(report_cached, iterations, warmup, concurrency, expect_status(200))
+
+    async def export_all(i: int) -> httpx.Response:
+        return await client.get("/export/reports?gzip=true", headers={"Authorization": f"Bearer {app_main.EXPORT_TOKEN}"})
+    results["export_all_reports_ndjson_gzip"] = await bench_async(export_all, max(1, iterations // 20), warmup, concurrency, expect_status(200))
+    return results
+
+
+def run_micro_benchmarks(collection: FakeCollection, iterations: int, warmup: int) -> Dict[str, Any]:
+    rng = random.Random(SEED + 2)
+    registry = app_main.quiz_registry
+    bfi, mas = registry.get("bfi-10"), registry.get("mas-12")
+    bfi_answers, mas_answers = random_answers(rng, "bfi-10"), random_answers(rng, "mas-12")
+    bfi_batch = [random_answers(rng, "bfi-10") for _ in range(1000)]
+    bfi_scorer, mas_scorer = get_scorer(bfi), get_scorer(mas)
+    bfi_decoder, bfi_answers_json = get_answer_decoder(bfi), json.dumps(bfi_answers)
+    matching = build_index(100_000)
+    import_chunk = [
+        (line_no, json.dumps({"user_id": f"u{line_no}", "quiz_id": "bfi-10", "answers": answers}).encode("utf-8"))
+        for line_no, answers in enumerate(bfi_batch, start=1)
+    ]
+    export_docs = list(collection.find({}, {"_id": 0}).limit(1000))
+    norms, bfi_batch_scores = ScoreNorms(), bfi_scorer.score_batch(bfi_batch)
+    for score in bfi_batch_scores:
+        norms.apply("bfi-10", score)
+    results: Dict[str, Any] = {
+        "calculate_bfi10_scores": bench_sync(lambda: calculate_bfi10_scores(bfi.definition["questions"], bfi_answers), iterations, warmup),
+        "calculate_mas12_scores": bench_sync(lambda: calculate_mas12_scores(mas.definition["questions"], mas_answers), iterations, warmup),
+        "compiled_score_bfi10": bench_sync(lambda: bfi_scorer.score(bfi_answers), iterations, warmup),
+        "compiled_score_mas12": bench_sync(lambda: mas_scorer.score(mas_answers), iterations, warmup),
+        "decode_answers_bfi10": bench_sync(lambda: bfi_decoder.decode_json(bfi_answers_json), iterations, warmup),
+        "decode_and_score_bfi10": bench_sync(lambda: bfi_scorer.score_values(bfi_decoder.decode_json(bfi_answers_json).values), iterations, warmup),
+        "score_batch_bfi10_x1000": bench_sync(lambda: bfi_scorer.score_batch(bfi_batch), max(1, iterations // 20), warmup),
+        "norms_percentiles_bfi10": bench_sync(lambda: norms.percentiles("bfi-10", bfi_batch_scores[0]), iterations, warmup),
+        "matching_top10_100k_users": bench_sync(lambda: matching.top_k("user42", 10), iterations, warmup),
+        "import_score_chunk_bfi10_x1000": bench_sync(lambda: score_chunk(import_chunk), max(1, iterations // 20), warmup),
+        "export_encode_ndjson_x1000": bench_sync(lambda: ExportEncoder("ndjson", list(DEFAULT_EXPORT_FIELDS)).encode(export_docs), max(1, iterations // 20), warmup),
+        "export_encode_csv_gzip_x1000": bench_sync(lambda: ExportEncoder("csv", list(DEFAULT_EXPORT_FIELDS), compress=True).encode(export_docs), max(1, iterations // 20), warmup),
+        "load_quizzes_data": bench_sync(app_main.load_quizzes_data, iterations, warmup),
+    }
+
+    request = make_template_request()
+    user = request.state.user
+    dashboard_reports = list(collection.find({"user_id": user["id"]}, database.DASHBOARD_REPORT_PROJECTION).sort("date_taken", -1).limit(app_main.DASHBOARD_PAGE_SIZE))
+    bfi_report = collection.find_one({"user_id": user["id"], "quiz_id": "bfi-10"})
+    mas_report = collection.find_one({"user_id": user["id"], "quiz_id": "mas-12"})
+    contexts = {
+        "dashboard.html": {"title": "Dashboard", "quizzes": registry.definitions(), "reports": dashboard_reports, "next_cursor": "x"},
+        "quiz_page.html": {"title": "Quiz", "quiz": bfi.definition, "definition_url": f"/quiz/bfi-10/definition.{bfi.definition_version}.json"},
+        "big_five_report.html": {"title": "Report", "report": bfi_report, **bfi_report["view_model"]},
+        "mas_report.html": {"title": "Report", "report": mas_report, **mas_report["view_model"]},
+    }
+    for name, extra in contexts.items():
+        template = app_main.templates.get_template(name)
+        context = {"request": request, "user": user, **extra}
+        results[f"render_{name}"] = bench_sync(lambda: template.render(context), iterations, warmup)
+    return results
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    register_bench_users()
+    async with app_main.app.router.lifespan_context(app_main.app):
+        collection = FakeCollection()
+        database.ensure_indexes(collection)
+        report_ids = seed_reports(collection)
+        with tempfile.TemporaryDirectory(prefix="mansematch-bench-") as tmp:
+            if args.storage == "sqlite":
+                # What a single-node deployment runs: reports in SQLite, no norms or summaries.
+                store = SQLiteReportStore(str(Path(tmp) / "reports.db"))
+                docs = list(collection.find({}))
+                for i in range(0, len(docs), 1000):
+                    store.insert_reports(docs[i:i + 1000])
+                database.report_store = store
+            else:
+                database.reports_collection = collection
+                database.report_store = MongoReportStore(collection)
+                database.stats_collection = FakeCollection("score_stats")
+                database.summaries_collection = FakeCollection("user_summaries")
+                rebuild_summaries(collection, database.summaries_collection, None, 1000, dry_run=False)
+            transport = httpx.ASGITransport(app=app_main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+                routes = await run_route_benchmarks(client, report_ids, args.iterations, args.warmup, args.concurrency)
+            micro = run_micro_benchmarks(collection, args.iterations * 2, args.warmup)
+            database.report_store.close()
+            database.report_store = None
+            database.reports_collection = None
+            database.stats_collection = None
+            database.summaries_collection = None
+    return {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat() + "Z", "git_revision": git_revision(),
+            "python": sys.version.split()[0], "platform": platform.platform(),
+            "iterations": args.iterations, "warmup": args.warmup, "concurrency": args.concurrency, "seed": SEED,
+            "storage": args.storage,
+        },
+        "routes": routes,
+        "micro": micro,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark mansematch routes and hot functions.")
+    parser.add_argument("--iterations", type=int, default=300)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent in-flight requests per route benchmark.")
+    parser.add_argument("--quick", action="store_true", help="A tenth of the iterations, for smoke runs.")
+    parser.add_argument("--storage", choices=("fake", "sqlite"), default="fake",
+                        help="Report storage: in-memory fake MongoDB, or the embedded SQLite backend on a temp file.")
+    parser.add_argument("--output", type=Path, default=Path("bench_results.json"))
+    parser.add_argument("--log-level", default="ERROR", help="App log level while benchmarking (logging cost is otherwise measured too).")
+    args = parser.parse_args()
+    if args.quick:
+        args.iterations, args.warmup = max(10, args.iterations // 10), max(2, args.warmup // 10)
+    logging.disable(getattr(logging, args.log_level.upper()) - 1)
+
+    started = time.perf_counter()
+    results = asyncio.run(run(args))
+    args.output.write_text(json.dumps(results, indent=2, sort_keys=True))
+    print(f"Wrote {args.output} in {time.perf_counter() - started:.1f}s")
+    for section in ("routes", "micro"):
+        print(f"\n{section}:")
+        for name, stats in results[section].items():
+            print(f"  {name:<32} p50 {stats['p50_ms']:>9.3f}ms  p95 {stats['p95_ms']:>9.3f}ms  p99 {stats['p99_ms']:>9.3f}ms  {stats['throughput_per_s']:>10}/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,10 @@
+// tailwind.config.js -- used by `python -m app.assets build`
+/** @type {import('tailwindcss').Config} */
+module.exports = {
+    // Templates include inline JS that assembles class names, so scan them whole.
+    content: ["./app/templates/**/*.html"],
+    theme: {
+        extend: {},
+    },
+    plugins: [],
+};
@@ -0,0 +1,28 @@
+# tests/conftest.py
+# The app reads its configuration at import time: pin it before anything imports `app`, so the
+# tests never reach a real database (.env may hold one) and admission control never sheds them.
+import os
+
+os.environ["MONGO_URI"] = ""
+os.environ.setdefault("STORAGE_BACKEND", "mongo")
+os.environ.setdefault("ADMISSION_SUBMIT_RATE_PER_MIN", "0")
+os.environ.setdefault("ADMISSION_REPORT_RATE_PER_MIN", "0")
+
+import pytest
+
+from app import database
+from app.storage import MongoReportStore
+from benchmarks.fake_mongo import FakeCollection
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    # The Mongo-backed globals of app.database, on in-memory collections.
+    reports = FakeCollection("reports")
+    database.ensure_indexes(reports)
+    summaries, stats = FakeCollection("user_summaries"), FakeCollection("score_stats")
+    monkeypatch.setattr(database, "reports_collection", reports)
+    monkeypatch.setattr(database, "summaries_collection", summaries)
+    monkeypatch.setattr(database, "stats_collection", stats)
+    monkeypatch.setattr(database, "report_store", MongoReportStore(reports))
+    return database
@@ -0,0 +1,129 @@
+# tests/test_admission.py
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import admission
+from app.admission import AdmissionGate, AdmissionRejected, ConcurrencyLimiter, TokenBuckets
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(admission.time, "monotonic", clock)
+    return clock
+
+
+def test_token_bucket_burst_then_refill(clock):
+    buckets = TokenBuckets(rate_per_min=60, burst=3)
+    assert [buckets.take("u1") for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert buckets.take("u1") == pytest.approx(1.0)
+    assert buckets.take("u2") == 0.0  # buckets are per key
+    clock.now += 0.5
+    assert buckets.take("u1") == pytest.approx(0.5)
+    clock.now += 0.5
+    assert buckets.take("u1") == 0.0
+    clock.now += 3600
+    assert [buckets.take("u1") for _ in range(4)][-1] > 0  # refill is capped at the burst
+
+
+def test_token_buckets_forget_least_recently_seen(clock):
+    buckets = TokenBuckets(rate_per_min=1, burst=1, max_keys=2)
+    buckets.take("a")
+    buckets.take("b")
+    assert buckets.take("a") > 0  # a is now the most recently seen
+    buckets.take("c")  # evicts b
+    assert buckets.take("b") == 0.0
+    assert buckets.take("a") == 0.0  # evicted in turn by b
+    assert TokenBuckets(rate_per_min=0, burst=1).take("a") == 0.0
+
+
+def test_concurrency_limiter_hands_slots_over_in_arrival_order():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, max_queue=2, queue_timeout=5)
+        order = []
+        await limiter.acquire()
+
+        async def worker(name):
+            await limiter.acquire()
+            order.append(name)
+            await asyncio.sleep(0)
+            limiter.release()
+
+        tasks = [asyncio.create_task(worker(n)) for n in ("first", "second")]
+        await asyncio.sleep(0)
+        assert limiter.queued == 2
+        with pytest.raises(AdmissionRejected) as rejected:
+            await limiter.acquire()
+        assert rejected.value.reason == "queue_full"
+        limiter.release()
+        await asyncio.gather(*tasks)
+        return order, limiter.in_flight, limiter.queued
+
+    assert asyncio.run(scenario()) == (["first", "second"], 0, 0)
+
+
+def test_concurrency_limiter_times_out_and_survives_cancellation():
+    async def scenario():
+        limiter = ConcurrencyLimiter(limit=1, max_queue=4, queue_timeout=0.01)
+        await limiter.acquire()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await limiter.acquire()
+        assert rejected.value.reason == "queue_timeout"
+        limiter.queue_timeout = 5
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert limiter.queued == 0
+        limiter.release()
+        return limiter.in_flight
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_gate_counts_rejections_and_releases(clock):
+    async def scenario():
+        gate = AdmissionGate("submit", concurrency=1, max_queue=0, rate_per_min=60, burst=1)
+        async with gate.admit("u1"):
+            with pytest.raises(AdmissionRejected) as rejected:
+                async with gate.admit("u2"):
+                    pass
+            assert rejected.value.reason == "queue_full"
+        with pytest.raises(AdmissionRejected) as rejected:
+            async with gate.admit("u1"):
+                pass
+        assert rejected.value.reason == "rate_limited" and rejected.value.retry_after_header == "1"
+        async with gate.admit(None):  # anonymous requests skip the rate limit
+            pass
+        return gate.rejected, gate.limiter.in_flight
+
+    assert asyncio.run(scenario()) == ({"rate_limited": 1, "queue_full": 1, "queue_timeout": 0}, 0)
+
+
+def test_report_revalidations_and_cache_hits_are_not_admission_controlled(fake_db, monkeypatch):
+    from app import main
+    monkeypatch.setitem(main.admission_gates, "report", AdmissionGate("report", concurrency=1, max_queue=0, rate_per_min=1, burst=1))
+    with TestClient(main.app) as client:
+        client.cookies.set("user_session", "user1@example.com")
+        answers = json.dumps({f"bfi_{i}": 3 for i in range(1, 11)})
+        report_url = client.post("/quiz/bfi-10/submit", data={"answers": answers}, follow_redirects=False).headers["location"]
+        first = client.get(report_url)  # the user's only token
+        assert first.status_code == 200
+        for _ in range(3):
+            assert client.get(report_url, headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+            assert client.get(report_url).status_code == 200  # render cache
+        shed = client.get("/report/rep_other")
+        assert shed.status_code == 429 and shed.headers["retry-after"]
+    assert main.admission_gates["report"].rejected["rate_limited"] == 1
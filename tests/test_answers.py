@@ -0,0 +1,53 @@
+# tests/test_answers.py
+import asyncio
+import json
+from urllib.parse import urlencode
+
+import pytest
+from fastapi import Request
+
+from app import answers
+from app.answers import AnswerDecodeError, read_answers_payload
+
+
+def make_request(content_type, body, chunk_size=1024, content_length=False):
+    headers = [(b"content-type", content_type.encode())]
+    if content_length:
+        headers.append((b"content-length", str(len(body)).encode()))
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+    received = []
+
+    async def receive():
+        chunk = chunks[len(received)]
+        received.append(chunk)
+        return {"type": "http.request", "body": chunk, "more_body": len(received) < len(chunks)}
+
+    request = Request({"type": "http", "method": "POST", "path": "/", "headers": headers, "query_string": b""}, receive)
+    return request, received
+
+
+def test_form_and_json_payloads():
+    form = urlencode({"answers": json.dumps({"1": 3})}).encode()
+    request, _ = make_request("application/x-www-form-urlencoded", form, chunk_size=5)
+    assert asyncio.run(read_answers_payload(request)) == '{"1": 3}'
+
+    request, _ = make_request("application/json", json.dumps({"answers": {"1": 3}}).encode(), content_length=True)
+    assert asyncio.run(read_answers_payload(request)) == {"1": 3}
+
+
+@pytest.mark.parametrize("content_type,limit", [
+    ("application/x-www-form-urlencoded", answers.MAX_FORM_BODY_BYTES),
+    ("application/json", answers.MAX_ANSWERS_PAYLOAD_BYTES),
+])
+def test_chunked_body_without_content_length_is_capped(content_type, limit):
+    request, received = make_request(content_type, b"a" * (limit * 10))
+    with pytest.raises(AnswerDecodeError, match="too large"):
+        asyncio.run(read_answers_payload(request))
+    assert sum(map(len, received)) <= limit + 1024  # stopped reading at the limit
+
+
+def test_declared_oversize_body_is_refused_unread():
+    request, received = make_request("application/x-www-form-urlencoded", b"a" * (answers.MAX_FORM_BODY_BYTES + 1), content_length=True)
+    with pytest.raises(AnswerDecodeError, match="too large"):
+        asyncio.run(read_answers_payload(request))
+    assert received == []
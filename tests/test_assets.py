@@ -0,0 +1,81 @@
+# tests/test_assets.py
+import gzip
+import hashlib
+import io
+import zipfile
+
+import pytest
+
+from app import assets
+from app.assets import AssetManifest, sri_hash, verify_integrity
+
+
+def test_stylesheet_urls_point_at_fingerprinted_files(tmp_path):
+    (tmp_path / "fonts").mkdir()
+    (tmp_path / "css").mkdir()
+    (tmp_path / "fonts" / "inter.woff2").write_bytes(b"font-bytes")
+    css = b'@font-face{src:url("../fonts/inter.woff2") format("woff2")}a{background:url(data:image/png;base64,AA==)}'
+    (tmp_path / "css" / "app.css").write_bytes(css)
+    (tmp_path / "css" / "app.css.gz").write_bytes(gzip.compress(css))  # built for the unrewritten file
+
+    manifest = AssetManifest(tmp_path)
+    manifest.load()
+
+    font_url = manifest.url("fonts/inter.woff2")
+    stylesheet, _ = manifest.resolve("css/app.css")
+    body = stylesheet.body.decode()
+    assert f'url("../{font_url[len(assets.STATIC_URL_PREFIX):]}")' in body
+    assert "url(data:image/png;base64,AA==)" in body
+    assert gzip.decompress(stylesheet.gzip_body) == stylesheet.body
+    assert manifest.resolve(manifest.url("css/app.css")[len(assets.STATIC_URL_PREFIX):]) == (stylesheet, True)
+
+
+def test_vendored_files_must_match_their_pin():
+    body = b"console.log(1)"
+    verify_integrity("https://cdn.example/x.js", body, sri_hash(body))
+    with pytest.raises(RuntimeError, match="Integrity check failed"):
+        verify_integrity("https://cdn.example/x.js", body + b";", sri_hash(body))
+    with pytest.raises(RuntimeError, match="No integrity hash pinned"):
+        verify_integrity("https://cdn.example/x.js", body, None)
+
+
+def test_tailwind_binary_is_checked_before_use(tmp_path, monkeypatch):
+    monkeypatch.delenv("TAILWIND_BIN", raising=False)
+    monkeypatch.setattr(assets.shutil, "which", lambda name: None)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setattr(assets, "_download", lambda url: b"not the release")
+    monkeypatch.setenv("TAILWIND_SHA256", "0" * 64)
+    with pytest.raises(RuntimeError, match="Checksum mismatch"):
+        assets._tailwind_binary()
+    assert not list((tmp_path / "mansematch").iterdir())  # nothing left behind to execute
+
+
+def test_every_vendored_file_and_tailwind_target_is_pinned():
+    for logical, vendor in assets.VENDOR_ASSETS.items():
+        assert vendor.integrity.startswith("sha384-") and len(vendor.integrity) == 71, logical
+        assert (vendor.url is None) != (vendor.archive is None), logical
+        if vendor.archive is not None:
+            assert vendor.archive in assets.VENDOR_ARCHIVES and vendor.member, logical
+    for name, (url, sha256) in assets.VENDOR_ARCHIVES.items():
+        assert url.startswith("https://") and len(sha256) == 64 and int(sha256, 16) >= 0, name
+    assert set(assets.TAILWIND_SHA256) == {"linux-x64", "linux-arm64", "macos-x64", "macos-arm64"}
+    for target, sha256 in assets.TAILWIND_SHA256.items():
+        assert len(sha256) == 64 and int(sha256, 16) >= 0, target
+        assert f"fastapi-tailwind-1.0.2b1-{target}" in assets.VENDOR_ARCHIVES
+
+
+def test_vendored_file_is_extracted_from_a_checked_archive(monkeypatch):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("pkg/lib.js", b"lib()")
+    wheel = buffer.getvalue()
+    monkeypatch.setattr(assets, "_archives", {})
+    monkeypatch.setattr(assets, "_download", lambda url: wheel)
+    monkeypatch.setitem(assets.VENDOR_ARCHIVES, "pkg", ("https://files.example/pkg.whl", hashlib.sha256(wheel).hexdigest()))
+    vendor = assets.VendorFile(sri_hash(b"lib()"), archive="pkg", member="pkg/lib.js")
+    assert assets.fetch_vendor_file(vendor) == ("pkg:pkg/lib.js", b"lib()")
+
+    monkeypatch.setattr(assets, "_archives", {})
+    monkeypatch.setitem(assets.VENDOR_ARCHIVES, "pkg", ("https://files.example/pkg.whl", "0" * 64))
+    with pytest.raises(RuntimeError, match="Checksum mismatch"):
+        assets.fetch_vendor_file(vendor)
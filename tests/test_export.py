@@ -0,0 +1,14 @@
+# tests/test_export.py
+from app import export
+
+
+def test_export_token_check(monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_TOKEN", "s3cret")
+    assert export.is_export_authorized("Bearer s3cret")
+    assert not export.is_export_authorized("Bearer s3cre")
+    assert not export.is_export_authorized("s3cret")
+    assert not export.is_export_authorized(None)
+    assert not export.is_export_authorized("Bearer é")  # non-ASCII header values must not raise
+
+    monkeypatch.setattr(export, "EXPORT_TOKEN", None)
+    assert not export.is_export_authorized("Bearer None")
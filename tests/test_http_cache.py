@@ -0,0 +1,97 @@
+# tests/test_http_cache.py
+import json
+from datetime import datetime
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+from app.http_cache import make_etag, etag_matches, not_modified, add_vary
+
+
+def request_with(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "query_string": b""})
+
+
+def test_make_etag_is_stable_and_quoted():
+    etag = make_etag("report", "r1", None, 3)
+    assert etag == make_etag("report", "r1", None, 3)
+    assert etag != make_etag("report", "r1", None, 4)
+    assert etag.startswith('"') and etag.endswith('"')
+
+
+@pytest.mark.parametrize("header,expected", [
+    (None, False),
+    ("", False),
+    ('"abc"', True),
+    ('W/"abc"', True),  # weak comparison
+    ('"x", W/"abc" ', True),
+    ('"abcd"', False),
+    ("*", False),  # checked before the lookup, so it must not stand in for one
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(request_with(header), '"abc"') is expected
+
+
+def test_not_modified_carries_validators():
+    response = add_vary(not_modified('"abc"', datetime(2025, 1, 2, 3, 4, 5)), "HX-Request")
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == '"abc"'
+    assert response.headers["last-modified"] == "Thu, 02 Jan 2025 03:04:05 GMT"
+    assert response.headers["cache-control"] == "private, no-cache"
+    assert response.headers["vary"] == "HX-Request"
+    assert add_vary(response, "hx-request", "Cookie").headers["vary"] == "HX-Request, Cookie"
+
+
+@pytest.fixture
+def client(fake_db):
+    from app import main
+    with TestClient(main.app) as client:
+        client.cookies.set("user_session", "user1@example.com")
+        yield client
+
+
+def revalidate(client, url, response, **headers):
+    return client.get(url, headers={"If-None-Match": response.headers["etag"], **headers})
+
+
+def test_quiz_page_revalidates(client):
+    first = client.get("/quiz/bfi-10")
+    assert first.status_code == 200 and first.headers["etag"]
+    again = revalidate(client, "/quiz/bfi-10", first)
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == first.headers["etag"]
+    # The HTMX fragment is a different representation.
+    assert revalidate(client, "/quiz/bfi-10", first, **{"HX-Request": "true"}).status_code == 200
+
+
+def test_report_and_dashboard_revalidate_until_a_new_submission(client):
+    answers = json.dumps({f"bfi_{i}": 3 for i in range(1, 11)})
+    submitted = client.post("/quiz/bfi-10/submit", data={"answers": answers}, follow_redirects=False)
+    assert submitted.status_code == 303
+    report_url = submitted.headers["location"]
+
+    report = client.get(report_url)
+    assert report.status_code == 200
+    assert revalidate(client, report_url, report).status_code == 304
+
+    dashboard = client.get("/dashboard")
+    assert dashboard.status_code == 200 and dashboard.headers["etag"]
+    assert revalidate(client, "/dashboard", dashboard).status_code == 304
+
+    client.post("/quiz/bfi-10/submit", data={"answers": answers}, follow_redirects=False)
+    refreshed = revalidate(client, "/dashboard", dashboard)
+    assert refreshed.status_code == 200
+    assert refreshed.headers["etag"] != dashboard.headers["etag"]
+    # Reports are immutable: the first report still validates.
+    assert revalidate(client, report_url, report).status_code == 304
+
+
+def test_wildcard_never_revalidates_a_missing_or_foreign_report(client):
+    answers = json.dumps({f"bfi_{i}": 3 for i in range(1, 11)})
+    report_url = client.post("/quiz/bfi-10/submit", data={"answers": answers}, follow_redirects=False).headers["location"]
+    assert client.get("/report/rep_missing", headers={"If-None-Match": "*"}).status_code == 404
+    client.cookies.set("user_session", "user2@example.com")
+    assert client.get(report_url, headers={"If-None-Match": "*"}).status_code == 404
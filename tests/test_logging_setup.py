@@ -0,0 +1,26 @@
+# tests/test_logging_setup.py
+import logging
+
+from app.logging_setup import RateLimitFilter
+
+
+def make_record(level: int, msg: str = "QID %s: unknown trait key") -> logging.LogRecord:
+    return logging.LogRecord("app.scoring", level, __file__, 1, msg, ("q1",), None)
+
+
+def test_repeated_warnings_are_sampled_after_the_burst():
+    limiter = RateLimitFilter(window=60, burst=3, sample_every=10)
+    passed = [limiter.filter(make_record(logging.WARNING)) for _ in range(23)]
+    assert passed[:3] == [True] * 3
+    assert sum(passed) == 5  # the burst, then the 10th and 20th after it
+    assert limiter.suppressed_total == 18
+    records = [make_record(logging.WARNING) for _ in range(10)]
+    assert [limiter.filter(r) for r in records] == [False] * 9 + [True]
+    assert records[-1].suppressed == 9
+
+
+def test_errors_are_never_sampled():
+    limiter = RateLimitFilter(window=60, burst=1, sample_every=1000)
+    for level in (logging.ERROR, logging.CRITICAL):
+        assert all(limiter.filter(make_record(level)) for _ in range(500))
+    assert limiter.suppressed_total == 0
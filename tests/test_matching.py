@@ -0,0 +1,63 @@
+# tests/test_matching.py
+from datetime import datetime
+
+import numpy as np
+
+from app import matching
+from app.matching import MatchingIndex, QUIZ_COLUMNS, TRAIT_COLUMNS
+
+
+def bfi_score(value):
+    return {TRAIT_COLUMNS[c][1]: value for c in QUIZ_COLUMNS["bfi-10"]}
+
+
+def test_load_documents_skips_and_counts_bad_rows():
+    docs = [
+        {"id": "r1", "user_id": "u1", "quiz_id": "bfi-10", "score": bfi_score(3.0), "date_taken": datetime(2025, 1, 1)},
+        {"id": "r2", "user_id": "u2", "quiz_id": "bfi-10", "score": bfi_score("high"), "date_taken": datetime(2025, 1, 1)},
+        {"id": "r3", "user_id": "u3", "quiz_id": "bfi-10", "score": bfi_score(float("nan")), "date_taken": datetime(2025, 1, 1)},
+        {"id": "r4", "user_id": "u4", "quiz_id": "bfi-10", "score": bfi_score(4.0), "date_taken": "2025-01-01"},
+        {"id": "r5", "user_id": "u5", "quiz_id": "bfi-10", "score": "Scoring not applicable.", "date_taken": datetime(2025, 1, 1)},
+        {"id": "r6", "user_id": "u6", "quiz_id": "bfi-10", "score": bfi_score(4.0), "date_taken": datetime(2025, 1, 1)},
+    ]
+    index = MatchingIndex()
+    assert index.load_documents(docs) == 2
+    assert index.skipped == 3
+    assert [m.user_id for m in index.top_k("u1")] == ["u6"]
+
+
+def test_search_recomputes_rows_written_during_the_scan(monkeypatch):
+    index = MatchingIndex()
+    for i in range(5):
+        index.upsert(f"u{i}", "bfi-10", bfi_score(1.0 + i), datetime(2025, 1, 1))
+    real_take = np.take
+    state = {"written": False}
+
+    def take_then_write(table, present):
+        # Lands between the scan of values/squares and the end of top_k: u4 moves next to u0.
+        if not state["written"]:
+            state["written"] = True
+            index._values[QUIZ_COLUMNS["bfi-10"][0], 4] = 1.0  # a torn row: one trait updated...
+            index.upsert("u4", "bfi-10", bfi_score(1.0), datetime(2025, 1, 2))  # ...then the whole write
+        return real_take(table, present)
+
+    monkeypatch.setattr(matching.np, "take", take_then_write)
+    matches = index.top_k("u0", k=2)
+    assert [m.user_id for m in matches] == ["u4", "u1"]
+    assert matches[0].distance == 0.0
+
+
+def test_search_rescans_when_the_write_log_overflowed(monkeypatch):
+    index = MatchingIndex()
+    for i in range(3):
+        index.upsert(f"u{i}", "bfi-10", bfi_score(1.0 + i), datetime(2025, 1, 1))
+    real_take, state = np.take, {"written": False}
+
+    def take_then_overflow(table, present):
+        if not state["written"]:
+            state["written"] = True
+            index._version += matching.WRITE_LOG_SIZE + 1
+        return real_take(table, present)
+
+    monkeypatch.setattr(matching.np, "take", take_then_overflow)
+    assert [m.user_id for m in index.top_k("u0", k=2)] == ["u1", "u2"]
@@ -0,0 +1,49 @@
+# tests/test_metrics.py
+import os
+
+from app import metrics
+
+
+def test_merge_snapshots_labels_every_worker(tmp_path):
+    counter = metrics.Counter("t_requests_total", "Requests.", ("route",))
+    registry = metrics.MetricsRegistry()
+    registry.register(counter)
+    registry.register(metrics.Gauge("t_up", "Up.", callback=lambda: {(): 1}))
+    counter.inc("/a")
+    (tmp_path / "101.prom").write_text(registry.render())
+    counter.inc("/a", amount=2)
+    (tmp_path / "202.prom").write_text(registry.render())
+    (tmp_path / "303.prom.tmp").write_text("partial")
+
+    lines = metrics.merge_snapshots(str(tmp_path)).splitlines()
+
+    assert lines == [
+        "# HELP t_requests_total Requests.",
+        "# TYPE t_requests_total counter",
+        't_requests_total{worker="101",route="/a"} 1.0',
+        't_requests_total{worker="202",route="/a"} 3.0',
+        "# HELP t_up Up.",
+        "# TYPE t_up gauge",
+        't_up{worker="101"} 1.0',
+        't_up{worker="202"} 1.0',
+    ]
+
+
+def test_snapshot_write_and_remove(tmp_path):
+    metrics.EVENT_LOOP_LAG_SECONDS.observe(0.0)
+    metrics.write_snapshot(str(tmp_path))
+    path = metrics.snapshot_path(str(tmp_path), os.getpid())
+    assert os.path.exists(path)
+    assert f'worker="{os.getpid()}"' in metrics.merge_snapshots(str(tmp_path))
+    metrics.remove_snapshot(str(tmp_path), os.getpid())
+    metrics.remove_snapshot(str(tmp_path), os.getpid())
+    assert not os.listdir(tmp_path)
+
+
+def test_metrics_token_check(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", None)
+    assert metrics.is_authorized(None)
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "scrape")
+    assert metrics.is_authorized("Bearer scrape")
+    assert not metrics.is_authorized("Bearer scrap")
+    assert not metrics.is_authorized(None)
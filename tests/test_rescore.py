@@ -0,0 +1,32 @@
+# tests/test_rescore.py
+from datetime import datetime
+
+from app import database, rescore
+from app.scoring import SCORING_VERSION
+from app.summaries import build_summary
+
+BFI_ANSWERS = {f"bfi_{i}": 4 for i in range(1, 11)}
+
+
+def test_rescore_rewrites_scores_and_rebuilds_derived_data(fake_db, monkeypatch):
+    monkeypatch.setattr(database, "connect_to_mongo", lambda: None)
+    monkeypatch.setattr(database, "close_mongo_connection", lambda: None)
+    stale = {"Extraversion": 1.0, "Agreeableness": 1.0, "Conscientiousness": 1.0, "Neuroticism": 1.0, "Openness": 1.0}
+    reports = [
+        {"id": f"rep_{n}", "user_id": "user1", "quiz_id": "bfi-10", "report_type": "bfi-10", "quiz_title": "BFI-10",
+         "answers_submitted": BFI_ANSWERS, "score": dict(stale), "scoring_version": 0, "date_taken": datetime(2024, 1, n + 1)}
+        for n in range(3)
+    ]
+    fake_db.reports_collection.insert_many([dict(r) for r in reports])
+    fake_db.summaries_collection.insert_one(build_summary("user1", reversed(reports)))
+
+    assert rescore.main(["--quiz-id", "bfi-10", "--batch-size", "2"]) == 0
+
+    stored = fake_db.reports_collection.find_one({"id": "rep_0"})
+    assert stored["scoring_version"] == SCORING_VERSION
+    assert stored["score"] != stale
+    summary = fake_db.summaries_collection.find_one({"_id": "user1"})
+    assert summary["latest"]["bfi-10"]["score"] == stored["score"]
+    assert all(entry["score"] == stored["score"] for entry in summary["recent"])
+    stats = fake_db.stats_collection.find_one({"_id": "bfi-10"})
+    assert stats["total"] == 3
@@ -0,0 +1,100 @@
+# tests/test_scoring.py
+# CompiledScorer must score exactly like the per-question loops it replaced, kept here as the reference.
+import json
+import random
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pytest
+
+from app.answers import get_answer_decoder
+from app.quizzes import QuizRegistry, QUIZ_FILES
+from app.scoring import calculate_bfi10_scores, calculate_mas12_scores, get_scorer
+
+BFI10_TRAITS = {"E": "Extraversion", "A": "Agreeableness", "C": "Conscientiousness", "N": "Neuroticism", "O": "Openness"}
+MAS12_SUBSCALES = {"PP": "Power-Prestige", "RT": "Retention-Time", "D": "Distrust", "A": "Anxiety"}
+
+
+def reference_bfi10(questions: List[Dict[str, Any]], answers: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    scores: Dict[str, List[float]] = {code: [] for code in BFI10_TRAITS}
+    for question in questions:
+        value, key = answers.get(str(question.get("id"))), question.get("key")
+        if value is None or key is None:
+            continue
+        try:
+            value = float(value)
+        except (ValueError, TypeError):
+            continue
+        if key[0] in scores:
+            scores[key[0]].append((6 - value) if key.endswith("_R") else value)
+    return {BFI10_TRAITS[c]: (round(sum(v) / len(v), 2) if v else None) for c, v in scores.items()}
+
+
+def reference_mas12(questions: List[Dict[str, Any]], answers: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    scores: Dict[str, List[float]] = {name: [] for name in MAS12_SUBSCALES.values()}
+    for question in questions:
+        value, name = answers.get(str(question.get("id"))), MAS12_SUBSCALES.get(question.get("key"))
+        if value is None or name is None:
+            continue
+        try:
+            value = float(value)
+        except (ValueError, TypeError):
+            continue
+        if 1 <= value <= 5:
+            scores[name].append(value)
+    return {name: (round(sum(v) / len(v), 2) if v else None) for name, v in scores.items()}
+
+
+@pytest.fixture(scope="module")
+def registry():
+    registry = QuizRegistry(QUIZ_FILES)
+    registry.load()
+    return registry
+
+
+def random_answer_sets(questions: List[Dict[str, Any]], count: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    sets = []
+    for _ in range(count):
+        answers: Dict[str, Any] = {}
+        for question in questions:
+            roll = rng.random()
+            if roll < 0.1:
+                continue  # unanswered
+            if roll < 0.15:
+                answers[question["id"]] = rng.choice(["x", None, 0, 6, 7.5, "3"])
+            else:
+                answers[question["id"]] = rng.randint(1, 5)
+        sets.append(answers)
+    return sets
+
+
+@pytest.mark.parametrize("quiz_id,reference,wrapper", [
+    ("bfi-10", reference_bfi10, calculate_bfi10_scores),
+    ("mas-12", reference_mas12, calculate_mas12_scores),
+])
+def test_compiled_scorer_matches_reference(registry, quiz_id, reference, wrapper):
+    quiz = registry.get(quiz_id)
+    questions = quiz.definition["questions"]
+    answer_sets = random_answer_sets(questions, 300, seed=len(quiz_id))
+    expected = [reference(questions, answers) for answers in answer_sets]
+
+    scorer = get_scorer(quiz)
+    assert scorer.score_batch(answer_sets) == expected
+    assert [scorer.score(answers) for answers in answer_sets] == expected
+    assert [wrapper(questions, answers) for answers in answer_sets] == expected
+
+
+@pytest.mark.parametrize("quiz_id,reference", [("bfi-10", reference_bfi10), ("mas-12", reference_mas12)])
+def test_decoded_answers_score_like_reference(registry, quiz_id, reference):
+    # The submit path: valid answers decoded to a vector, then scored without the per-key lookups.
+    quiz = registry.get(quiz_id)
+    questions = quiz.definition["questions"]
+    rng = random.Random(7)
+    decoder, scorer = get_answer_decoder(quiz), get_scorer(quiz)
+    for _ in range(200):
+        answers = {q["id"]: rng.randint(1, 5) for q in questions if rng.random() > 0.2}
+        decoded = decoder.decode(json.loads(json.dumps(answers)))
+        assert scorer.score_values(decoded.values) == reference(questions, answers)
+    batch = np.stack([decoder.decode({q["id"]: 3 for q in questions}).values] * 4)
+    assert scorer.score_values_batch(batch) == [reference(questions, {q["id"]: 3 for q in questions})] * 4
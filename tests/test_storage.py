@@ -0,0 +1,56 @@
+# tests/test_storage.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.storage import ReportStore, MongoReportStore, SQLiteReportStore
+from benchmarks.fake_mongo import FakeCollection
+
+
+@pytest.fixture(params=["mongo", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "mongo":
+        yield MongoReportStore(FakeCollection("reports"))
+    else:
+        store = SQLiteReportStore(str(tmp_path / "reports.db"))
+        yield store
+        store.close()
+
+
+def make_reports(user_id, count, start=datetime(2025, 1, 1)):
+    # Pairs share a date_taken, so pages must break ties on id.
+    return [{
+        "id": f"{user_id}-{i:03d}", "user_id": user_id, "quiz_id": "bfi-10", "quiz_title": "BFI-10",
+        "report_type": "big_five", "score": {"Openness": 3.0}, "date_taken": start + timedelta(minutes=i // 2),
+        "answers_submitted": {"1": 3},
+    } for i in range(count)]
+
+
+def test_report_store_is_abstract():
+    with pytest.raises(TypeError):
+        ReportStore()
+
+
+def test_keyset_pages_cover_history_once_newest_first(store):
+    store.insert_reports(make_reports("u1", 25) + make_reports("u2", 5))
+    seen, after = [], None
+    while True:
+        page = store.find_user_reports("u1", 7, after)
+        if not page:
+            break
+        assert len(page) <= 7
+        assert all(set(doc) <= {"id", "quiz_id", "quiz_title", "report_type", "score", "date_taken"} for doc in page)
+        seen.extend(page)
+        after = (page[-1]["date_taken"], page[-1]["id"])
+
+    assert [doc["id"] for doc in seen] == [f"u1-{i:03d}" for i in reversed(range(25))]
+    keys = [(doc["date_taken"], doc["id"]) for doc in seen]
+    assert keys == sorted(keys, reverse=True)
+    assert store.find_latest_report_date("u1") == datetime(2025, 1, 1) + timedelta(minutes=12)
+
+
+def test_keyset_page_after_a_tie(store):
+    store.insert_reports(make_reports("u1", 4))
+    tied = datetime(2025, 1, 1, 0, 1)  # shared by u1-002 and u1-003
+    assert [doc["id"] for doc in store.find_user_reports("u1", 10, (tied, "u1-003"))] == ["u1-002", "u1-001", "u1-000"]
+    assert store.find_user_reports("u1", 10, (datetime(2025, 1, 1), "u1-000")) == []
@@ -0,0 +1,117 @@
+# tests/test_submissions.py
+import asyncio
+import json
+from datetime import datetime
+
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from app import database
+from app.submissions import SubmissionPipeline
+from benchmarks.fake_mongo import FakeCollection
+
+
+def report(n: int):
+    return {
+        "id": f"rep_{n:04d}", "user_id": "user1", "quiz_id": "bfi-10", "score": {},
+        "answers_submitted": {"bfi_1": 3}, "date_taken": datetime(2024, 1, 1, 12, n),
+    }
+
+
+class Store:
+    """insert_many over a fake collection, with scripted failures per call."""
+
+    def __init__(self, failures=()):
+        self.collection = FakeCollection()
+        database.ensure_indexes(self.collection)
+        self.failures = list(failures)
+        self.calls = 0
+
+    async def insert_many(self, docs):
+        self.calls += 1
+        failure = self.failures.pop(0) if self.failures else None
+        if callable(failure):
+            failure = failure(docs)
+        if failure is not None:
+            raise failure
+        return self.collection.insert_many([dict(d) for d in docs], ordered=False).inserted_ids
+
+
+def run_pipeline(store, docs, tmp_path, **kwargs):
+    async def go():
+        pipeline = SubmissionPipeline(
+            store.insert_many, batch_size=10, flush_interval=60, retry_base_delay=0, retry_max_delay=0,
+            dead_letter_path=str(tmp_path / "dead.jsonl"), **kwargs
+        )
+        pipeline.start()
+        for doc in docs:
+            assert pipeline.enqueue(doc)
+        assert pipeline.get_pending(docs[0]["id"], "user1") is docs[0]
+        assert pipeline.get_pending(docs[0]["id"], "user2") is None
+        await pipeline.drain()
+        return pipeline
+    return asyncio.run(go())
+
+
+class StoredLog(list):
+    """on_stored callback that records which reports it was called for."""
+
+    async def __call__(self, doc):
+        self.append(doc["id"])
+
+
+def dead_letters(tmp_path):
+    path = tmp_path / "dead.jsonl"
+    return [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+
+
+def test_drain_flushes_in_batches(tmp_path):
+    store = Store()
+    pipeline = run_pipeline(store, [report(n) for n in range(25)], tmp_path)
+    assert len(store.collection) == 25
+    assert store.calls == 3
+    assert (pipeline.flushed_count, len(pipeline), pipeline.dead_lettered) == (25, 0, 0)
+
+
+def test_duplicates_count_as_written(tmp_path):
+    store = Store()
+    store.collection.insert_one(dict(report(1)))
+    pipeline = run_pipeline(store, [report(n) for n in range(3)], tmp_path)
+    assert len(store.collection) == 3
+    assert (len(pipeline), pipeline.dead_lettered) == (0, 0)
+
+
+def test_rejected_document_is_dead_lettered_and_the_rest_stored(tmp_path):
+    store = Store()
+
+    def reject_second(docs):
+        store.collection.insert_many([dict(d) for i, d in enumerate(docs) if i != 1], ordered=False)
+        return BulkWriteError({"writeErrors": [{"index": 1, "code": 121, "errmsg": "Document failed validation"}]})
+
+    store.failures = [reject_second]
+    stored = StoredLog()
+    pipeline = run_pipeline(store, [report(n) for n in range(3)], tmp_path, on_stored=stored)
+    assert stored == ["rep_0000", "rep_0002"]  # the rejected report gets no summary, norms or index update
+    assert store.calls == 1
+    assert len(store.collection) == 2
+    assert (pipeline.flushed_count, pipeline.dead_lettered, len(pipeline)) == (2, 1, 0)
+    [line] = dead_letters(tmp_path)
+    assert line["id"] == "rep_0001" and line["answers"] == {"bfi_1": 3}
+    assert line["date_taken"] == "2024-01-01T12:01:00" and "121" in line["error"]
+
+
+def test_transient_failures_are_retried(tmp_path):
+    store = Store([AutoReconnect("primary stepped down"), AutoReconnect("still electing")])
+    pipeline = run_pipeline(store, [report(n) for n in range(3)], tmp_path, max_retries=5)
+    assert store.calls == 3
+    assert len(store.collection) == 3
+    assert (pipeline.failed_flushes, pipeline.dead_lettered) == (2, 0)
+
+
+def test_retries_are_capped(tmp_path):
+    store = Store([AutoReconnect("down")] * 100)
+    stored = StoredLog()
+    pipeline = run_pipeline(store, [report(n) for n in range(3)], tmp_path, max_retries=2, on_stored=stored)
+    assert stored == []
+    assert store.calls == 3
+    assert (len(pipeline), pipeline.dead_lettered) == (0, 3)
+    assert [line["id"] for line in dead_letters(tmp_path)] == ["rep_0000", "rep_0001", "rep_0002"]
@@ -0,0 +1,88 @@
+# tests/test_summaries.py
+import asyncio
+from datetime import datetime, timedelta
+
+from app import database
+from app.summaries import build_summary, record_report, summary_page, wait_for_seeds
+
+START = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def report(n: int, user_id: str = "user1", quiz_id: str = "bfi10"):
+    return {
+        "id": f"rep_{n:04d}", "user_id": user_id, "quiz_id": quiz_id, "quiz_title": quiz_id.upper(),
+        "report_type": quiz_id, "score": {"n": n}, "date_taken": START + timedelta(minutes=n),
+    }
+
+
+def record(*reports):
+    # Records reports as the submit path does, then lets the background seed (if any) finish.
+    async def go():
+        for r in reports:
+            await record_report(r)
+        await wait_for_seeds()
+    asyncio.run(go())
+
+
+def test_first_submit_seeds_summary_from_existing_history(fake_db):
+    # Reports stored before summaries existed (not backfilled): the first submit must not hide them.
+    fake_db.reports_collection.insert_many([report(n) for n in range(30)] + [report(n, quiz_id="mas12") for n in range(30, 35)])
+    new = report(40)
+    fake_db.reports_collection.insert_one(dict(new))
+
+    record(new)
+
+    summary = fake_db.summaries_collection.find_one({"_id": "user1"})
+    assert summary["report_count"] == 36
+    assert summary["quiz_counts"] == {"bfi10": 31, "mas12": 5}
+    assert summary["last_taken"] == new["date_taken"]
+    assert summary["latest"]["bfi10"]["id"] == "rep_0040"
+    assert summary["latest"]["mas12"]["id"] == "rep_0034"
+    page, cursor = summary_page(summary, 10)
+    assert [r["id"] for r in page] == ["rep_0040"] + [f"rep_{n:04d}" for n in range(34, 25, -1)]
+    assert cursor is not None
+
+
+def test_submit_updates_existing_summary(fake_db):
+    history = [report(n) for n in range(25, -1, -1)]
+    fake_db.reports_collection.insert_many([dict(r) for r in history])
+    fake_db.summaries_collection.insert_one(build_summary("user1", history))
+    new = report(50, quiz_id="mas12")
+
+    record(new, new)  # a retried update is not counted twice
+
+    summary = fake_db.summaries_collection.find_one({"_id": "user1"})
+    assert summary["report_count"] == 27
+    assert summary["quiz_counts"] == {"bfi10": 26, "mas12": 1}
+    assert summary["recent"][0]["id"] == "rep_0050"
+    assert len(summary["recent"]) == 20
+    assert summary["latest"]["bfi10"]["id"] == "rep_0025"
+
+
+def test_first_report_of_new_user(fake_db):
+    new = report(1, user_id="user2")
+    record(new)
+    summary = fake_db.summaries_collection.find_one({"_id": "user2"})
+    assert summary["report_count"] == 1
+    assert summary["user_id"] == "user2"
+
+
+def test_one_background_seed_counts_every_report_recorded_meanwhile(fake_db, monkeypatch):
+    history_reads = []
+    find_all_user_reports = database.find_all_user_reports
+
+    async def counting_find_all_user_reports(user_id):
+        history_reads.append(user_id)
+        return await find_all_user_reports(user_id)
+
+    monkeypatch.setattr(database, "find_all_user_reports", counting_find_all_user_reports)
+    fake_db.reports_collection.insert_many([report(n) for n in range(3)])
+    new = [report(n) for n in range(5, 8)]
+    fake_db.reports_collection.insert_many([dict(r) for r in new])
+
+    record(*new)
+
+    assert history_reads == ["user1"]
+    summary = fake_db.summaries_collection.find_one({"_id": "user1"})
+    assert summary["report_count"] == 6
+    assert [r["id"] for r in summary["recent"][:3]] == ["rep_0007", "rep_0006", "rep_0005"]